@@ -0,0 +1,135 @@
+"""
+PureSpectrum buyer accounts
+Accounts are listed in PURESPECTRUM_ACCOUNTS_FILE (a JSON list); without that
+file there is a single "default" account built from PURESPECTRUM_USERNAME and
+PURESPECTRUM_PASSWORD, using PURESPECTRUM_TOKEN / purespectrum_auth.json as
+before. Each account gets its own auth token, connection pool, rate limit and
+poller. The rate limit paces the poller; live requests from web handlers have
+their own budget (`interactive_rate_limit`, unlimited by default) so they never
+queue behind a poll cycle. With more than one account, survey IDs are namespaced as
+"<account>:<survey id>" so the merged view never mixes up two accounts.
+
+    [
+      {"name": "us", "username": "...", "password": "...", "rate_limit": 5},
+      {"name": "emea", "username": "...", "password": "...", "token": "eyJ...",
+       "max_connections": 20}
+    ]
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+ACCOUNTS_FILE = Path(os.getenv("PURESPECTRUM_ACCOUNTS_FILE", "purespectrum_accounts.json"))
+# Per-account defaults: upstream requests per second and pooled connections
+DEFAULT_RATE_LIMIT = float(os.getenv("PURESPECTRUM_RATE_LIMIT", "10"))
+# Live API requests per second per account, 0 for no limit
+DEFAULT_INTERACTIVE_RATE_LIMIT = float(os.getenv("PURESPECTRUM_INTERACTIVE_RATE_LIMIT", "0"))
+DEFAULT_MAX_CONNECTIONS = int(os.getenv("PURESPECTRUM_MAX_CONNECTIONS", "10"))
+DEFAULT_ACCOUNT = "default"
+NAMESPACE_SEPARATOR = ":"
+
+
+class RateLimiter:
+    """Token bucket allowing `rate` requests per second (bursts of up to `rate`)"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self._tokens = max(rate, 1.0)
+        self._updated = time.monotonic()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            now = time.monotonic()
+            self._tokens = min(max(self.rate, 1.0), self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class Account:
+    __slots__ = ('name', 'username', 'password', 'token', 'auth_file', 'rate_limit',
+                 'interactive_rate_limit', 'max_connections', 'limiter', 'interactive_limiter')
+
+    def __init__(self, name: str, username: str = '', password: str = '', token: Optional[str] = None,
+                 auth_file: Optional[str] = None, rate_limit: float = DEFAULT_RATE_LIMIT,
+                 max_connections: int = DEFAULT_MAX_CONNECTIONS,
+                 interactive_rate_limit: float = DEFAULT_INTERACTIVE_RATE_LIMIT):
+        if NAMESPACE_SEPARATOR in name:
+            raise ValueError(f"Account name {name!r} must not contain {NAMESPACE_SEPARATOR!r}")
+        self.name = name
+        self.username = username
+        self.password = password
+        self.token = token
+        self.auth_file = auth_file
+        self.rate_limit = float(rate_limit)
+        self.interactive_rate_limit = float(interactive_rate_limit)
+        self.max_connections = int(max_connections)
+        # Poller traffic and live web requests are paced separately
+        self.limiter = RateLimiter(self.rate_limit)
+        self.interactive_limiter = RateLimiter(self.interactive_rate_limit)
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.username and self.password)
+
+    def __repr__(self):
+        return f'<Account {self.name} {self.username!r}>'
+
+
+def load_accounts(path: Path = ACCOUNTS_FILE) -> List[Account]:
+    if path.exists():
+        with open(path, 'r') as f:
+            entries = json.load(f)
+        accounts = [Account(**entry) for entry in entries]
+        names = [account.name for account in accounts]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Duplicate account names in {path}: {names}")
+        logger.info(f"👥 Loaded {len(accounts)} PureSpectrum accounts from {path}")
+        return accounts
+    return [Account(
+        DEFAULT_ACCOUNT,
+        os.getenv("PURESPECTRUM_USERNAME", ""),
+        os.getenv("PURESPECTRUM_PASSWORD", ""),
+    )]
+
+
+_accounts: Optional[List[Account]] = None
+
+
+def get_accounts() -> List[Account]:
+    """The process-wide account list, loaded on first use"""
+    global _accounts
+    if _accounts is None:
+        _accounts = load_accounts()
+    return _accounts
+
+
+def namespaced() -> bool:
+    """Survey IDs carry an account prefix once more than one account is configured"""
+    return len(get_accounts()) > 1
+
+
+def survey_key(account: str, survey_id: str) -> str:
+    """ID of a survey in the merged view"""
+    return f"{account}{NAMESPACE_SEPARATOR}{survey_id}" if namespaced() else survey_id
+
+
+def resolve_survey_key(key: str) -> Tuple[Optional[Account], str]:
+    """(account, upstream survey ID) for an ID from the merged view"""
+    accounts = get_accounts()
+    if not namespaced():
+        return accounts[0], key
+    name, sep, survey_id = key.partition(NAMESPACE_SEPARATOR)
+    if not sep:
+        return None, key
+    return next((account for account in accounts if account.name == name), None), survey_id
@@ -0,0 +1,373 @@
+"""
+Threshold alerts evaluated on every published snapshot
+Rules live in ALERT_RULES_FILE (a JSON list) and are compiled once at start:
+
+    [
+      {"name": "quota_overfill", "scope": "quota", "severity": "warning",
+       "when": "achieved > required_count * 1.1",
+       "message": "{quota_name} at {achieved}/{required_count}"}
+    ]
+
+`when` is a Python-style expression over the survey's fields (model attributes
+such as completes, target, current_cost, derived progress and
+hours_since_last_complete, then any raw upstream key) or, for "quota" rules,
+the quota's fields plus its survey's as survey_<field>. Only comparisons,
+arithmetic, and/or/not and literals are allowed. A missing field makes the
+rule not match.
+
+Each cycle only surveys and quotas that changed since the last evaluation are
+re-checked (a changed survey also re-checks its quotas against quota rules
+that use survey_ fields); rules that depend on the clock are re-checked for every survey at
+most every ALERT_TIME_RULES_SECONDS. Alerts keep a firing/resolved state so a
+condition that stays true is reported once, and transitions are logged and
+POSTed to ALERT_WEBHOOK_URL when set.
+"""
+import ast
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from . import metrics
+from .models import Quota, Survey
+
+logger = logging.getLogger(__name__)
+
+ALERT_RULES_FILE = Path(os.getenv("ALERT_RULES_FILE", "alert_rules.json"))
+ALERT_WEBHOOK_URL = os.getenv("ALERT_WEBHOOK_URL", "")
+ALERT_TIME_RULES_SECONDS = float(os.getenv("ALERT_TIME_RULES_SECONDS", "60"))
+# Resolved alerts stay visible in /api/alerts this long
+ALERT_RESOLVED_RETENTION_SECONDS = float(os.getenv("ALERT_RESOLVED_RETENTION_SECONDS", str(24 * 3600)))
+
+DEFAULT_RULES = [
+    {"name": "quota_overfill", "scope": "quota", "severity": "warning",
+     "when": "required_count > 0 and achieved > required_count * 1.1",
+     "message": "Quota {quota_name} over 110%: {achieved}/{required_count}"},
+    {"name": "ir_drop", "scope": "survey", "severity": "warning",
+     "when": "expected_ir > 0 and current_incidence < expected_ir * 0.7",
+     "message": "IR {current_incidence}% is 30% below expected {expected_ir}%"},
+    {"name": "over_budget", "scope": "survey", "severity": "critical",
+     "when": "budget > 0 and current_cost > budget",
+     "message": "Cost {current_cost} exceeded budget {budget}"},
+    {"name": "no_completes", "scope": "survey", "severity": "warning",
+     "when": "status_code == 22 and completes < target and hours_since_last_complete >= 2",
+     "message": "No completes in {hours_since_last_complete:.1f}h"},
+]
+
+SCOPES = ('survey', 'quota')
+# Fields whose value changes with the clock rather than with the data
+TIME_FIELDS = {'hours_since_last_complete', 'minutes_since_last_complete'}
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub, ast.UAdd,
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Mod, ast.Compare, ast.Eq, ast.NotEq,
+    ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn, ast.Name, ast.Load, ast.Constant,
+    ast.List, ast.Tuple,
+)
+
+
+class RuleError(ValueError):
+    """Invalid alert rule"""
+
+
+class Rule:
+    __slots__ = ('name', 'scope', 'severity', 'when', 'message', 'code', 'names', 'time_based')
+
+    def __init__(self, name: str, when: str, scope: str = 'survey', severity: str = 'warning',
+                 message: Optional[str] = None):
+        if scope not in SCOPES:
+            raise RuleError(f"Rule {name!r}: scope must be one of {', '.join(SCOPES)}")
+        try:
+            tree = ast.parse(when, mode='eval')
+        except SyntaxError as e:
+            raise RuleError(f"Rule {name!r}: {e.msg} in {when!r}") from None
+        for node in ast.walk(tree):
+            if not isinstance(node, _ALLOWED_NODES):
+                raise RuleError(f"Rule {name!r}: {type(node).__name__} is not allowed in {when!r}")
+        self.name = name
+        self.scope = scope
+        self.severity = severity
+        self.when = when
+        self.message = message or f"{name}: {when}"
+        self.code = compile(tree, f'<rule {name}>', 'eval')
+        self.names = {node.id for node in ast.walk(tree) if isinstance(node, ast.Name)}
+        self.time_based = bool(self.names & TIME_FIELDS)
+
+    def matches(self, fields: 'Fields') -> bool:
+        try:
+            return bool(eval(self.code, {'__builtins__': {}}, fields))
+        except (TypeError, ZeroDivisionError):
+            # A missing (None) or non-numeric field never matches
+            return False
+
+
+def load_rules(path: Path = ALERT_RULES_FILE) -> List[Rule]:
+    if path.exists():
+        with open(path, 'r') as f:
+            entries = json.load(f)
+        logger.info(f"🚨 Loaded {len(entries)} alert rules from {path}")
+    else:
+        entries = DEFAULT_RULES
+    rules = [Rule(**entry) for entry in entries]
+    names = [rule.name for rule in rules]
+    if len(set(names)) != len(names):
+        raise RuleError(f"Duplicate alert rule names: {names}")
+    return rules
+
+
+class Fields(dict):
+    """Rule namespace, resolving each name on first use (raw payloads are decoded only if needed)"""
+
+    def __init__(self, model, now: float, survey: Optional[Survey] = None):
+        super().__init__()
+        self._model = model
+        self._now = now
+        self._survey = survey
+        self._raw = None
+
+    def __missing__(self, name: str):
+        value = self._resolve(name)
+        self[name] = value
+        return value
+
+    def _resolve(self, name: str):
+        model = self._model
+        if isinstance(model, Quota):
+            if name == 'quota_name':
+                return model.name
+            if name.startswith('survey_') and self._survey is not None:
+                return Fields(self._survey, self._now)[name[len('survey_'):]]
+        if isinstance(model, Survey):
+            if name == 'progress':
+                return model.completes / model.target * 100 if model.target else None
+            if name in TIME_FIELDS:
+                at = _timestamp(model.last_complete_date)
+                if at is None:
+                    return None
+                return (self._now - at) / (60 if name.startswith('minutes') else 3600)
+        if name in model.__slots__ and not name.startswith('_'):
+            return getattr(model, name)
+        if self._raw is None:
+            self._raw = model.raw
+        return self._raw.get(name)
+
+
+def _timestamp(value) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+
+class _FormatFields(dict):
+    def __init__(self, fields: Fields):
+        super().__init__()
+        self._fields = fields
+
+    def __missing__(self, name: str):
+        value = self._fields[name]
+        return '?' if value is None else value
+
+
+class Alert:
+    __slots__ = ('rule', 'severity', 'survey_id', 'quota_id', 'state', 'since', 'resolved_at', 'message')
+
+    def __init__(self, rule: str, severity: str, survey_id: str, quota_id, since: float, message: str):
+        self.rule = rule
+        self.severity = severity
+        self.survey_id = survey_id
+        self.quota_id = quota_id
+        self.state = 'firing'
+        self.since = since
+        self.resolved_at = None
+        self.message = message
+
+    @property
+    def key(self) -> Tuple:
+        return self.rule, self.survey_id, self.quota_id
+
+    def to_dict(self) -> Dict:
+        return {
+            'rule': self.rule,
+            'severity': self.severity,
+            'surveyId': self.survey_id,
+            'quotaId': self.quota_id,
+            'state': self.state,
+            'firingSince': round(self.since, 3),
+            'resolvedAt': None if self.resolved_at is None else round(self.resolved_at, 3),
+            'message': self.message,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Alert':
+        alert = cls(data['rule'], data['severity'], data['surveyId'], data['quotaId'],
+                    data['firingSince'], data['message'])
+        alert.state = data['state']
+        alert.resolved_at = data['resolvedAt']
+        return alert
+
+    def event(self) -> Dict:
+        """Notification payload, shaped like PureSpectrumScraper.detect_changes() events"""
+        return {
+            'surveyId': self.survey_id,
+            'event': 'alertFiring' if self.state == 'firing' else 'alertResolved',
+            **self.to_dict(),
+        }
+
+
+class AlertEngine:
+    def __init__(self, rules: List[Rule]):
+        self.rules = {scope: [rule for rule in rules if rule.scope == scope] for scope in SCOPES}
+        self._time_rules = [rule for rule in self.rules['survey'] if rule.time_based]
+        # Quota rules that read their survey's fields, so a survey change affects them too
+        self._survey_quota_rules = [rule for rule in self.rules['quota']
+                                    if any(name.startswith('survey_') for name in rule.names)]
+        self.alerts: Dict[Tuple, Alert] = {}
+        # What the last evaluation saw, to find what changed since
+        self._seen_surveys: Dict[str, bytes] = {}
+        self._seen_quotas: Dict[str, List[Quota]] = {}
+        self._time_checked_at = 0.0
+
+    def restore(self, alerts: Iterable[Dict]):
+        """Continue from the alert state of a previous poller, so nothing is re-announced"""
+        for data in alerts:
+            alert = Alert.from_dict(data)
+            self.alerts[alert.key] = alert
+
+    def _resolve(self, key: Tuple, now: float, events: List[Alert]):
+        alert = self.alerts.get(key)
+        if alert is not None and alert.state == 'firing':
+            alert.state, alert.resolved_at = 'resolved', now
+            events.append(alert)
+
+    def _check(self, rule: Rule, survey_id: str, quota_id, fields: Fields, now: float, events: List[Alert]):
+        key = (rule.name, survey_id, quota_id)
+        alert = self.alerts.get(key)
+        firing = alert is not None and alert.state == 'firing'
+        if rule.matches(fields):
+            if not firing:
+                try:
+                    message = rule.message.format_map(_FormatFields(fields))
+                except (ValueError, IndexError, KeyError):
+                    message = rule.message
+                alert = self.alerts[key] = Alert(rule.name, rule.severity, survey_id, quota_id, now, message)
+                events.append(alert)
+        elif firing:
+            self._resolve(key, now, events)
+
+    def evaluate(self, surveys: Dict[str, Survey], quotas: Dict[str, List[Quota]],
+                 now: Optional[float] = None) -> List[Alert]:
+        """Re-check what changed since the last call; returns alerts that fired or resolved"""
+        start = time.perf_counter()
+        now = time.time() if now is None else now
+        events: List[Alert] = []
+
+        changed: Set[str] = {survey_id for survey_id, survey in surveys.items()
+                             if self._seen_surveys.get(survey_id) != survey.raw_json}
+        for survey_id in changed:
+            survey = surveys[survey_id]
+            self._seen_surveys[survey_id] = survey.raw_json
+            fields = Fields(survey, now)
+            for rule in self.rules['survey']:
+                self._check(rule, survey_id, None, fields, now, events)
+
+        if self._time_rules and now - self._time_checked_at >= ALERT_TIME_RULES_SECONDS:
+            self._time_checked_at = now
+            for survey_id, survey in surveys.items():
+                if survey_id not in changed:
+                    fields = Fields(survey, now)
+                    for rule in self._time_rules:
+                        self._check(rule, survey_id, None, fields, now, events)
+
+        if self.rules['quota']:
+            for survey_id, rows in quotas.items():
+                survey_rules = self._survey_quota_rules if survey_id in changed else ()
+                # Unchanged quota lists are the same objects from one cycle to the next
+                if self._seen_quotas.get(survey_id) is rows and not survey_rules:
+                    continue
+                previous = {q.quota_id: q.raw_json for q in self._seen_quotas.get(survey_id) or ()}
+                self._seen_quotas[survey_id] = rows
+                for quota in rows:
+                    rules = self.rules['quota']
+                    if previous.pop(quota.quota_id, None) == quota.raw_json:
+                        rules = survey_rules
+                        if not rules:
+                            continue
+                    fields = Fields(quota, now, surveys.get(survey_id))
+                    for rule in rules:
+                        self._check(rule, survey_id, quota.quota_id, fields, now, events)
+                # Quotas that were removed from the survey
+                for quota_id in previous:
+                    for rule in self.rules['quota']:
+                        self._resolve((rule.name, survey_id, quota_id), now, events)
+
+        # Surveys that left the list resolve their alerts
+        for survey_id in self._seen_surveys.keys() - surveys.keys():
+            del self._seen_surveys[survey_id]
+            self._seen_quotas.pop(survey_id, None)
+        for key, alert in self.alerts.items():
+            if alert.survey_id not in surveys:
+                self._resolve(key, now, events)
+        for key in [key for key, alert in self.alerts.items()
+                    if alert.resolved_at is not None and now - alert.resolved_at > ALERT_RESOLVED_RETENTION_SECONDS]:
+            del self.alerts[key]
+
+        for alert in events:
+            metrics.ALERT_TRANSITIONS.labels(alert.rule, alert.state).inc()
+        firing: Dict[str, int] = {rule.name: 0 for scope in SCOPES for rule in self.rules[scope]}
+        for alert in self.alerts.values():
+            if alert.state == 'firing':
+                firing[alert.rule] = firing.get(alert.rule, 0) + 1
+        for rule, count in firing.items():
+            metrics.ALERTS_FIRING.labels(rule).set(count)
+        metrics.ALERT_EVALUATION_SECONDS.observe(time.perf_counter() - start)
+        return events
+
+    def to_list(self) -> List[Dict]:
+        return [alert.to_dict() for alert in self.alerts.values()]
+
+
+class AlertNotifier:
+    """Logs alert transitions and POSTs them to ALERT_WEBHOOK_URL in the background"""
+
+    def __init__(self, url: str = ALERT_WEBHOOK_URL):
+        self.url = url
+        self._tasks: Set[asyncio.Task] = set()
+
+    def push(self, alerts: List[Alert]):
+        if not alerts:
+            return
+        for alert in alerts:
+            extra = {'rule': alert.rule, 'survey_id': alert.survey_id, 'quota_id': alert.quota_id}
+            if alert.state == 'firing':
+                logger.warning(f"🚨 [{alert.severity}] {alert.rule} on survey {alert.survey_id}: {alert.message}",
+                               extra=extra)
+            else:
+                logger.info(f"✅ Resolved {alert.rule} on survey {alert.survey_id}", extra=extra)
+        if not self.url:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(self._send([alert.event() for alert in alerts]))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, events: List[Dict]):
+        import aiohttp
+
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.post(self.url, json={'events': events},
+                                        timeout=aiohttp.ClientTimeout(total=10)) as response:
+                    if response.status >= 300:
+                        logger.error(f"❌ Alert webhook returned {response.status}")
+        except Exception as e:
+            logger.error(f"Failed to send alerts: {e}")
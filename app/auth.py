@@ -0,0 +1,160 @@
+"""
+Process-wide PureSpectrum auth tokens, one per account
+The default account's token comes from PURESPECTRUM_TOKEN (deployments) or
+purespectrum_auth.json (local development); other accounts use the token in
+their account entry or their own auth file. Each is loaded once per process.
+Auth files are re-checked by mtime at most every AUTH_CHECK_INTERVAL_SECONDS;
+a changed file replaces the token for every scraper of that account at once,
+so a rotated token needs no restart.
+"""
+import base64
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from . import metrics
+from .accounts import DEFAULT_ACCOUNT, Account
+
+logger = logging.getLogger(__name__)
+
+AUTH_FILE = Path(os.getenv("PURESPECTRUM_AUTH_FILE", "purespectrum_auth.json"))
+AUTH_CHECK_INTERVAL_SECONDS = float(os.getenv("AUTH_CHECK_INTERVAL_SECONDS", "5"))
+# Warn once the token expires within this many seconds (default 3 days)
+AUTH_EXPIRY_WARN_SECONDS = float(os.getenv("AUTH_EXPIRY_WARN_SECONDS", str(3 * 24 * 3600)))
+
+
+def token_expiry(token: str) -> Optional[float]:
+    """Unverified `exp` claim of a JWT as a Unix timestamp, None if there is none"""
+    try:
+        payload = token.split('.')[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+        return float(claims['exp'])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+class AuthManager:
+    def __init__(self, path: Path = AUTH_FILE, account: str = DEFAULT_ACCOUNT,
+                 token: Optional[str] = None, use_env: bool = True):
+        self.path = path
+        self.account = account
+        self._config_token = token
+        self._use_env = use_env
+        self._lock = threading.Lock()
+        # Replaced, never mutated, so readers can hold on to the dict they got
+        self._auth: Dict = {}
+        self._source: Optional[str] = None
+        self._mtime_ns: Optional[int] = None
+        self._expires_at: Optional[float] = None
+        self._warned = set()
+        self._checked_at: Optional[float] = None
+
+    @property
+    def auth(self) -> Dict:
+        """Current auth data (token, user_id, company_id)"""
+        checked_at = self._checked_at
+        if checked_at is None or time.monotonic() - checked_at >= AUTH_CHECK_INTERVAL_SECONDS:
+            self._refresh()
+        return self._auth
+
+    @property
+    def token(self) -> str:
+        return self.auth.get('token', '')
+
+    def _refresh(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._checked_at is not None and now - self._checked_at < AUTH_CHECK_INTERVAL_SECONDS:
+                return
+            first = self._checked_at is None
+            self._checked_at = now
+
+            token = os.getenv("PURESPECTRUM_TOKEN") if first and self._use_env else None
+            if first and self._config_token:
+                self._swap({"token": self._config_token, "user_id": "", "company_id": ""}, 'config')
+                logger.info("✅ Loaded authentication token from account config", extra={'account': self.account})
+            elif token:
+                self._swap({
+                    "token": token,
+                    "user_id": os.getenv("PURESPECTRUM_USER_ID") or "",
+                    "company_id": os.getenv("PURESPECTRUM_COMPANY_ID") or "",
+                }, 'env')
+                logger.info("✅ Loaded authentication token from environment variables", extra={'account': self.account})
+            elif self._source not in ('env', 'config'):
+                self._reload_file_if_changed()
+            self._check_expiry()
+
+    def _reload_file_if_changed(self):
+        try:
+            mtime_ns = self.path.stat().st_mtime_ns
+        except OSError:
+            # Missing file: keep whatever token is already in memory
+            return
+        if mtime_ns == self._mtime_ns:
+            return
+        self._mtime_ns = mtime_ns
+        try:
+            with open(self.path, 'r') as f:
+                auth_data = json.load(f)
+        except Exception as e:
+            logger.error(f"Failed to load auth: {e}", extra={'account': self.account})
+            return
+        reloaded = self._source == 'file'
+        self._swap(auth_data, 'file')
+        if reloaded:
+            logger.info("🔄 Authentication token file changed, new token loaded", extra={'account': self.account})
+        else:
+            logger.info("✅ Loaded saved authentication token from file", extra={'account': self.account})
+
+    def _swap(self, auth_data: Dict, source: str):
+        self._auth = dict(auth_data)
+        self._source = source
+        self._expires_at = token_expiry(self._auth.get('token', ''))
+        self._warned = set()
+        metrics.AUTH_RELOADS.labels(self.account, source).inc()
+
+    def _check_expiry(self):
+        if self._expires_at is None:
+            return
+        remaining = self._expires_at - time.time()
+        metrics.AUTH_TOKEN_EXPIRES_IN.labels(self.account).set(remaining)
+        if remaining <= 0 and 'expired' not in self._warned:
+            self._warned.update(('expired', 'expiring'))
+            logger.error(f"❌ PureSpectrum token expired {-remaining / 3600:.1f}h ago; "
+                         f"update {self.path} or PURESPECTRUM_TOKEN", extra={'account': self.account})
+        elif remaining < AUTH_EXPIRY_WARN_SECONDS and 'expiring' not in self._warned:
+            self._warned.add('expiring')
+            logger.warning(f"⚠️  PureSpectrum token expires in {remaining / 3600:.1f}h; "
+                           f"update {self.path} or PURESPECTRUM_TOKEN", extra={'account': self.account})
+
+    def save(self, auth_data: Dict):
+        """Write auth data to the auth file and use it immediately"""
+        tmp = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(auth_data, f, indent=2)
+        os.replace(tmp, self.path)
+        with self._lock:
+            self._mtime_ns = self.path.stat().st_mtime_ns
+            self._swap(auth_data, 'file')
+            self._check_expiry()
+
+
+_managers: Dict[str, AuthManager] = {}
+
+
+def get_auth_manager(account: Optional[Account] = None) -> AuthManager:
+    """The process-wide auth manager of an account (the default account if None)"""
+    name = account.name if account is not None else DEFAULT_ACCOUNT
+    manager = _managers.get(name)
+    if manager is None:
+        if account is None or (name == DEFAULT_ACCOUNT and not account.token and not account.auth_file):
+            manager = AuthManager()
+        else:
+            path = Path(account.auth_file or f"purespectrum_auth.{name}.json")
+            manager = AuthManager(path, name, account.token, use_env=False)
+        manager = _managers.setdefault(name, manager)
+    return manager
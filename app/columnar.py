@@ -0,0 +1,150 @@
+"""
+Columnar view of the survey snapshot
+Numeric survey fields are kept in NumPy arrays and categorical fields as
+integer codes, so aggregate queries (totals, group-bys, weighted averages)
+are vectorized instead of looping over survey objects. Each snapshot version
+gets its own immutable SurveyColumns, built from the previous version by
+copying the rows of unchanged surveys and extracting only the changed ones.
+"""
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .models import Survey
+
+# Column name -> Survey attribute
+NUMERIC_FIELDS = {
+    'completes': 'completes',
+    'target': 'target',
+    'cpi': 'cpi',
+    'currentCost': 'current_cost',
+    'incidence': 'incidence',
+    'loi': 'loi',
+}
+CATEGORICAL_FIELDS = {
+    'status': 'status_code',
+    'countryCode': 'country_code',
+    'billingId': 'billing_id',
+    'account': 'account',
+}
+
+
+def _number(value) -> float:
+    if value is None or value == '':
+        return 0.0
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class Categories:
+    """Stable value <-> code dictionary for one categorical column"""
+
+    __slots__ = ('values', 'codes')
+
+    def __init__(self, values: Optional[List] = None):
+        self.values = list(values or [])
+        self.codes = {value: code for code, value in enumerate(self.values)}
+
+    def code(self, value) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class SurveyColumns:
+    """Column arrays for one snapshot version, row i is survey `ids[i]`"""
+
+    def __init__(self, ids: List[str], numeric: Dict[str, np.ndarray],
+                 codes: Dict[str, np.ndarray], categories: Dict[str, Categories]):
+        self.ids = ids
+        self.rows = {survey_id: row for row, survey_id in enumerate(ids)}
+        self.numeric = numeric
+        self.codes = codes
+        self.categories = categories
+        self.changed_rows = len(ids)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, surveys: Dict[str, Survey], previous: Optional['SurveyColumns'] = None,
+              previous_surveys: Optional[Dict[str, Survey]] = None) -> 'SurveyColumns':
+        """
+        Build columns for `surveys`, reusing rows from `previous` for surveys
+        whose raw payload is byte-for-byte unchanged
+        """
+        ids = list(surveys.keys())
+        n = len(ids)
+        categories = {name: Categories(previous.categories[name].values if previous else None)
+                      for name in CATEGORICAL_FIELDS}
+
+        source = np.full(n, -1, dtype=np.int64)
+        if previous is not None and previous_surveys:
+            for row, survey_id in enumerate(ids):
+                old = previous_surveys.get(survey_id)
+                if old is not None and old.raw_json == surveys[survey_id].raw_json:
+                    source[row] = previous.rows[survey_id]
+        reused = source >= 0
+        changed = np.flatnonzero(~reused)
+        changed_surveys = [surveys[ids[row]] for row in changed]
+
+        numeric = {}
+        for name, attr in NUMERIC_FIELDS.items():
+            column = np.empty(n, dtype=np.float64)
+            if previous is not None:
+                column[reused] = previous.numeric[name][source[reused]]
+            column[changed] = np.fromiter((_number(getattr(s, attr)) for s in changed_surveys),
+                                          dtype=np.float64, count=len(changed_surveys))
+            numeric[name] = column
+
+        codes = {}
+        for name, attr in CATEGORICAL_FIELDS.items():
+            column = np.empty(n, dtype=np.int32)
+            if previous is not None:
+                column[reused] = previous.codes[name][source[reused]]
+            lookup = categories[name]
+            column[changed] = np.fromiter((lookup.code(getattr(s, attr)) for s in changed_surveys),
+                                          dtype=np.int32, count=len(changed_surveys))
+            codes[name] = column
+
+        columns = cls(ids, numeric, codes, categories)
+        columns.changed_rows = len(changed)
+        return columns
+
+    def mask(self, **filters) -> np.ndarray:
+        """Boolean row mask, e.g. mask(status=22, countryCode='US')"""
+        result = np.ones(len(self.ids), dtype=bool)
+        for name, value in filters.items():
+            code = self.categories[name].codes.get(value)
+            if code is None:
+                return np.zeros(len(self.ids), dtype=bool)
+            result &= self.codes[name] == code
+        return result
+
+    def total(self, field: str, mask: Optional[np.ndarray] = None) -> float:
+        column = self.numeric[field]
+        return float(column[mask].sum() if mask is not None else column.sum())
+
+    def weighted_mean(self, field: str, weights: str, mask: Optional[np.ndarray] = None) -> float:
+        """Mean of `field` weighted by another column (0 when weights sum to 0)"""
+        values, w = self.numeric[field], self.numeric[weights]
+        if mask is not None:
+            values, w = values[mask], w[mask]
+        total = w.sum()
+        return float((values * w).sum() / total) if total else 0.0
+
+    def group_count(self, by: str) -> Dict:
+        counts = np.bincount(self.codes[by], minlength=len(self.categories[by].values))
+        return {value: int(count) for value, count in zip(self.categories[by].values, counts) if count}
+
+    def group_sum(self, field: str, by: str) -> Dict:
+        codes = self.codes[by]
+        size = len(self.categories[by].values)
+        sums = np.bincount(codes, weights=self.numeric[field], minlength=size)
+        present = np.bincount(codes, minlength=size) > 0
+        return {value: float(total) for value, total, seen
+                in zip(self.categories[by].values, sums, present) if seen}
@@ -0,0 +1,265 @@
+"""
+CSV and Excel exports of surveys and quotas
+Rows are encoded in batches and handed to a StreamingResponse as they are
+produced, so a download starts with the first batch and no export is ever
+held in memory whole. The .xlsx writer needs no extra dependency: it writes a
+minimal SpreadsheetML workbook through zipfile onto a non-seekable sink
+(entries carry data descriptors instead of sizes patched in afterwards).
+"""
+import asyncio
+import csv
+import io
+import re
+import zipfile
+from datetime import datetime, timezone
+from typing import AsyncIterator, Callable, Iterable, Iterator, List, Optional, Tuple
+
+from .history import HISTORY_MAX_BULK, HistoryStore
+from .models import Survey
+
+# Rows encoded per yielded chunk
+EXPORT_BATCH_ROWS = 500
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+def _progress(survey: Survey) -> Optional[float]:
+    return round(survey.completes / survey.target * 100, 1) if survey.target else None
+
+
+# (header, value) per column; values get the survey ID and Survey
+SURVEY_COLUMNS: List[Tuple[str, Callable]] = [
+    ('Survey ID', lambda survey_id, survey: survey_id),
+    ('Account', lambda survey_id, survey: survey.account),
+    ('Title', lambda survey_id, survey: survey.title),
+    ('Status', lambda survey_id, survey: survey.status),
+    ('Completes', lambda survey_id, survey: survey.completes),
+    ('Target', lambda survey_id, survey: survey.target),
+    ('Progress %', lambda survey_id, survey: _progress(survey)),
+    ('CPI', lambda survey_id, survey: survey.cpi),
+    ('LOI', lambda survey_id, survey: survey.loi),
+    ('Incidence', lambda survey_id, survey: survey.incidence),
+    ('Current Cost', lambda survey_id, survey: survey.current_cost),
+    ('Billing ID', lambda survey_id, survey: survey.billing_id),
+    ('Country', lambda survey_id, survey: survey.country_code),
+    ('Launch Date', lambda survey_id, survey: survey.launch_date),
+    ('Last Complete', lambda survey_id, survey: survey.last_complete_date),
+]
+
+# Quota values also get the Quota; its name comes from generate_quota_name()
+QUOTA_COLUMNS: List[Tuple[str, Callable]] = [
+    ('Survey ID', lambda survey_id, survey, quota: survey_id),
+    ('Survey Title', lambda survey_id, survey, quota: survey.title),
+    ('Quota ID', lambda survey_id, survey, quota: quota.quota_id),
+    ('Quota', lambda survey_id, survey, quota: quota.name),
+    ('Achieved', lambda survey_id, survey, quota: quota.achieved),
+    ('Required', lambda survey_id, survey, quota: quota.required_count),
+    ('Current Target', lambda survey_id, survey, quota: quota.current_target),
+    ('In Progress', lambda survey_id, survey, quota: quota.in_progress),
+    ('Open', lambda survey_id, survey, quota: quota.currently_open),
+]
+
+HISTORY_HEADER = ['Survey ID', 'Title', 'Time (UTC)', 'Completes', 'Completes Min', 'Completes Max',
+                  'Cost', 'Cost Min', 'Cost Max']
+
+
+def survey_rows(surveys: dict, survey_ids: Iterable[str]) -> Iterator[List]:
+    for survey_id in survey_ids:
+        survey = surveys[survey_id]
+        yield [value(survey_id, survey) for _, value in SURVEY_COLUMNS]
+
+
+def quota_rows(surveys: dict, quotas: dict, survey_ids: Iterable[str]) -> Iterator[List]:
+    for survey_id in survey_ids:
+        survey = surveys[survey_id]
+        for quota in quotas.get(survey_id, ()):
+            yield [value(survey_id, survey, quota) for _, value in QUOTA_COLUMNS]
+
+
+async def history_rows(store: HistoryStore, surveys: dict, survey_ids: List[str], start: float, end: float,
+                       resolution: float) -> AsyncIterator[List[List]]:
+    """Batches of one row per survey and bucket, read HISTORY_MAX_BULK surveys at a time"""
+    for i in range(0, len(survey_ids), HISTORY_MAX_BULK):
+        chunk = survey_ids[i:i + HISTORY_MAX_BULK]
+        series, _, _ = await asyncio.to_thread(store.series, chunk, start, end, resolution)
+        rows = []
+        for survey_id in chunk:
+            s = series[survey_id]
+            completes, cost = s['completes'], s['cost']
+            for j, t in enumerate(s['t']):
+                rows.append([
+                    survey_id, surveys[survey_id].title,
+                    datetime.fromtimestamp(t, timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+                    completes['last'][j], completes['min'][j], completes['max'][j],
+                    cost['last'][j], cost['min'][j], cost['max'][j],
+                ])
+        yield rows
+
+
+# Text starting with one of these is run as a formula by spreadsheet apps
+_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _csv_cell(value):
+    """Text cells that would start a formula get a leading quote (CSV injection)"""
+    if isinstance(value, str) and value.startswith(_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+class CsvEncoder:
+    """Excel-friendly CSV (UTF-8 with a byte order mark); text cannot start a formula"""
+
+    def __init__(self):
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer)
+
+    def _take(self) -> bytes:
+        data = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data.encode('utf-8')
+
+    def begin(self, header: List[str]) -> bytes:
+        self._buffer.write('\ufeff')
+        self._writer.writerow(header)
+        return self._take()
+
+    def rows(self, rows: List[List]) -> bytes:
+        self._writer.writerows([_csv_cell(value) for value in row] for row in rows)
+        return self._take()
+
+    def end(self) -> bytes:
+        return b''
+
+
+class _Sink:
+    """Write-only file for zipfile; collected bytes are taken by the stream"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+# Characters XML 1.0 does not allow, even escaped
+_INVALID_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+_XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def _cell(value) -> str:
+    if value is None:
+        return '<c/>'
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c><v>{value!r}</v></c>' if value == value else '<c/>'
+    text = _INVALID_XML.sub('', str(value)).replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+class XlsxEncoder:
+    """Single-sheet workbook with inline strings, written as rows arrive"""
+
+    def __init__(self, sheet: str):
+        self.sheet = sheet
+        self._sink = _Sink()
+        self._zip = zipfile.ZipFile(self._sink, 'w', zipfile.ZIP_DEFLATED)
+        self._rows = None
+
+    def begin(self, header: List[str]) -> bytes:
+        for name, xml in _XLSX_PARTS.items():
+            self._zip.writestr(name, xml)
+        sheet = self.sheet.replace('&', '&amp;').replace('<', '&lt;').replace('"', '&quot;')
+        self._zip.writestr('xl/workbook.xml', (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets><sheet name="{sheet}" sheetId="1" r:id="rId1"/></sheets></workbook>'
+        ))
+        self._rows = self._zip.open('xl/worksheets/sheet1.xml', 'w')
+        self._rows.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                         b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                         b'<sheetData>')
+        return self.rows([header])
+
+    def rows(self, rows: List[List]) -> bytes:
+        self._rows.write(''.join(
+            '<row>' + ''.join(_cell(value) for value in row) + '</row>' for row in rows
+        ).encode('utf-8'))
+        return self._sink.take()
+
+    def end(self) -> bytes:
+        self._rows.write(b'</sheetData></worksheet>')
+        self._rows.close()
+        self._zip.close()
+        return self._sink.take()
+
+
+def encoder(fmt: str, sheet: str):
+    return XlsxEncoder(sheet) if fmt == 'xlsx' else CsvEncoder()
+
+
+def stream(enc, header: List[str], rows: Iterable[List]) -> Iterator[bytes]:
+    """Encoded chunks of `rows`, EXPORT_BATCH_ROWS at a time"""
+    yield enc.begin(header)
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= EXPORT_BATCH_ROWS:
+            chunk = enc.rows(batch)
+            batch = []
+            # Deflate may hold data back until it has enough to compress
+            if chunk:
+                yield chunk
+    yield enc.rows(batch) + enc.end()
+
+
+async def stream_batches(enc, header: List[str], batches: AsyncIterator[List[List]]) -> AsyncIterator[bytes]:
+    """Encoded chunks of row batches produced asynchronously"""
+    yield enc.begin(header)
+    async for batch in batches:
+        chunk = enc.rows(batch)
+        if chunk:
+            yield chunk
+    yield enc.end()
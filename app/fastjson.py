@@ -0,0 +1,48 @@
+"""
+Fast JSON encoding and responses
+Uses orjson when it is installed and falls back to the stdlib json module
+otherwise. Both produce compact UTF-8 bytes.
+"""
+import hashlib
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+if orjson is not None:
+    def dumps(value: Any, default=None) -> bytes:
+        return orjson.dumps(value, default=default)
+
+    def loads(data) -> Any:
+        # orjson reads bytes, str and memoryview (e.g. a slice of an mmap) directly
+        return orjson.loads(data)
+else:
+    def dumps(value: Any, default=None) -> bytes:
+        return json.dumps(value, separators=(',', ':'), default=default).encode('utf-8')
+
+    def loads(data) -> Any:
+        return json.loads(bytes(data) if isinstance(data, memoryview) else data)
+
+
+def body_etag(body: bytes) -> str:
+    """Strong ETag derived from a serialized body, stable across snapshot versions"""
+    return '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when available"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class RawJSONResponse(Response):
+    """Response for bytes that are already serialized JSON"""
+
+    media_type = 'application/json'
@@ -0,0 +1,371 @@
+"""
+Per-survey history of completes and cost for trend charts
+The poller appends a sample to a SQLite file (HISTORY_PATH) on every list poll
+for each survey whose values changed since its last sample, and folds it into
+1-minute and 1-hour rollup tables (min, max, last per bucket) in the same
+transaction. Unchanged surveys store nothing: a query carries the previous
+value forward through empty buckets.
+
+A compaction job in the poller deletes rows older than each table's retention
+(raw samples first, then 1-minute rollups; their coarser rollups remain) in
+small transactions, always keeping each survey's newest row to carry forward,
+and returns the freed pages to the filesystem.
+
+Web workers open the file read-only; a query picks the coarsest table that
+fits the requested resolution and still covers the range, and re-buckets its
+rows with NumPy, so weeks of history come back in a few hundred rows without
+scanning raw samples.
+"""
+import asyncio
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from . import metrics
+from .models import Survey
+from .query import QueryError
+
+logger = logging.getLogger(__name__)
+
+HISTORY_PATH = Path(os.getenv("HISTORY_PATH", "purespectrum_history.sqlite3"))
+HISTORY_ENABLED = os.getenv("HISTORY_ENABLED", "1") == "1"
+# Default range and number of buckets of a history query
+HISTORY_DEFAULT_RANGE_SECONDS = 7 * 24 * 3600
+HISTORY_DEFAULT_POINTS = 200
+HISTORY_MAX_POINTS = 2000
+HISTORY_MAX_BULK = 100
+
+# How long each table keeps rows, 0 for ever
+HISTORY_RAW_RETENTION_SECONDS = float(os.getenv("HISTORY_RAW_RETENTION_SECONDS", str(2 * 24 * 3600)))
+HISTORY_1M_RETENTION_SECONDS = float(os.getenv("HISTORY_1M_RETENTION_SECONDS", str(30 * 24 * 3600)))
+HISTORY_1H_RETENTION_SECONDS = float(os.getenv("HISTORY_1H_RETENTION_SECONDS", "0"))
+HISTORY_COMPACT_INTERVAL_SECONDS = float(os.getenv("HISTORY_COMPACT_INTERVAL_SECONDS", "600"))
+# Rows deleted (or free pages released) per transaction, and the pause between
+# transactions that lets the poller's writes through
+HISTORY_COMPACT_BATCH = 2000
+HISTORY_COMPACT_PAUSE_SECONDS = 0.05
+
+# Recorded series: name -> Survey attribute
+FIELDS = {'completes': 'completes', 'cost': 'current_cost'}
+# Rollup table -> bucket width in seconds, coarsest first
+ROLLUPS = {'rollup_1h': 3600, 'rollup_1m': 60}
+
+_ROLLUP_COLUMNS = ', '.join(f'{name}_min REAL, {name}_max REAL, {name}_last REAL' for name in FIELDS)
+SCHEMA = [
+    f"""CREATE TABLE IF NOT EXISTS samples (
+        survey_id TEXT NOT NULL, ts REAL NOT NULL, {', '.join(f'{name} REAL' for name in FIELDS)},
+        PRIMARY KEY (survey_id, ts)) WITHOUT ROWID""",
+    *(f"""CREATE TABLE IF NOT EXISTS {table} (
+        survey_id TEXT NOT NULL, ts INTEGER NOT NULL, {_ROLLUP_COLUMNS},
+        PRIMARY KEY (survey_id, ts)) WITHOUT ROWID""" for table in ROLLUPS),
+]
+
+_INSERT_SAMPLE = (f"INSERT OR REPLACE INTO samples (survey_id, ts, {', '.join(FIELDS)}) "
+                  f"VALUES (?, ?, {', '.join('?' for _ in FIELDS)})")
+
+
+def _upsert_rollup(table: str) -> str:
+    columns = [f'{name}_{agg}' for name in FIELDS for agg in ('min', 'max', 'last')]
+    updates = ', '.join(
+        # SQLite's min()/max() return NULL if any argument is NULL
+        f'{name}_min = min(coalesce({name}_min, excluded.{name}_min), coalesce(excluded.{name}_min, {name}_min)), '
+        f'{name}_max = max(coalesce({name}_max, excluded.{name}_max), coalesce(excluded.{name}_max, {name}_max)), '
+        f'{name}_last = excluded.{name}_last'
+        for name in FIELDS
+    )
+    return (f"INSERT INTO {table} (survey_id, ts, {', '.join(columns)}) "
+            f"VALUES (?, ?, {', '.join('?' for _ in columns)}) "
+            f"ON CONFLICT (survey_id, ts) DO UPDATE SET {updates}")
+
+
+_UPSERT_ROLLUP = {table: _upsert_rollup(table) for table in ROLLUPS}
+
+# Finest first
+RETENTION = {
+    'samples': HISTORY_RAW_RETENTION_SECONDS,
+    'rollup_1m': HISTORY_1M_RETENTION_SECONDS,
+    'rollup_1h': HISTORY_1H_RETENTION_SECONDS,
+}
+
+# Oldest expired rows of one survey, never its newest row
+_DELETE_EXPIRED = {
+    table: f"""DELETE FROM {table} WHERE survey_id = ? AND ts IN (
+        SELECT ts FROM {table} WHERE survey_id = ? AND ts < ?
+        AND ts < (SELECT max(ts) FROM {table} WHERE survey_id = ?) ORDER BY ts LIMIT ?)"""
+    for table in RETENTION
+}
+
+
+class HistoryStore:
+    """SQLite history file; one writer (the poller) and any number of read-only workers"""
+
+    def __init__(self, path: Path = HISTORY_PATH, readonly: bool = False):
+        self.path = path
+        self.readonly = readonly
+        self._lock = threading.Lock()
+        # Readers query from a thread pool, one connection per thread
+        self._local = threading.local()
+        self._writer: Optional[sqlite3.Connection] = None
+        # Values of each survey's last written sample
+        self._last: Dict[str, Tuple] = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.readonly:
+            conn = getattr(self._local, 'conn', None)
+            if conn is None:
+                conn = self._local.conn = sqlite3.connect(f'file:{self.path}?mode=ro', uri=True,
+                                                          check_same_thread=False)
+            return conn
+        if self._writer is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            # Lets compaction give deleted pages back; files created before need one VACUUM
+            if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+                conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+                conn.execute('VACUUM')
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                conn.execute(statement)
+            conn.commit()
+            self._writer = conn
+        return self._writer
+
+    def record(self, surveys: Dict[str, Survey], ts: Optional[float] = None) -> int:
+        """Append a sample for each survey that changed and update the rollups; returns samples written"""
+        ts = time.time() if ts is None else ts
+        samples = []
+        for survey_id, survey in surveys.items():
+            values = tuple(getattr(survey, attr) for attr in FIELDS.values())
+            if self._last.get(survey_id) != values:
+                samples.append((survey_id, ts, *values))
+        if not samples:
+            return 0
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany(_INSERT_SAMPLE, samples)
+                for table, width in ROLLUPS.items():
+                    bucket = int(ts // width * width)
+                    conn.executemany(_UPSERT_ROLLUP[table], [
+                        (survey_id, bucket, *(v for value in values for v in (value, value, value)))
+                        for survey_id, _, *values in samples
+                    ])
+            for survey_id, _, *values in samples:
+                self._last[survey_id] = tuple(values)
+        return len(samples)
+
+    def survey_ids(self) -> List[str]:
+        """Every survey with history (each keeps at least its newest hourly row)"""
+        with self._lock:
+            return [row[0] for row in self._connect().execute('SELECT DISTINCT survey_id FROM rollup_1h')]
+
+    def compact_batch(self, table: str, survey_ids: List[str], cutoff: float,
+                      limit: int = HISTORY_COMPACT_BATCH) -> Tuple[int, List[str]]:
+        """
+        Delete up to `limit` rows older than `cutoff` from `table` in one transaction
+
+        Returns:
+            (rows deleted, surveys that may still have expired rows)
+        """
+        deleted = 0
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                for i, survey_id in enumerate(survey_ids):
+                    deleted += conn.execute(_DELETE_EXPIRED[table],
+                                            (survey_id, survey_id, cutoff, survey_id, limit - deleted)).rowcount
+                    if deleted >= limit:
+                        return deleted, survey_ids[i:]
+        return deleted, []
+
+    def reclaim_batch(self, pages: int = HISTORY_COMPACT_BATCH) -> int:
+        """Return up to `pages` free pages to the filesystem; returns free pages left"""
+        with self._lock:
+            conn = self._connect()
+            # executescript steps the pragma to completion (execute frees one page)
+            conn.executescript(f'PRAGMA incremental_vacuum({int(pages)})')
+            return conn.execute('PRAGMA freelist_count').fetchone()[0]
+
+    def checkpoint(self):
+        """Fold the write-ahead log back into the database file and truncate it"""
+        with self._lock:
+            self._connect().execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchone()
+
+    def size(self) -> int:
+        """Bytes on disk, write-ahead log included"""
+        total = 0
+        for suffix in ('', '-wal', '-shm'):
+            try:
+                total += os.path.getsize(f'{self.path}{suffix}')
+            except OSError:
+                pass
+        return total
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def series(self, survey_ids: List[str], start: float, end: float, resolution: float) -> Tuple[Dict, str, float]:
+        """
+        Downsampled series of each survey between `start` and `end`
+
+        Returns:
+            (survey ID -> series, source table, effective resolution); each
+            series is {"t": [...], "<field>": {"min": [...], "max": [...], "last": [...]}}
+            with t the bucket start
+        """
+        widths = {'samples': 0, **ROLLUPS}
+        table = next((name for name, size in ROLLUPS.items() if resolution >= size), 'samples')
+        # Older rows are only kept at coarser resolutions
+        tiers = list(RETENTION)
+        now = time.time()
+        for table in tiers[tiers.index(table):]:
+            if not RETENTION[table] or start >= now - RETENTION[table]:
+                break
+        width = widths[table]
+        if width:
+            # Whole source buckets only, so no rollup row straddles two output buckets
+            resolution = math.ceil(resolution / width) * width
+        start = math.floor(start / resolution) * resolution
+        count = math.ceil((end - start) / resolution)
+
+        if table == 'samples':
+            columns = ', '.join(f'{name}, {name}, {name}' for name in FIELDS)
+        else:
+            columns = ', '.join(f'{name}_min, {name}_max, {name}_last' for name in FIELDS)
+        placeholders = ', '.join('?' for _ in survey_ids)
+        sql = (f"SELECT survey_id, ts, {columns} FROM {table} "
+               f"WHERE survey_id IN ({placeholders}) AND ts >= ? AND ts < ? ORDER BY survey_id, ts")
+        # Each survey's last row before the range, the value it starts at
+        seed_sql = (f"SELECT survey_id, max(ts), {columns} FROM {table} "
+                    f"WHERE survey_id IN ({placeholders}) AND ts < ? GROUP BY survey_id")
+        try:
+            conn = self._connect()
+            rows = conn.execute(sql, (*survey_ids, start, end)).fetchall()
+            seeds = {row[0]: row[1:] for row in conn.execute(seed_sql, (*survey_ids, start))}
+        except sqlite3.OperationalError as e:
+            # No history file yet (the poller has not recorded anything)
+            logger.debug(f"History query failed: {e}")
+            rows, seeds = [], {}
+
+        result = {survey_id: _empty_series() for survey_id in survey_ids}
+        ids = [row[0] for row in rows]
+        values = np.array([row[1:] for row in rows], dtype=np.float64).reshape(len(rows), 1 + 3 * len(FIELDS))
+        bounds = [0] + [i for i in range(1, len(ids)) if ids[i] != ids[i - 1]] + [len(ids)]
+        spans = {ids[lo]: (lo, hi) for lo, hi in zip(bounds, bounds[1:]) if hi > lo}
+        for survey_id in survey_ids:
+            if survey_id not in spans and survey_id not in seeds:
+                continue
+            lo, hi = spans.get(survey_id, (0, 0))
+            seed = seeds.get(survey_id)
+            seed = None if seed is None else np.array(seed, dtype=np.float64)
+            result[survey_id] = _downsample(values[lo:hi], seed, start, resolution, count)
+        return result, table, resolution
+
+
+def _empty_series() -> Dict:
+    return {'t': [], **{name: {'min': [], 'max': [], 'last': []} for name in FIELDS}}
+
+
+def _listed(values: np.ndarray) -> List:
+    return [None if v != v else v for v in values.tolist()]
+
+
+def _downsample(values: np.ndarray, seed: Optional[np.ndarray], start: float, resolution: float,
+                count: int) -> Dict:
+    """
+    Re-bucket rows of (ts, min, max, last per field) sorted by ts into `count`
+    buckets; empty buckets hold the value carried from the previous one (or the
+    seed row before the range), which also bounds the next bucket's min and max
+    """
+    index = ((values[:, 0] - start) // resolution).astype(np.int64)
+    firsts = np.flatnonzero(np.r_[True, index[1:] != index[:-1]]) if len(index) else index
+    lasts = np.r_[firsts[1:], len(index)] - 1
+    buckets = index[firsts]
+    positions = np.arange(count + 1)
+    series = {'t': (start + positions[:-1] * resolution).tolist()}
+    for i, name in enumerate(FIELDS):
+        column = 1 + 3 * i
+        low, high = np.full(count, np.nan), np.full(count, np.nan)
+        # last[0] is the value before the first bucket
+        last = np.full(count + 1, np.nan)
+        if seed is not None:
+            last[0] = seed[column + 2]
+        if len(index):
+            low[buckets] = np.fmin.reduceat(values[:, column], firsts)
+            high[buckets] = np.fmax.reduceat(values[:, column + 1], firsts)
+            last[buckets + 1] = values[lasts, column + 2]
+        last = last[np.maximum.accumulate(np.where(np.isnan(last), 0, positions))]
+        carried, last = last[:-1], last[1:]
+        series[name] = {
+            'min': _listed(np.fmin(low, carried)),
+            'max': _listed(np.fmax(high, carried)),
+            'last': _listed(last),
+        }
+    return series
+
+
+def parse_range(start: Optional[float], end: Optional[float], resolution: Optional[float],
+                points: Optional[int]) -> Tuple[float, float, float]:
+    """Validated (start, end, resolution) for a history query, with defaults"""
+    end = time.time() if end is None else end
+    start = end - HISTORY_DEFAULT_RANGE_SECONDS if start is None else start
+    if start >= end:
+        raise QueryError("start must be before end")
+    if resolution is None:
+        points = HISTORY_DEFAULT_POINTS if points is None else points
+        if not 1 <= points <= HISTORY_MAX_POINTS:
+            raise QueryError(f"points must be between 1 and {HISTORY_MAX_POINTS}")
+        resolution = (end - start) / points
+    elif resolution <= 0:
+        raise QueryError("resolution must be positive")
+    elif (end - start) / resolution > HISTORY_MAX_POINTS:
+        raise QueryError(f"Too many buckets, use a resolution of at least {(end - start) / HISTORY_MAX_POINTS:.0f}s")
+    return start, end, max(1.0, resolution)
+
+
+async def compact(store: HistoryStore):
+    """One compaction pass: expire rows table by table, then release the freed pages"""
+    before = store.size()
+    started = time.perf_counter()
+    survey_ids = await asyncio.to_thread(store.survey_ids)
+    deleted = 0
+    for table, retention in RETENTION.items():
+        if not retention:
+            continue
+        cutoff = time.time() - retention
+        pending = survey_ids
+        while pending:
+            count, pending = await asyncio.to_thread(store.compact_batch, table, pending, cutoff)
+            deleted += count
+            metrics.HISTORY_COMPACTED_ROWS.labels(table).inc(count)
+            await asyncio.sleep(HISTORY_COMPACT_PAUSE_SECONDS)
+    while await asyncio.to_thread(store.reclaim_batch):
+        await asyncio.sleep(HISTORY_COMPACT_PAUSE_SECONDS)
+    await asyncio.to_thread(store.checkpoint)
+
+    after = store.size()
+    metrics.HISTORY_BYTES.labels('before').set(before)
+    metrics.HISTORY_BYTES.labels('after').set(after)
+    metrics.HISTORY_COMPACTION_SECONDS.observe(time.perf_counter() - started)
+    if deleted:
+        logger.info(f"🗜️  History compacted: {deleted} rows deleted, "
+                    f"{before / 1e6:.1f} MB -> {after / 1e6:.1f} MB")
+
+
+async def run_compaction(store: HistoryStore, interval: float = HISTORY_COMPACT_INTERVAL_SECONDS):
+    """Compact the history every `interval` seconds, starting right away"""
+    while True:
+        try:
+            await compact(store)
+        except Exception as e:
+            logger.error(f"History compaction failed: {e}")
+        await asyncio.sleep(interval)
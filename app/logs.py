@@ -0,0 +1,122 @@
+"""
+Structured, non-blocking logging
+setup_logging() puts every log handler behind a QueueHandler. The logging call
+only appends the record to an in-memory queue; a QueueListener thread formats
+and writes it, so slow disks or log shippers never stall the event loop.
+
+Records are JSON lines carrying the request ID (bound when the record is
+created) and any `extra=` fields such as survey_id and duration_ms.
+High-volume per-call messages pass `extra=sampled(key, ...)` and only one in
+LOG_SAMPLE_EVERY of them is kept per key; warnings and errors always are.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, List, Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# "json" for log shippers, "text" for reading in a terminal
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_SAMPLE_EVERY = max(1, int(os.getenv("LOG_SAMPLE_EVERY", "20")))
+TEXT_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+
+request_id: ContextVar[Optional[str]] = ContextVar('request_id', default=None)
+
+# Everything on a LogRecord that did not come from `extra=`
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'sample_key'}
+
+
+def sampled(key: str, **fields) -> Dict:
+    """`extra=` for a high-volume message, sampled per `key`"""
+    return {'sample_key': key, **fields}
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep one in `every` records per sample_key below WARNING"""
+
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = every
+        self._counts: Dict[str, int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, 'sample_key', None)
+        if key is None or self.every == 1 or record.levelno >= logging.WARNING:
+            return True
+        count = self._counts.get(key, 0)
+        self._counts[key] = count + 1
+        if count % self.every:
+            return False
+        record.sample_rate = self.every
+        return True
+
+
+class ContextQueueHandler(QueueHandler):
+    """Enqueue records unformatted, after binding the current request ID"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The listener thread cannot see this request's context variables,
+        # and formatting is left to it (uvicorn's access formatter needs `args`)
+        if getattr(record, 'request_id', None) is None:
+            record.request_id = request_id.get()
+        return record
+
+
+_listeners: List[QueueListener] = []
+
+
+def _queue_handlers(logger: logging.Logger, handlers: List[logging.Handler]):
+    """Replace the logger's handlers with a queue drained by `handlers` on a thread"""
+    records = queue.SimpleQueue()
+    handler = ContextQueueHandler(records)
+    handler.addFilter(SamplingFilter(LOG_SAMPLE_EVERY))
+    listener = QueueListener(records, *handlers, respect_handler_level=True)
+    logger.handlers = [handler]
+    listener.start()
+    _listeners.append(listener)
+
+
+def setup_logging():
+    """Route the root and uvicorn loggers through queues (safe to call twice)"""
+    if _listeners:
+        return
+    stream = logging.StreamHandler(sys.stderr)
+    stream.setFormatter(JSONFormatter() if LOG_FORMAT == 'json' else logging.Formatter(TEXT_FORMAT))
+    root = logging.getLogger()
+    root.setLevel(LOG_LEVEL)
+    _queue_handlers(root, [stream])
+
+    # uvicorn's loggers have their own handlers and do not propagate;
+    # keep their format but take the writes off the event loop too
+    for name in ('uvicorn', 'uvicorn.access'):
+        logger = logging.getLogger(name)
+        if logger.handlers:
+            _queue_handlers(logger, list(logger.handlers))
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Flush queued records and stop the listener threads"""
+    while _listeners:
+        _listeners.pop().stop()
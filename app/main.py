@@ -3,16 +3,52 @@ PureSpectrum Survey Dashboard
 Web dashboard for monitoring survey status and quotas
 """
 import os
-from fastapi import FastAPI
+import asyncio
+import uuid
+from contextlib import asynccontextmanager
+from typing import Literal, Optional
+from fastapi import FastAPI, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import PlainTextResponse, HTMLResponse
 from dotenv import load_dotenv
 
-from .web_dashboard import dashboard_home, get_surveys, get_quotas
+from . import logs, metrics, timing
+from .fastjson import FastJSONResponse
+from .web_dashboard import (
+	dashboard_home, get_surveys, get_quotas, get_summary, get_readiness, get_schedule, get_alerts,
+	get_history, get_export, record_view, warm_snapshot,
+)
+from .accounts import get_accounts
+from .snapshot import PollerLock
 
 load_dotenv()
-
-app = FastAPI(title="Survey Dashboard")
+logs.setup_logging()
+
+# Set RUN_POLLER=0 when the poller runs as its own process (python -m app.poller)
+RUN_POLLER = os.getenv("RUN_POLLER", "1") == "1"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+	"""Serve the snapshot left on disk right away, then start the poller election; only one worker ends up polling"""
+	warm_snapshot()
+	task = None
+	lock = PollerLock()
+	accounts = [account for account in get_accounts() if account.configured]
+	if RUN_POLLER and accounts:
+		from .poller import run_if_elected
+		task = asyncio.create_task(run_if_elected(accounts, lock))
+	yield
+	if task is not None:
+		task.cancel()
+		try:
+			await task
+		except asyncio.CancelledError:
+			pass
+	lock.release()
+
+
+app = FastAPI(title="Survey Dashboard", lifespan=lifespan, default_response_class=FastJSONResponse)
 
 # Enable CORS for GitHub Pages and other origins
 app.add_middleware(
@@ -24,12 +60,60 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def track_requests(request: Request, call_next):
+	"""Count requests per route and track how many are in flight"""
+	metrics.HTTP_INFLIGHT.inc()
+	status = 500
+	try:
+		response = await call_next(request)
+		status = response.status_code
+		return response
+	finally:
+		metrics.HTTP_INFLIGHT.dec()
+		route = request.scope.get("route")
+		metrics.HTTP_REQUESTS.labels(route.path if route else "unmatched", status).inc()
+
+
+@app.middleware("http")
+async def server_timing(request: Request, call_next):
+	"""Expose per-phase timings in a Server-Timing header and log slow requests"""
+	timings = timing.start_request()
+	response = await call_next(request)
+	total_ms = timings.total_ms
+	response.headers["Server-Timing"] = timings.server_timing(total_ms)
+	timing.log_if_slow(request.method, request.url.path, response.status_code, timings, total_ms)
+	return response
+
+
+@app.middleware("http")
+async def request_context(request: Request, call_next):
+	"""Tag every log record of a request with its ID (X-Request-ID or a new one)"""
+	request_id = request.headers.get("x-request-id") or uuid.uuid4().hex[:16]
+	logs.request_id.set(request_id)
+	response = await call_next(request)
+	response.headers["X-Request-ID"] = request_id
+	return response
+
+
 @app.get("/healthz")
 async def healthz():
 	"""Health check endpoint"""
 	return PlainTextResponse("ok")
 
 
+@app.get("/readyz")
+async def readyz():
+	"""Readiness check: 503 until a survey snapshot is available to serve"""
+	return await get_readiness()
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+	"""Prometheus metrics for this worker"""
+	return PlainTextResponse(metrics.render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/")
 async def root():
 	"""Redirect root to dashboard"""
@@ -39,19 +123,99 @@ async def root():
 @app.get("/dashboard", response_class=HTMLResponse)
 async def dashboard():
 	"""Web dashboard for survey monitoring"""
-	return await dashboard_home()
+	with timing.phase("render"):
+		return await dashboard_home()
 
 
 @app.get("/api/surveys")
-async def api_surveys():
-	"""API endpoint to get all live surveys"""
-	return await get_surveys()
+async def api_surveys(
+	request: Request,
+	status: Optional[str] = None,
+	country: Optional[str] = None,
+	billing_id: Optional[str] = None,
+	account: Optional[str] = None,
+	q: Optional[str] = None,
+	sort: Optional[str] = None,
+	offset: int = Query(0, ge=0),
+	limit: Optional[int] = Query(None, ge=1, le=1000),
+):
+	"""API endpoint to get live surveys, optionally filtered, searched, sorted and paged"""
+	filters = {"status": status, "country": country, "billing_id": billing_id, "account": account}
+	return await get_surveys(filters, q, sort, offset, limit, request.headers.get("if-none-match"))
+
+
+@app.post("/api/quotas/{survey_id}/view", status_code=204)
+async def api_quota_view(survey_id: str):
+	"""Heartbeat from an open quota row; its survey is refreshed more often"""
+	return record_view(survey_id)
+
+
+@app.get("/api/summary")
+async def api_summary(request: Request):
+	"""API endpoint for portfolio-level KPIs"""
+	return await get_summary(request.headers.get("if-none-match"))
 
 
 @app.get("/api/quotas/{survey_id}")
-async def api_quotas(survey_id: str):
+async def api_quotas(survey_id: str, request: Request):
 	"""API endpoint to get quotas for a specific survey"""
-	return await get_quotas(survey_id)
+	return await get_quotas(survey_id, request.headers.get("if-none-match"))
+
+
+@app.get("/api/alerts")
+async def api_alerts(request: Request, state: Optional[str] = None, survey_id: Optional[str] = None):
+	"""API endpoint for firing (or resolved) threshold alerts"""
+	return await get_alerts(state, survey_id, request.headers.get("if-none-match"))
+
+
+@app.get("/api/export/{table}.{fmt}")
+async def api_export(
+	table: Literal["surveys", "quotas"],
+	fmt: str,
+	status: Optional[str] = None,
+	country: Optional[str] = None,
+	billing_id: Optional[str] = None,
+	account: Optional[str] = None,
+	q: Optional[str] = None,
+	sort: Optional[str] = None,
+	start: Optional[float] = None,
+	end: Optional[float] = None,
+	resolution: Optional[float] = None,
+	points: Optional[int] = None,
+):
+	"""Download surveys or quotas as CSV or Excel (.csv / .xlsx), filtered like /api/surveys"""
+	filters = {"status": status, "country": country, "billing_id": billing_id, "account": account}
+	return await get_export(table, fmt, filters, q, sort, start, end, resolution, points)
+
+
+@app.get("/api/history")
+async def api_history_bulk(
+	ids: str,
+	start: Optional[float] = None,
+	end: Optional[float] = None,
+	resolution: Optional[float] = None,
+	points: Optional[int] = None,
+):
+	"""Bulk trend history for comma-separated survey IDs"""
+	return await get_history([i for i in ids.split(",") if i], start, end, resolution, points)
+
+
+@app.get("/api/history/{survey_id}")
+async def api_history(
+	survey_id: str,
+	start: Optional[float] = None,
+	end: Optional[float] = None,
+	resolution: Optional[float] = None,
+	points: Optional[int] = None,
+):
+	"""Downsampled completes/cost history of one survey for trend charts"""
+	return await get_history(survey_id, start, end, resolution, points)
+
+
+@app.get("/api/schedule")
+async def api_schedule():
+	"""Debugging endpoint for the poller's per-survey quota refresh schedule"""
+	return await get_schedule()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,283 @@
+"""
+Prometheus-style metrics for the dashboard
+Minimal in-process counters, gauges and histograms rendered in the Prometheus
+text exposition format. Most updates happen on the asyncio event loop, but the
+poller also updates metrics from worker threads (snapshot publishing, alert
+evaluation, history writes), so each child guards its read-modify-write
+updates with its own lock. An uncontended lock costs well under a microsecond,
+so metrics stay cheap enough to keep on in production. Each worker process
+exposes its own values.
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Tuple
+
+# Upstream calls are mostly 50ms-5s, poll cycles can take much longer
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+CYCLE_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class _CounterChild:
+    __slots__ = ('value', '_lock')
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeChild(_CounterChild):
+    __slots__ = ()
+
+    def set(self, value: float):
+        self.value = value
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+
+class _HistogramChild:
+    __slots__ = ('buckets', 'counts', 'sum', 'count', '_lock')
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        bucket = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[bucket] += 1
+            self.sum += value
+            self.count += 1
+
+    def read(self) -> Tuple[List[int], float, int]:
+        """Consistent (bucket counts, sum, count)"""
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+    def time(self):
+        return _Timer(self)
+
+
+class _Timer:
+    __slots__ = ('child', 'start')
+
+    def __init__(self, child: _HistogramChild):
+        self.child = child
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.start)
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+        REGISTRY.append(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, child in list(self._children.items()):
+            lines.append(f'{self.name}{_format_labels(self.labelnames, key)} {child.value}')
+        return lines
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        lines.extend(self._samples())
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._children[()].inc(amount)
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self._children[()].set(value)
+
+    def inc(self, amount: float = 1.0):
+        self._children[()].inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._children[()].dec(amount)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._children[()].observe(value)
+
+    def time(self):
+        return self._children[()].time()
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, child in list(self._children.items()):
+            counts, total, count = child.read()
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                labels = _format_labels(self.labelnames, key, f'le="{le}"')
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f'{self.name}_sum{labels} {total}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+REGISTRY: List[_Metric] = []
+
+
+def render_metrics() -> str:
+    """Render every registered metric in Prometheus text format"""
+    return '\n'.join(metric.render() for metric in REGISTRY) + '\n'
+
+
+# Upstream PureSpectrum API
+UPSTREAM_LATENCY = Histogram(
+    'purespectrum_upstream_request_seconds',
+    'Latency of PureSpectrum API calls by account and endpoint',
+    ['account', 'endpoint'],
+)
+UPSTREAM_RESPONSES = Counter(
+    'purespectrum_upstream_responses_total',
+    'PureSpectrum API responses by account, endpoint and HTTP status',
+    ['account', 'endpoint', 'status'],
+)
+UPSTREAM_ERRORS = Counter(
+    'purespectrum_upstream_errors_total',
+    'PureSpectrum API calls that failed with an exception',
+    ['account', 'endpoint', 'error'],
+)
+UPSTREAM_RATE_LIMIT_WAIT = Histogram(
+    'purespectrum_upstream_rate_limit_wait_seconds',
+    'Time PureSpectrum API calls waited for the account rate limit, by account and endpoint',
+    ['account', 'endpoint'],
+)
+AUTH_TOKEN_EXPIRES_IN = Gauge(
+    'purespectrum_auth_token_expires_in_seconds',
+    'Seconds until the PureSpectrum JWT expires (negative once expired)',
+    ['account'],
+)
+AUTH_RELOADS = Counter('purespectrum_auth_reloads_total', 'Auth token loads by account and source',
+                       ['account', 'source'])
+
+# Snapshot cache
+CACHE_REQUESTS = Counter(
+    'dashboard_cache_requests_total',
+    'API reads served from the snapshot (hit), an old snapshot (stale) or upstream (miss)',
+    ['cache', 'result'],
+)
+COALESCED_REQUESTS = Counter(
+    'dashboard_coalesced_requests_total',
+    'Cache misses that joined an upstream fetch already in flight instead of starting one',
+    ['cache'],
+)
+SNAPSHOT_VERSION = Gauge('dashboard_snapshot_version', 'Version of the snapshot last read or published')
+SNAPSHOT_BYTES = Gauge('dashboard_snapshot_bytes', 'Serialized size of the current snapshot')
+SNAPSHOT_SURVEYS = Gauge('dashboard_snapshot_surveys', 'Number of surveys in the current snapshot')
+SNAPSHOT_AGE = Gauge('dashboard_snapshot_age_seconds', 'Age of the snapshot at the last API read')
+
+# Poller
+POLL_CYCLE_SECONDS = Histogram(
+    'dashboard_poll_cycle_seconds',
+    'Duration of a poll cycle (survey list plus the quota refreshes due with it)',
+    buckets=CYCLE_BUCKETS,
+)
+POLL_CYCLES = Counter('dashboard_poll_cycles_total', 'Poll cycles by account and outcome', ['account', 'result'])
+SCHEDULED_REFRESHES = Counter(
+    'dashboard_scheduled_quota_refreshes_total',
+    'Quota refreshes run by the poll scheduler by account and scheduling reason',
+    ['account', 'reason'],
+)
+SCHEDULE_LAG = Histogram(
+    'dashboard_schedule_lag_seconds',
+    'How long due quota refreshes waited (mostly for the request budget)',
+    buckets=CYCLE_BUCKETS,
+)
+
+# Alerts
+ALERTS_FIRING = Gauge('dashboard_alerts_firing', 'Alerts currently firing by rule', ['rule'])
+ALERT_TRANSITIONS = Counter('dashboard_alert_transitions_total', 'Alerts that fired or resolved by rule', ['rule', 'state'])
+ALERT_EVALUATION_SECONDS = Histogram('dashboard_alert_evaluation_seconds', 'Duration of one incremental alert evaluation')
+
+# History
+HISTORY_SAMPLES = Counter(
+    'dashboard_history_samples_total',
+    'Survey samples offered to the history by result (written, or unchanged and skipped)',
+    ['result'],
+)
+HISTORY_BYTES = Gauge(
+    'dashboard_history_bytes',
+    'History database size on disk before and after the last compaction pass',
+    ['stage'],
+)
+HISTORY_COMPACTED_ROWS = Counter('dashboard_history_compacted_rows_total', 'History rows expired by table', ['table'])
+HISTORY_COMPACTION_SECONDS = Histogram(
+    'dashboard_history_compaction_seconds',
+    'Duration of one history compaction pass',
+    buckets=CYCLE_BUCKETS,
+)
+
+# Clients
+HTTP_REQUESTS = Counter('dashboard_http_requests_total', 'HTTP requests by route and status', ['route', 'status'])
+HTTP_INFLIGHT = Gauge('dashboard_http_inflight_requests', 'HTTP requests currently being served')
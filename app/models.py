@@ -0,0 +1,258 @@
+"""
+Compact survey and quota models
+Slotted classes holding only the fields the dashboard uses; the full upstream
+payload is kept as compact JSON bytes and decoded only when `raw` is accessed.
+Both classes still answer `.get()` with the original dict keys, and serialize
+back to the exact JSON shape the API has always returned.
+"""
+import logging
+from typing import Dict, Iterable, List, Optional
+
+from .accounts import namespaced
+from .fastjson import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+STATUS_NAMES = {
+    22: 'Active',  # or 'All' - needs confirmation
+    33: 'Paused',
+    # Add more as we discover them
+}
+
+
+def map_status(status_code) -> str:
+    """Map PureSpectrum status codes to human-readable strings"""
+    return STATUS_NAMES.get(status_code, f'Status {status_code}')
+
+
+def generate_quota_name(quota):
+    """Generate meaningful quota name from criteria"""
+    criteria = quota.get('criteria', [])
+    if not criteria:
+        return quota.get('quota_title', 'General Quota')
+
+    parts = []
+    for criterion in criteria:
+        qual_name = criterion.get('qualification_name', '')
+        conditions = criterion.get('condition_names', [])
+
+        if qual_name == 'Gender' and conditions:
+            parts.append(conditions[0])
+        elif qual_name == 'Age':
+            range_sets = criterion.get('range_sets', [])
+            if range_sets:
+                range = range_sets[0]
+                from_age = range.get('from', '')
+                to_age = range.get('to', '')
+                if from_age and to_age:
+                    parts.append(f"{from_age}-{to_age} yr")
+
+    return ', '.join(parts) if parts else quota.get('quota_title', 'General Quota')
+
+
+class Survey:
+    """One survey, normalized from the PureSpectrum list or detail endpoint"""
+
+    __slots__ = ('survey_id', 'title', 'status_code', 'completes', 'target', 'quotas', 'cpi',
+                 'loi', 'incidence', 'billing_id', 'country_code', 'locale', 'launch_date',
+                 'last_complete_date', 'current_cost', 'updated_at', 'account', '_raw_json')
+
+    # Public JSON key -> attribute, in the order the API has always used;
+    # `account` is only serialized when several accounts are configured
+    KEYS = {
+        'surveyId': 'survey_id',
+        'title': 'title',
+        'status': 'status',
+        'statusCode': 'status_code',
+        'completes': 'completes',
+        'target': 'target',
+        'quotas': 'quotas',
+        'cpi': 'cpi',
+        'loi': 'loi',
+        'incidence': 'incidence',
+        'billingId': 'billing_id',
+        'countryCode': 'country_code',
+        'locale': 'locale',
+        'launchDate': 'launch_date',
+        'lastCompleteDate': 'last_complete_date',
+        'currentCost': 'current_cost',
+        'updatedAt': 'updated_at',
+        'account': 'account',
+    }
+    RECORD_FIELDS = __slots__[:-1]
+
+    @classmethod
+    def from_api(cls, data: Dict, account: Optional[str] = None) -> 'Survey':
+        """Map a raw PureSpectrum survey to our standard format"""
+        survey = cls.__new__(cls)
+        survey.survey_id = str(data.get('ps_survey_id') or data.get('id') or data.get('_id', 'unknown'))
+        survey.title = data.get('survey_title') or data.get('title', 'Untitled')
+        survey.status_code = data.get('ps_survey_status')
+        survey.completes = data.get('fielded', 0)
+        survey.target = data.get('completes_required', 0)
+        survey.quotas = data.get('quotas', [])
+        survey.cpi = data.get('average_cpi', 0)
+        survey.loi = data.get('expected_loi', 0)
+        survey.incidence = data.get('expected_ir') or data.get('current_incidence', 0)
+        survey.billing_id = data.get('billing_id', '')
+        survey.country_code = data.get('country_code', '')
+        survey.locale = data.get('locale', {})
+        survey.launch_date = data.get('survey_launch_date')
+        survey.last_complete_date = data.get('project_last_complete_date')
+        survey.current_cost = data.get('current_cost', 0)
+        survey.updated_at = data.get('project_last_complete_date') or data.get('mod_on', '')
+        survey.account = account
+        survey._raw_json = dumps(data)
+        return survey
+
+    @classmethod
+    def from_record(cls, record: List) -> 'Survey':
+        """Rebuild from `to_record()` output without re-parsing the raw payload"""
+        survey = cls.__new__(cls)
+        for name, value in zip(cls.RECORD_FIELDS, record):
+            setattr(survey, name, value)
+        survey._raw_json = record[-1].encode('utf-8')
+        return survey
+
+    def to_record(self) -> List:
+        """Compact list form used in the shared snapshot"""
+        return [getattr(self, name) for name in self.RECORD_FIELDS] + [self._raw_json.decode('utf-8')]
+
+    @property
+    def status(self) -> str:
+        return map_status(self.status_code)
+
+    @property
+    def raw(self) -> Dict:
+        """Full upstream payload, decoded on each access"""
+        return loads(self._raw_json)
+
+    @property
+    def raw_json(self) -> bytes:
+        return self._raw_json
+
+    def get(self, key: str, default=None):
+        """Dict-style access using the original API keys (including `_raw`)"""
+        if key == '_raw':
+            return self.raw
+        attr = self.KEYS.get(key)
+        if attr is None:
+            return default
+        return getattr(self, attr)
+
+    def __getitem__(self, key: str):
+        if key != '_raw' and key not in self.KEYS:
+            raise KeyError(key)
+        return self.get(key)
+
+    def fields(self) -> Dict:
+        """Public fields without `_raw`"""
+        data = {key: getattr(self, attr) for key, attr in self.KEYS.items()}
+        if not namespaced():
+            del data['account']
+        return data
+
+    def to_dict(self) -> Dict:
+        data = self.fields()
+        data['_raw'] = self.raw
+        return data
+
+    def to_json(self) -> bytes:
+        """Serialize to the API JSON shape, splicing in the stored raw bytes"""
+        head = dumps(self.fields())
+        return head[:-1] + b',"_raw":' + self._raw_json + b'}'
+
+    def __repr__(self):
+        return f'<Survey {self.survey_id} {self.title!r} {self.completes}/{self.target}>'
+
+
+class Quota:
+    """One quota row; the API shape is the raw upstream quota"""
+
+    __slots__ = ('quota_id', 'group_key', 'achieved', 'required_count', 'current_target',
+                 'currently_open', 'in_progress', '_raw_json')
+
+    RECORD_FIELDS = __slots__[:-1]
+
+    @classmethod
+    def from_api(cls, data: Dict) -> 'Quota':
+        quota = cls.__new__(cls)
+        quota.quota_id = data.get('quota_id') or data.get('id')
+        quota.group_key = data.get('group_key')
+        quota.achieved = data.get('achieved')
+        quota.required_count = data.get('required_count')
+        quota.current_target = data.get('current_target')
+        quota.currently_open = data.get('currently_open')
+        quota.in_progress = data.get('in_progress')
+        quota._raw_json = dumps(data)
+        return quota
+
+    @classmethod
+    def from_record(cls, record: List) -> 'Quota':
+        quota = cls.__new__(cls)
+        for name, value in zip(cls.RECORD_FIELDS, record):
+            setattr(quota, name, value)
+        quota._raw_json = record[-1].encode('utf-8')
+        return quota
+
+    def to_record(self) -> List:
+        return [getattr(self, name) for name in self.RECORD_FIELDS] + [self._raw_json.decode('utf-8')]
+
+    @property
+    def raw(self) -> Dict:
+        return loads(self._raw_json)
+
+    @property
+    def raw_json(self) -> bytes:
+        return self._raw_json
+
+    @property
+    def name(self) -> str:
+        return generate_quota_name(self.raw)
+
+    def get(self, key: str, default=None):
+        """Dict-style access to upstream keys; common numbers skip decoding"""
+        if key in self.RECORD_FIELDS:
+            value = getattr(self, key)
+            return default if value is None else value
+        return self.raw.get(key, default)
+
+    def __getitem__(self, key: str):
+        return self.raw[key]
+
+    def to_dict(self) -> Dict:
+        return self.raw
+
+    def to_json(self) -> bytes:
+        return self._raw_json
+
+    def __repr__(self):
+        return f'<Quota {self.quota_id} {self.achieved}/{self.required_count}>'
+
+
+def encode_survey_map(surveys: Dict[str, Survey]) -> bytes:
+    """`{"surveys": {...}}` body built from each survey's own serialization"""
+    items = b','.join(dumps(survey_id) + b':' + survey.to_json() for survey_id, survey in surveys.items())
+    return b'{"surveys":{' + items + b'}}'
+
+
+def encode_quota_list(quotas: Iterable[Quota]) -> bytes:
+    """`{"quotas": [...]}` body; quotas serialize as their stored raw bytes"""
+    return b'{"quotas":[' + b','.join(quota.to_json() for quota in quotas) + b']}'
+
+
+def encode_model(obj):
+    """`default=` hook for json.dumps on payloads containing models"""
+    if isinstance(obj, (Survey, Quota)):
+        return obj.to_dict()
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def parse_quotas(data, survey_id: Optional[str] = None) -> List[Quota]:
+    """Quotas from an upstream list; malformed items are logged and skipped"""
+    if not isinstance(data, list):
+        return []
+    quotas = [Quota.from_api(q) for q in data if isinstance(q, dict)]
+    if len(quotas) < len(data):
+        logger.warning(f"⚠️  Skipped {len(data) - len(quotas)} malformed quota item(s)", extra={'survey_id': survey_id})
+    return quotas
@@ -0,0 +1,256 @@
+"""
+Background poller for PureSpectrum survey data
+Fetches each account's survey list on a fixed cadence and refreshes quotas per
+survey on an adaptive schedule (scheduler.py), refetching only surveys that
+changed (quota_cache.py). Everything is published to the shared snapshot, with
+the alerts it triggers (alerts.py), so web workers never call the upstream API
+themselves
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, List, Optional
+
+import aiohttp
+
+from . import metrics
+from .accounts import Account, get_accounts, survey_key
+from .alerts import AlertEngine, AlertNotifier, load_rules
+from .history import HISTORY_ENABLED, HistoryStore, run_compaction
+from .logs import setup_logging
+from .models import Quota, Survey
+from .quota_cache import QuotaCache
+from .scheduler import POLL_HOT_SECONDS, PollSchedule, ViewTable, budget
+from .scraper import PureSpectrumScraper
+from .snapshot import PollerLock, SnapshotReader, SnapshotWriter, SNAPSHOT_PATH
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL_SECONDS = float(os.getenv("POLL_INTERVAL_SECONDS", "60"))
+QUOTA_CONCURRENCY = int(os.getenv("QUOTA_CONCURRENCY", "5"))
+# Account updates within this many seconds of the last publish share the next one
+SNAPSHOT_PUBLISH_MIN_SECONDS = float(os.getenv("SNAPSHOT_PUBLISH_MIN_SECONDS", "2"))
+
+
+class AccountMerger:
+    """
+    Latest surveys and quotas of every account, published as one snapshot.
+    Each account's poller replaces only its own part, so a slow account never
+    holds back the others. Updates arriving within SNAPSHOT_PUBLISH_MIN_SECONDS
+    of the last publish go out together, and the merge's alert evaluation and
+    serialization run on a thread, off the event loop serving requests.
+    """
+
+    def __init__(self, writer: SnapshotWriter, accounts: List[Account], alerts: Optional[AlertEngine] = None,
+                 notifier: Optional[AlertNotifier] = None):
+        self.writer = writer
+        self.alerts = alerts
+        self.notifier = notifier or AlertNotifier()
+        # Config order, so the merged view is stable whichever account polled last
+        self._surveys: Dict[str, Dict[str, Survey]] = {account.name: {} for account in accounts}
+        self._quotas: Dict[str, Dict[str, List[Quota]]] = {account.name: {} for account in accounts}
+        self._schedule: Dict[str, List[Dict]] = {account.name: [] for account in accounts}
+        # The next publish, shared by every update made before it starts
+        self._pending: Optional[asyncio.Future] = None
+        self._lock = asyncio.Lock()
+        self._published_at = float('-inf')
+
+    async def update(self, account: str, surveys: Dict[str, Survey], quotas: Dict[str, List[Quota]],
+                     schedule: Optional[List[Dict]] = None) -> int:
+        """Replace an account's part; returns the version of the snapshot that includes it"""
+        self._surveys[account] = {survey_key(account, survey_id): s for survey_id, s in surveys.items()}
+        self._quotas[account] = {survey_key(account, survey_id): q for survey_id, q in quotas.items()}
+        self._schedule[account] = [dict(row, account=account) for row in schedule or []]
+        if self._pending is None:
+            self._pending = asyncio.ensure_future(self._publish())
+        # Shielded: a cancelled poller must not cancel the other accounts' publish
+        return await asyncio.shield(self._pending)
+
+    async def _publish(self) -> int:
+        async with self._lock:
+            delay = self._published_at + SNAPSHOT_PUBLISH_MIN_SECONDS - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            # Later updates go into the next publish
+            self._pending = None
+            merged_surveys: Dict[str, Survey] = {}
+            merged_quotas: Dict[str, List[Quota]] = {}
+            merged_schedule: List[Dict] = []
+            for name in self._surveys:
+                merged_surveys.update(self._surveys[name])
+                merged_quotas.update(self._quotas[name])
+                merged_schedule.extend(self._schedule[name])
+            try:
+                version, events = await asyncio.to_thread(
+                    self._evaluate_and_publish, merged_surveys, merged_quotas, merged_schedule)
+            finally:
+                self._published_at = time.monotonic()
+            self.notifier.push(events)
+            return version
+
+    def _evaluate_and_publish(self, surveys: Dict[str, Survey], quotas: Dict[str, List[Quota]],
+                              schedule: List[Dict]):
+        events, alerts = [], None
+        if self.alerts is not None:
+            events = self.alerts.evaluate(surveys, quotas)
+            alerts = self.alerts.to_list()
+        return self.writer.publish(surveys, quotas, schedule=schedule, alerts=alerts), events
+
+
+class SurveyPoller:
+    """
+    Polls one account: the survey list every `interval`, and each survey's
+    quotas whenever its PollSchedule entry comes due
+    """
+
+    def __init__(self, account: Account, merger: AccountMerger, interval: float = POLL_INTERVAL_SECONDS,
+                 views: Optional[ViewTable] = None, history: Optional[HistoryStore] = None):
+        self.account = account
+        self.scraper = PureSpectrumScraper(account.username, account.password, account)
+        self.merger = merger
+        self.interval = interval
+        self.views = views or ViewTable()
+        self.history = history
+        self.cache = QuotaCache()
+        self.schedule = PollSchedule(interval, self.cache)
+        self.surveys: Dict[str, Survey] = {}
+        self._keys: Dict[str, str] = {}
+        self._authenticated = False
+
+    async def _poll_list(self, session: aiohttp.ClientSession) -> bool:
+        if not self._authenticated:
+            self._authenticated = await self.scraper.login(session)
+            if not self._authenticated:
+                return False
+
+        surveys = await self.scraper.get_survey_data(session)
+        if not surveys:
+            # Empty list is also what an expired token looks like, so
+            # re-check auth next cycle and keep serving the last snapshot
+            self._authenticated = False
+            return False
+
+        self.surveys = surveys
+        self.cache.retain(surveys)
+        self._keys = {survey_id: survey_key(self.account.name, survey_id) for survey_id in surveys}
+        self.schedule.observe(surveys, self._keys, self.views.viewed(), time.monotonic())
+        if self.history is not None:
+            try:
+                # SQLite writes happen off the event loop
+                written = await asyncio.to_thread(self.history.record,
+                                                  {self._keys[survey_id]: s for survey_id, s in surveys.items()})
+                metrics.HISTORY_SAMPLES.labels('written').inc(written)
+                metrics.HISTORY_SAMPLES.labels('unchanged').inc(len(surveys) - written)
+            except Exception as e:
+                logger.error(f"Failed to record history: {e}", extra={'account': self.account.name})
+        return True
+
+    async def _refresh_due(self, session: aiohttp.ClientSession) -> int:
+        """Fetch quotas of every survey whose refresh is due, returns how many"""
+        now = time.monotonic()
+        self.schedule.update_views(self.surveys, self.views.viewed(), now)
+        due = self.schedule.pop_due(now)
+        if not due:
+            return 0
+        semaphore = asyncio.Semaphore(QUOTA_CONCURRENCY)
+
+        async def fetch(entry):
+            async with semaphore:
+                if entry.fetched_at is not None:
+                    await budget.acquire()
+                metrics.SCHEDULE_LAG.observe(max(0.0, time.monotonic() - entry.due))
+                metrics.SCHEDULED_REFRESHES.labels(self.account.name, entry.reason).inc()
+                # Cached against the survey as it looked when the fetch started
+                survey = self.surveys.get(entry.survey_id)
+                quotas = await self.scraper.get_survey_quotas(session, entry.survey_id)
+                if survey is not None and entry.survey_id in self.surveys:
+                    self.cache.put(entry.survey_id, survey, quotas)
+                    self.schedule.done(entry, self.surveys[entry.survey_id], time.monotonic())
+
+        await asyncio.gather(*(fetch(entry) for entry in due))
+        return len(due)
+
+    async def poll_once(self, session: aiohttp.ClientSession, poll_list: bool = True) -> bool:
+        """Run one pass (list poll and/or due quota refreshes), returns True if a new snapshot was published"""
+        listed = await self._poll_list(session) if poll_list else False
+        if poll_list and not listed:
+            return False
+        refreshed = await self._refresh_due(session)
+        if not listed and not refreshed:
+            return False
+
+        version = await self.merger.update(self.account.name, self.surveys, self.cache.quotas(),
+                                     self.schedule.describe(self._keys, time.monotonic()))
+        logger.info(f"📦 Published snapshot v{version} ({len(self.surveys)} surveys, "
+                    f"{refreshed} quota refreshes from {self.account.name})",
+                    extra={'account': self.account.name})
+        return True
+
+    async def run(self):
+        """Poll forever on this account's own connection pool"""
+        connector = aiohttp.TCPConnector(limit=self.account.max_connections)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            next_list_at = time.monotonic()
+            while True:
+                start = time.perf_counter()
+                poll_list = time.monotonic() >= next_list_at
+                if poll_list:
+                    next_list_at = time.monotonic() + self.interval
+                try:
+                    published = await self.poll_once(session, poll_list)
+                    if poll_list or published:
+                        metrics.POLL_CYCLES.labels(self.account.name, 'published' if published else 'skipped').inc()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    metrics.POLL_CYCLES.labels(self.account.name, 'failed').inc()
+                    logger.error(f"Poll cycle failed: {e}", extra={'account': self.account.name})
+                if poll_list:
+                    metrics.POLL_CYCLE_SECONDS.observe(time.perf_counter() - start)
+
+                # Wake for the next due refresh or list poll, and often enough
+                # to notice a survey being opened
+                wake_at = min(next_list_at, self.schedule.next_due() or next_list_at)
+                await asyncio.sleep(min(max(0.0, wake_at - time.monotonic()), POLL_HOT_SECONDS))
+
+
+async def run_if_elected(accounts: List[Account], lock: PollerLock):
+    """
+    Keep trying to become the poller. Exactly one process holds the lock and
+    polls every account concurrently; the others retry so a replacement takes
+    over if the poller dies.
+    """
+    while True:
+        if lock.acquire():
+            logger.info(f"🗳️  Process {os.getpid()} elected as snapshot poller for {len(accounts)} account(s)")
+            writer = SnapshotWriter(SNAPSHOT_PATH)
+            alerts = AlertEngine(load_rules())
+            previous = await asyncio.to_thread(SnapshotReader(SNAPSHOT_PATH).read)
+            if previous is not None:
+                alerts.restore(previous.alerts)
+            merger = AccountMerger(writer, accounts, alerts)
+            history = HistoryStore() if HISTORY_ENABLED else None
+            tasks = [SurveyPoller(account, merger, history=history).run() for account in accounts]
+            if history is not None:
+                tasks.append(run_compaction(history))
+            try:
+                await asyncio.gather(*tasks)
+            finally:
+                writer.close()
+                if history is not None:
+                    history.close()
+                lock.release()
+        await asyncio.sleep(POLL_INTERVAL_SECONDS)
+
+
+if __name__ == "__main__":
+    # Run the poller as a dedicated process: python -m app.poller
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    setup_logging()
+    asyncio.run(run_if_elected(
+        [account for account in get_accounts() if account.configured],
+        PollerLock(SNAPSHOT_PATH),
+    ))
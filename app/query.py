@@ -0,0 +1,142 @@
+"""
+Indexed filtering, search, sorting and pagination for /api/surveys
+A SurveyIndex is built once per snapshot version: posting lists per status,
+country and billing ID, an inverted token index over titles, and a rank array
+per sort key. Queries intersect posting lists and sort only the matching rows,
+so they never scan every survey.
+"""
+import re
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .columnar import SurveyColumns
+from .models import STATUS_NAMES, Survey
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+FILTER_FIELDS = {
+    'status': 'status',
+    'country': 'countryCode',
+    'billing_id': 'billingId',
+    'account': 'account',
+}
+SORT_KEYS = ('progress', 'cost', 'cpi', 'last_complete')
+
+
+class QueryError(ValueError):
+    """Invalid query parameter"""
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+
+class SurveyIndex:
+    def __init__(self, columns: SurveyColumns, surveys: Dict[str, Survey]):
+        self.columns = columns
+        n = len(columns)
+
+        # Category code -> sorted row numbers
+        self.postings: Dict[str, Dict[int, np.ndarray]] = {}
+        for name in FILTER_FIELDS.values():
+            codes = columns.codes[name]
+            order = np.argsort(codes, kind='stable')
+            bounds = np.searchsorted(codes[order], np.arange(len(columns.categories[name].values) + 1))
+            self.postings[name] = {code: order[bounds[code]:bounds[code + 1]]
+                                   for code in range(len(bounds) - 1) if bounds[code] < bounds[code + 1]}
+
+        # Title token -> sorted row numbers, plus a sorted vocabulary for prefix lookups
+        tokens: Dict[str, List[int]] = {}
+        for row, survey_id in enumerate(columns.ids):
+            for token in set(tokenize(surveys[survey_id].title)):
+                tokens.setdefault(token, []).append(row)
+        self.tokens = {token: np.array(rows, dtype=np.int64) for token, rows in tokens.items()}
+        self.vocabulary = sorted(self.tokens)
+
+        # Sort key -> rank of each row in ascending order
+        completes, target = columns.numeric['completes'], columns.numeric['target']
+        progress = np.divide(completes, target, out=np.zeros(n), where=target > 0)
+        last_complete = [surveys[survey_id].last_complete_date or '' for survey_id in columns.ids]
+        self.ranks: Dict[str, np.ndarray] = {}
+        for key, values in (('progress', progress),
+                            ('cost', columns.numeric['currentCost']),
+                            ('cpi', columns.numeric['cpi']),
+                            ('last_complete', np.array(last_complete, dtype=object))):
+            order = np.argsort(values, kind='stable')
+            rank = np.empty(n, dtype=np.int64)
+            rank[order] = np.arange(n)
+            self.ranks[key] = rank
+
+    def _category_rows(self, field: str, raw: str) -> np.ndarray:
+        """Rows matching any of the comma-separated values of one filter"""
+        name = FILTER_FIELDS[field]
+        categories = self.columns.categories[name]
+        matches = []
+        for value in (v.strip() for v in raw.split(',') if v.strip()):
+            candidates = [value]
+            if name == 'status':
+                # Accept status codes (22) as well as names (Active)
+                candidates = [int(value)] if value.isdigit() else [
+                    code for code, label in STATUS_NAMES.items() if label.lower() == value.lower()]
+            for candidate in candidates:
+                code = categories.codes.get(candidate)
+                if code is not None and code in self.postings[name]:
+                    matches.append(self.postings[name][code])
+        if not matches:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(matches)) if len(matches) > 1 else matches[0]
+
+    def _search_rows(self, q: str) -> Optional[np.ndarray]:
+        """Rows whose title has a token starting with every query token"""
+        result = None
+        for term in tokenize(q):
+            start = bisect_left(self.vocabulary, term)
+            end = bisect_left(self.vocabulary, term + '\uffff', start)
+            postings = [self.tokens[token] for token in self.vocabulary[start:end]]
+            rows = np.unique(np.concatenate(postings)) if postings else np.empty(0, dtype=np.int64)
+            result = rows if result is None else np.intersect1d(result, rows, assume_unique=True)
+            if not len(result):
+                break
+        return result
+
+    def query(self, filters: Dict[str, str], q: Optional[str] = None, sort: Optional[str] = None,
+              offset: int = 0, limit: Optional[int] = None) -> Tuple[List[str], int]:
+        """
+        Args:
+            filters: status / country / billing_id -> comma-separated values
+            q: title search
+            sort: one of SORT_KEYS, prefix with '-' for descending
+            offset, limit: pagination over the sorted matches
+
+        Returns:
+            (survey IDs for the requested page, total number of matches)
+        """
+        rows: Optional[np.ndarray] = None
+        for field, raw in filters.items():
+            if not raw:
+                continue
+            matched = self._category_rows(field, raw)
+            rows = matched if rows is None else np.intersect1d(rows, matched, assume_unique=True)
+
+        if q:
+            matched = self._search_rows(q)
+            if matched is not None:
+                rows = matched if rows is None else np.intersect1d(rows, matched, assume_unique=True)
+
+        if rows is None:
+            rows = np.arange(len(self.columns))
+
+        if sort:
+            descending = sort.startswith('-')
+            key = sort.lstrip('-')
+            if key not in self.ranks:
+                raise QueryError(f"Unknown sort '{sort}', expected one of: {', '.join(SORT_KEYS)}")
+            rank = self.ranks[key][rows]
+            rows = rows[np.argsort(-rank if descending else rank, kind='stable')]
+
+        total = len(rows)
+        page = rows[offset:offset + limit if limit is not None else None]
+        ids = self.columns.ids
+        return [ids[row] for row in page], total
@@ -0,0 +1,118 @@
+"""
+Per-survey quota cache
+Quotas only move when their survey's completes (fielded), status or target
+do, so each cached entry remembers the survey state it was fetched at and a
+refetch is needed only once that state changes, or after QUOTA_SWEEP_SECONDS
+as a safety net for edits the survey list does not reveal.
+
+The poller keeps one in memory and publishes it in the snapshot;
+generate_dashboard.py saves one to QUOTA_CACHE_FILE between runs.
+"""
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from .models import Quota, Survey
+
+logger = logging.getLogger(__name__)
+
+QUOTA_SWEEP_SECONDS = float(os.getenv("QUOTA_SWEEP_SECONDS", "1800"))
+QUOTA_CACHE_FILE = Path(os.getenv("QUOTA_CACHE_FILE", "purespectrum_quota_cache.json"))
+
+
+def survey_state(survey: Survey) -> List:
+    """The survey fields whose change means its quotas changed too"""
+    return [survey.completes, survey.status_code, survey.target]
+
+
+class CachedQuotas:
+    __slots__ = ('state', 'fetched_at', 'quotas')
+
+    def __init__(self, state: Optional[List], fetched_at: float, quotas: List[Quota]):
+        self.state = state
+        self.fetched_at = fetched_at
+        self.quotas = quotas
+
+
+class QuotaCache:
+    def __init__(self):
+        self._entries: Dict[str, CachedQuotas] = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, survey_id: str) -> Optional[List[Quota]]:
+        entry = self._entries.get(survey_id)
+        return entry.quotas if entry is not None else None
+
+    def changed(self, survey_id: str, survey: Survey) -> bool:
+        """True if the survey moved since its quotas were fetched (or never were)"""
+        entry = self._entries.get(survey_id)
+        return entry is None or entry.state != survey_state(survey)
+
+    def stale(self, survey_id: str, survey: Survey, now: Optional[float] = None) -> bool:
+        """True if the quotas must be fetched: changed, or older than the sweep interval"""
+        if self.changed(survey_id, survey):
+            return True
+        now = time.time() if now is None else now
+        return now - self._entries[survey_id].fetched_at >= QUOTA_SWEEP_SECONDS
+
+    def put(self, survey_id: str, survey: Survey, quotas: Optional[List[Quota]], now: Optional[float] = None):
+        """
+        Store quotas fetched while the survey looked like `survey`
+
+        None (a failed fetch) never replaces cached quotas: it clears their
+        state so they are retried next time, and a survey with nothing cached
+        yet stays uncached (never published as an empty list). An empty list
+        is a survey without quotas and is cached like any other result
+        """
+        now = time.time() if now is None else now
+        entry = self._entries.get(survey_id)
+        if quotas is not None:
+            self._entries[survey_id] = CachedQuotas(survey_state(survey), now, quotas)
+        elif entry is not None:
+            entry.state = None
+
+    def retain(self, survey_ids: Iterable[str]):
+        """Drop surveys that are no longer listed"""
+        keep = set(survey_ids)
+        for survey_id in self._entries.keys() - keep:
+            del self._entries[survey_id]
+
+    def quotas(self) -> Dict[str, List[Quota]]:
+        return {survey_id: entry.quotas for survey_id, entry in self._entries.items()}
+
+    def save(self, path: Path = QUOTA_CACHE_FILE):
+        data = {
+            survey_id: {
+                'state': entry.state,
+                'fetched_at': entry.fetched_at,
+                'quotas': [quota.to_record() for quota in entry.quotas],
+            }
+            for survey_id, entry in self._entries.items()
+        }
+        tmp = path.with_name(path.name + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path = QUOTA_CACHE_FILE) -> 'QuotaCache':
+        """Cache saved by a previous run, empty if there is none or it is unreadable"""
+        cache = cls()
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return cache
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️  Ignoring unreadable quota cache {path}: {e}")
+            return cache
+        for survey_id, entry in data.items():
+            cache._entries[survey_id] = CachedQuotas(
+                entry['state'], entry['fetched_at'], [Quota.from_record(record) for record in entry['quotas']],
+            )
+        return cache
@@ -0,0 +1,119 @@
+"""
+Record upstream PureSpectrum responses as replayable fixtures
+Set PURESPECTRUM_RECORD_DIR to capture every API response the scraper reads
+(sanitized, with its original latency) into a JSON Lines file. Replay them
+offline with benchmarks/replay.py. Like log records, responses are only queued
+on the event loop; a writer thread sanitizes and appends them.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+RECORD_DIR = os.getenv("PURESPECTRUM_RECORD_DIR", "")
+
+# Keys whose values identify people; values are masked but keep their length
+# so recorded payloads stay production-sized
+SENSITIVE_KEYS = ('email', 'first_name', 'last_name', 'phone', 'contact', 'created_by',
+                  'modified_by', 'owner', 'user_name', 'username', 'token', 'password')
+
+
+def sanitize(value):
+    """Mask personal data in a decoded JSON payload"""
+    if isinstance(value, dict):
+        return {
+            key: _mask(item) if any(s in key.lower() for s in SENSITIVE_KEYS) else sanitize(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [sanitize(item) for item in value]
+    return value
+
+
+def _mask(value):
+    if isinstance(value, str):
+        return 'x' * len(value)
+    if isinstance(value, (dict, list)):
+        return sanitize(value)
+    return value
+
+
+class FixtureRecorder:
+    """Appends one JSON line per upstream response"""
+
+    def __init__(self, directory: Path):
+        directory.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        self.path = directory / f'session-{stamp}-{os.getpid()}.jsonl'
+        self._start = time.perf_counter()
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._write_queued, name='fixture-recorder', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+        logger.info(f"📼 Recording upstream responses to {self.path}")
+
+    def record(self, endpoint: str, api_url: str, status: int, content_type: str,
+               body: bytes, latency: float):
+        """Queue a response for the writer thread"""
+        offset = time.perf_counter() - self._start
+        self._queue.put((endpoint, api_url, status, content_type, body, latency, offset))
+
+    def stop(self):
+        """Write everything queued so far and stop the writer thread"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def _write_queued(self):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    return
+                try:
+                    f.write(json.dumps(self._entry(*item)) + '\n')
+                    if self._queue.empty():
+                        f.flush()
+                except Exception as e:
+                    logger.error(f"Failed to record response: {e}")
+
+    @staticmethod
+    def _entry(endpoint: str, api_url: str, status: int, content_type: str, body: bytes,
+               latency: float, offset: float) -> dict:
+        url = urlsplit(api_url)
+        text = body.decode('utf-8', errors='replace')
+        if 'json' in content_type:
+            try:
+                text = json.dumps(sanitize(json.loads(text)), separators=(',', ':'))
+            except ValueError:
+                pass
+        return {
+            'endpoint': endpoint,
+            'path': url.path,
+            'query': url.query,
+            'status': status,
+            'content_type': content_type,
+            'latency_ms': round(latency * 1000, 2),
+            'offset_ms': round(offset * 1000, 2),
+            'body': text,
+        }
+
+
+_recorder: Optional[FixtureRecorder] = None
+
+
+def get_recorder() -> Optional[FixtureRecorder]:
+    """The process-wide recorder, or None when recording is off"""
+    global _recorder
+    if RECORD_DIR and _recorder is None:
+        _recorder = FixtureRecorder(Path(RECORD_DIR))
+    return _recorder
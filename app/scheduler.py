@@ -0,0 +1,251 @@
+"""
+Adaptive quota refresh scheduling
+Each survey's quotas are refreshed on their own interval instead of every poll
+cycle: surveys someone is viewing and fast-filling surveys close to target are
+refreshed often, paused, finished and idle ones rarely. Surveys whose
+completes, status and target did not change since their quotas were fetched
+wait for the QUOTA_SWEEP_SECONDS sweep. Due refreshes are kept
+in a heap and run within POLL_BUDGET_PER_MINUTE upstream requests shared by
+every account, most overdue first; a survey's first fetch is not budgeted so
+a cold start fills the snapshot quickly.
+
+Web workers mark surveys as viewed in a small memory-mapped table next to the
+snapshot (one slot per survey hash), which the poller reads every pass.
+"""
+import hashlib
+import heapq
+import itertools
+import mmap
+import os
+import struct
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from .accounts import RateLimiter
+from .models import Survey
+from .quota_cache import QUOTA_SWEEP_SECONDS, QuotaCache
+from .snapshot import SNAPSHOT_PATH
+
+POLL_INTERVAL_SECONDS = float(os.getenv("POLL_INTERVAL_SECONDS", "60"))
+# Bounds of a survey's refresh interval
+POLL_HOT_SECONDS = float(os.getenv("POLL_HOT_SECONDS", "15"))
+POLL_IDLE_SECONDS = float(os.getenv("POLL_IDLE_SECONDS", "900"))
+# Scheduled quota requests per minute across all accounts
+POLL_BUDGET_PER_MINUTE = float(os.getenv("POLL_BUDGET_PER_MINUTE", "300"))
+# Completes per hour at which a survey is refreshed twice as often as the base interval
+POLL_VELOCITY_REF_PER_HOUR = float(os.getenv("POLL_VELOCITY_REF_PER_HOUR", "30"))
+# A survey counts as viewed for this long after its open quota row last reported in
+VIEW_WINDOW_SECONDS = float(os.getenv("VIEW_WINDOW_SECONDS", "120"))
+# Refreshes due within this many seconds of each other run as one batch
+POLL_BATCH_SECONDS = 2.0
+# Roughly what the budget allows per hot interval, so a backlog never holds
+# back the next pass (and the surveys being viewed) for long
+BATCH_LIMIT = max(10, int(POLL_BUDGET_PER_MINUTE / 60 * POLL_HOT_SECONDS))
+
+PAUSED_STATUS = 33
+VELOCITY_SMOOTHING = 0.3
+
+VIEWS_PATH = Path(os.getenv("VIEWS_PATH", f"{SNAPSHOT_PATH}.views"))
+VIEW_SLOTS = 4096
+VIEW_SLOT = struct.Struct("<Qd")
+
+# Shared by every account's poller in the process
+budget = RateLimiter(POLL_BUDGET_PER_MINUTE / 60)
+
+
+def view_hash(survey_id: str) -> int:
+    return int.from_bytes(hashlib.blake2b(survey_id.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class ViewTable:
+    """
+    Last-viewed time per survey, shared between processes. Writers store
+    (hash, time) in the survey's slot; a collision or a torn write only loses
+    a view, which the next request records again.
+    """
+
+    def __init__(self, path: Path = VIEWS_PATH):
+        self.path = path
+        self._mm: Optional[mmap.mmap] = None
+
+    def _map(self) -> bool:
+        if self._mm is not None:
+            return True
+        try:
+            with open(self.path, 'a+b') as f:
+                if os.fstat(f.fileno()).st_size < VIEW_SLOTS * VIEW_SLOT.size:
+                    f.truncate(VIEW_SLOTS * VIEW_SLOT.size)
+                self._mm = mmap.mmap(f.fileno(), 0)
+            return True
+        except OSError:
+            return False
+
+    def record(self, survey_id: str):
+        if not self._map():
+            return
+        h = view_hash(survey_id)
+        VIEW_SLOT.pack_into(self._mm, (h % VIEW_SLOTS) * VIEW_SLOT.size, h, time.time())
+
+    def viewed(self, window: float = VIEW_WINDOW_SECONDS) -> Set[int]:
+        """Hashes of the surveys viewed within the last `window` seconds"""
+        if not self._map():
+            return set()
+        since = time.time() - window
+        return {h for h, at in VIEW_SLOT.iter_unpack(self._mm) if at >= since}
+
+
+def poll_interval(survey: Survey, velocity: Optional[float], viewed: bool,
+                  base: float = POLL_INTERVAL_SECONDS):
+    """
+    (seconds, reason) between quota refreshes of a survey
+
+    Args:
+        survey: latest list data for the survey
+        velocity: smoothed completes per hour, None before the second list poll
+        viewed: someone had the survey's quotas open recently
+        base: the list poll interval
+    """
+    if viewed:
+        return POLL_HOT_SECONDS, 'viewed'
+    if survey.status_code == PAUSED_STATUS:
+        return POLL_IDLE_SECONDS, 'paused'
+    remaining = (survey.target or 0) - (survey.completes or 0)
+    if survey.target and remaining <= 0:
+        return POLL_IDLE_SECONDS, 'complete'
+    if velocity is None:
+        return base, 'new'
+    if velocity <= 0:
+        return min(POLL_IDLE_SECONDS, base * 4), 'idle'
+
+    interval, reason = base / (1 + velocity / POLL_VELOCITY_REF_PER_HOUR), 'filling'
+    if remaining > 0:
+        # Refresh a few times before the survey is expected to reach target
+        near = remaining / velocity * 3600 / 4
+        if near < interval:
+            interval, reason = near, 'near_target'
+    return min(base, max(POLL_HOT_SECONDS, interval)), reason
+
+
+class ScheduleEntry:
+    __slots__ = ('survey_id', 'key_hash', 'completes', 'observed_at', 'velocity', 'viewed',
+                 'interval', 'reason', 'due', 'fetched_at')
+
+    def __init__(self, survey_id: str, key_hash: int):
+        self.survey_id = survey_id
+        self.key_hash = key_hash
+        self.completes = None
+        self.observed_at = None
+        self.velocity = None
+        self.viewed = False
+        self.interval = POLL_INTERVAL_SECONDS
+        self.reason = 'new'
+        self.due = 0.0
+        self.fetched_at = None
+
+
+class PollSchedule:
+    """Quota refresh schedule of one account's surveys, ordered by due time"""
+
+    def __init__(self, base_interval: float = POLL_INTERVAL_SECONDS, cache: Optional[QuotaCache] = None):
+        self.base_interval = base_interval
+        # Without a cache every survey is refreshed on its interval, changed or not
+        self.cache = cache
+        self.entries: Dict[str, ScheduleEntry] = {}
+        # (due, seq, survey_id); entries whose due moved are skipped when popped
+        self._heap = []
+        self._seq = itertools.count()
+
+    def _schedule(self, entry: ScheduleEntry, due: float):
+        entry.due = due
+        heapq.heappush(self._heap, (due, next(self._seq), entry.survey_id))
+
+    def _next_due(self, entry: ScheduleEntry, survey: Survey, now: float) -> float:
+        entry.interval, entry.reason = poll_interval(survey, entry.velocity, entry.viewed, self.base_interval)
+        if entry.fetched_at is None:
+            return now
+        if entry.viewed or self.cache is None:
+            return entry.fetched_at + entry.interval
+        if self.cache.changed(entry.survey_id, survey):
+            # Moved since its quotas were fetched: refresh within one list interval
+            entry.interval = min(entry.interval, self.base_interval)
+            return entry.fetched_at + entry.interval
+        # Unchanged surveys cannot have new quota counts, only the sweep refreshes them
+        entry.interval, entry.reason = max(entry.interval, QUOTA_SWEEP_SECONDS), 'sweep'
+        return entry.fetched_at + entry.interval
+
+    def _plan(self, entry: ScheduleEntry, survey: Survey, now: float):
+        due = self._next_due(entry, survey, now)
+        if due != entry.due:
+            self._schedule(entry, due)
+
+    def observe(self, surveys: Dict[str, Survey], keys: Dict[str, str], viewed: Set[int], now: float):
+        """
+        Update velocities and intervals from a list poll
+
+        Args:
+            surveys: the account's surveys keyed by upstream ID
+            keys: upstream ID -> ID in the merged view (what viewers request)
+            viewed: view hashes from ViewTable.viewed()
+            now: time.monotonic()
+        """
+        for survey_id in self.entries.keys() - surveys.keys():
+            del self.entries[survey_id]
+        for survey_id, survey in surveys.items():
+            entry = self.entries.get(survey_id)
+            if entry is None:
+                entry = self.entries[survey_id] = ScheduleEntry(survey_id, view_hash(keys[survey_id]))
+            completes = survey.completes or 0
+            if entry.observed_at is not None and now - entry.observed_at >= 1:
+                rate = max(0, completes - entry.completes) * 3600 / (now - entry.observed_at)
+                entry.velocity = rate if entry.velocity is None else (
+                    VELOCITY_SMOOTHING * rate + (1 - VELOCITY_SMOOTHING) * entry.velocity)
+            if entry.observed_at is None or now - entry.observed_at >= 1:
+                entry.completes, entry.observed_at = completes, now
+            entry.viewed = entry.key_hash in viewed
+            self._plan(entry, survey, now)
+
+    def update_views(self, surveys: Dict[str, Survey], viewed: Set[int], now: float):
+        """Re-plan surveys that were opened or closed since the last pass"""
+        for entry in self.entries.values():
+            is_viewed = entry.key_hash in viewed
+            if is_viewed != entry.viewed and entry.survey_id in surveys:
+                entry.viewed = is_viewed
+                self._plan(entry, surveys[entry.survey_id], now)
+
+    def pop_due(self, now: float, limit: int = BATCH_LIMIT) -> List[ScheduleEntry]:
+        """Up to `limit` entries due by now (or within the batch window), most overdue first"""
+        due = []
+        horizon = now + POLL_BATCH_SECONDS
+        while self._heap and self._heap[0][0] <= horizon and len(due) < limit:
+            at, _, survey_id = heapq.heappop(self._heap)
+            entry = self.entries.get(survey_id)
+            if entry is not None and entry.due == at:
+                due.append(entry)
+        return due
+
+    def done(self, entry: ScheduleEntry, survey: Survey, now: float):
+        entry.fetched_at = now
+        self._schedule(entry, self._next_due(entry, survey, now))
+
+    def next_due(self) -> Optional[float]:
+        while self._heap:
+            at, _, survey_id = self._heap[0]
+            entry = self.entries.get(survey_id)
+            if entry is not None and entry.due == at:
+                return at
+            heapq.heappop(self._heap)
+        return None
+
+    def describe(self, keys: Dict[str, str], now: float) -> List[Dict]:
+        """Schedule rows for the debugging endpoint, due times as Unix timestamps"""
+        wall = time.time() - now
+        return [{
+            'surveyId': keys.get(entry.survey_id, entry.survey_id),
+            'reason': entry.reason,
+            'intervalSeconds': round(entry.interval, 1),
+            'dueAt': round(entry.due + wall, 3),
+            'lastFetchedAt': None if entry.fetched_at is None else round(entry.fetched_at + wall, 3),
+            'velocityPerHour': None if entry.velocity is None else round(entry.velocity, 2),
+            'viewed': entry.viewed,
+        } for entry in self.entries.values()]
@@ -4,57 +4,49 @@ This approach avoids the complex captcha by reusing authenticated session cookie
 """
 import asyncio
 import aiohttp
-from bs4 import BeautifulSoup
+from contextlib import asynccontextmanager
 from typing import Dict, List, Optional
 import logging
-import json
 import os
-from pathlib import Path
+import time
+
+from . import metrics, timing
+from .accounts import DEFAULT_ACCOUNT, Account
+from .auth import get_auth_manager
+from .fastjson import loads
+from .logs import sampled
+from .models import Quota, Survey, map_status, parse_quotas
+from .recording import get_recorder
 
 logger = logging.getLogger(__name__)
 
+# Override to point the scraper at a local mock (see benchmarks/mock_purespectrum.py)
+API_BASE = os.getenv("PURESPECTRUM_API_BASE", "https://spectrumsurveys.com/buyers/v2").rstrip('/')
+
 class PureSpectrumScraper:
-    def __init__(self, username: str, password: str):
+    def __init__(self, username: str, password: str, account: Optional[Account] = None,
+                 interactive: bool = False):
         self.username = username
         self.password = password
-        self.auth_file = Path("purespectrum_auth.json")
-        self.auth_data = self._load_auth()
+        # Token, rate limit and metric labels are per account (see app/accounts.py);
+        # live requests from web handlers use the account's interactive budget
+        self.account = account
+        self.account_name = account.name if account is not None else DEFAULT_ACCOUNT
+        if account is None:
+            self.limiter = None
+        else:
+            self.limiter = account.interactive_limiter if interactive else account.limiter
         self.last_known_data = {}
-        
-    def _load_auth(self) -> Dict:
-        """Load saved auth token from environment variables or file"""
-        import os
-        
-        # First, try environment variables (for Render/Heroku deployment)
-        token = os.getenv("PURESPECTRUM_TOKEN")
-        user_id = os.getenv("PURESPECTRUM_USER_ID")
-        company_id = os.getenv("PURESPECTRUM_COMPANY_ID")
-        
-        if token:
-            auth_data = {
-                "token": token,
-                "user_id": user_id or "",
-                "company_id": company_id or ""
-            }
-            logger.info("✅ Loaded authentication token from environment variables")
-            return auth_data
-        
-        # Fallback to file (for local development)
-        if self.auth_file.exists():
-            try:
-                with open(self.auth_file, 'r') as f:
-                    auth_data = json.load(f)
-                    logger.info("✅ Loaded saved authentication token from file")
-                    return auth_data
-            except Exception as e:
-                logger.error(f"Failed to load auth: {e}")
-        return {}
+    
+    @property
+    def auth_data(self) -> Dict:
+        """Auth token shared by every scraper of this account in the process (see app/auth.py)"""
+        return get_auth_manager(self.account).auth
     
     def _save_auth(self, auth_data: Dict):
         """Save auth data to file for reuse"""
         try:
-            with open(self.auth_file, 'w') as f:
-                json.dump(auth_data, f, indent=2)
+            get_auth_manager(self.account).save(auth_data)
             logger.info("✅ Saved authentication token")
         except Exception as e:
             logger.error(f"Failed to save auth: {e}")
@@ -70,14 +62,48 @@ class PureSpectrumScraper:
             'Referer': 'https://platform.purespectrum.com/'
         }
     
+    @asynccontextmanager
+    async def _get(self, session: aiohttp.ClientSession, endpoint: str, api_url: str,
+                   survey_id: Optional[str] = None):
+        """
+        GET an API URL with auth headers, recording latency, status and errors
+        under the given endpoint label (list, detail, quotas, health, token_probe).
+        Yields (response, body): the body is read within the upstream timing
+        phase, so callers parse it under their own phase.
+        """
+        if self.limiter is not None and self.limiter.rate > 0:
+            # Waiting for the rate limit is not upstream latency, so it is timed on its own
+            start = time.perf_counter()
+            with timing.phase('rate_limit'):
+                await self.limiter.acquire()
+            metrics.UPSTREAM_RATE_LIMIT_WAIT.labels(self.account_name, endpoint).observe(time.perf_counter() - start)
+        start = time.perf_counter()
+        status = None
+        try:
+            timeout = aiohttp.ClientTimeout(total=30)
+            with timing.phase('auth' if endpoint == 'token_probe' else f'upstream_{endpoint}'):
+                async with session.get(api_url, headers=self._get_auth_headers(), timeout=timeout) as response:
+                    status = response.status
+                    body = await response.read()
+        except Exception as e:
+            metrics.UPSTREAM_ERRORS.labels(self.account_name, endpoint, type(e).__name__).inc()
+            raise
+        finally:
+            # Request and body read only, not the caller's parsing
+            latency = time.perf_counter() - start
+            metrics.UPSTREAM_LATENCY.labels(self.account_name, endpoint).observe(latency)
+            logger.info(f"🌐 {endpoint} {status} in {latency * 1000:.0f}ms", extra=sampled(
+                f'upstream_{endpoint}', account=self.account_name, endpoint=endpoint, status=status,
+                survey_id=survey_id, duration_ms=round(latency * 1000, 1)))
+        metrics.UPSTREAM_RESPONSES.labels(self.account_name, endpoint, status).inc()
+        recorder = get_recorder()
+        if recorder is not None:
+            recorder.record(endpoint, api_url, status, response.headers.get('Content-Type', ''), body, latency)
+        yield response, body
+    
     def _map_status(self, status_code) -> str:
         """Map PureSpectrum status codes to human-readable strings"""
-        status_map = {
-            22: 'Active',  # or 'All' - needs confirmation
-            33: 'Paused',
-            # Add more as we discover them
-        }
-        return status_map.get(status_code, f'Status {status_code}')
+        return map_status(status_code)
     
     async def login(self, session: aiohttp.ClientSession) -> bool:
         """
@@ -86,28 +112,26 @@ class PureSpectrumScraper:
         try:
             # Try to access a protected endpoint with existing token
             if self.auth_data.get('token'):
-                logger.info("🔐 Testing existing authentication token...")
-                
-                headers = self._get_auth_headers()
+                logger.debug("🔐 Testing existing authentication token...")
                 
-                timeout = aiohttp.ClientTimeout(total=30)
-                async with session.get(
-                    'https://spectrumsurveys.com/buyers/v2/surveys?limit=1',
-                    headers=headers,
-                    timeout=timeout
-                ) as response:
+                async with self._get(
+                    session,
+                    'token_probe',
+                    f'{API_BASE}/surveys?limit=1'
+                ) as (response, body):
                     if response.status == 200:
                         content_type = response.headers.get('Content-Type', '')
                         if 'application/json' in content_type:
-                            data = await response.json()
+                            data = loads(body)
                             # Auth worked! data is a list of surveys (or empty list)
                             user_email = self.auth_data.get('user_id', 'User')
-                            logger.info(f"✅ Token valid! Authenticated as user {user_email}")
-                            logger.info(f"   Found {len(data) if isinstance(data, list) else 'N/A'} surveys")
+                            logger.info(f"✅ Token valid! Authenticated as user {user_email}", extra=sampled(
+                                'token_valid', user_id=user_email,
+                                surveys=len(data) if isinstance(data, list) else None))
                             return True
                         else:
                             # Got HTML instead of JSON - auth failed
-                            text = await response.text()
+                            text = body.decode('utf-8', errors='replace')
                             logger.error(f"❌ Got HTML response instead of JSON (auth failed)")
                             logger.error(f"Response preview: {text[:200]}")
                     else:
@@ -151,6 +175,19 @@ class PureSpectrumScraper:
             logger.error(f"Login check failed: {e}")
             return False
     
+    def _parse_surveys(self, data) -> Dict[str, Survey]:
+        """Map a list or detail API response to Survey models, keyed by survey ID"""
+        if isinstance(data, dict):
+            # Single survey from detail endpoint
+            data = [data]
+        elif not isinstance(data, list):
+            return {}
+        surveys = {}
+        for raw in data:
+            survey = Survey.from_api(raw, self.account_name)
+            surveys[survey.survey_id] = survey
+        return surveys
+    
     async def get_survey_data(self, session: aiohttp.ClientSession, survey_id: Optional[str] = None) -> Dict:
         """
         Scrape survey data from PureSpectrum API
@@ -160,88 +197,33 @@ class PureSpectrumScraper:
             survey_id: Optional specific survey ID to fetch
         
         Returns:
-            Dictionary of survey data
+            Dictionary of Survey models keyed by survey ID
         """
         try:
             # Use PureSpectrum's buyer API endpoint
             if survey_id:
                 # Get specific survey
-                api_url = f'https://spectrumsurveys.com/buyers/v2/surveys/{survey_id}'
+                api_url = f'{API_BASE}/surveys/{survey_id}'
             else:
                 # Get all surveys (with pagination)
-                api_url = 'https://spectrumsurveys.com/buyers/v2/surveys?UI=1&page=1&limit=100'
-            
-            logger.info(f"📡 Fetching survey data from API: {api_url}")
+                api_url = f'{API_BASE}/surveys?UI=1&page=1&limit=100'
             
-            headers = self._get_auth_headers()
+            logger.debug(f"📡 Fetching survey data from API: {api_url}")
             
-            timeout = aiohttp.ClientTimeout(total=30)
-            async with session.get(api_url, headers=headers, timeout=timeout) as response:
+            endpoint = 'detail' if survey_id else 'list'
+            async with self._get(session, endpoint, api_url, survey_id) as (response, body):
                 if response.status == 200:
-                    data = await response.json()
-                    logger.info(f"✅ Got survey data")
-                    
-                    # Process the data into our format
-                    surveys = {}
-                    if isinstance(data, list):
-                        # Multiple surveys from list endpoint
-                        for survey in data:
-                            survey_id = str(survey.get('ps_survey_id') or survey.get('id') or survey.get('_id', 'unknown'))
-                            
-                            # Map PureSpectrum field names to our standard format
-                            surveys[survey_id] = {
-                                'surveyId': survey_id,
-                                'title': survey.get('survey_title') or survey.get('title', 'Untitled'),
-                                'status': self._map_status(survey.get('ps_survey_status')),
-                                'statusCode': survey.get('ps_survey_status'),
-                                'completes': survey.get('fielded', 0),
-                                'target': survey.get('completes_required', 0),
-                                'quotas': survey.get('quotas', []),
-                                'cpi': survey.get('average_cpi', 0),
-                                'loi': survey.get('expected_loi', 0),
-                                'incidence': survey.get('expected_ir') or survey.get('current_incidence', 0),
-                                'billingId': survey.get('billing_id', ''),
-                                'countryCode': survey.get('country_code', ''),
-                                'locale': survey.get('locale', {}),
-                                'launchDate': survey.get('survey_launch_date'),
-                                'lastCompleteDate': survey.get('project_last_complete_date'),
-                                'currentCost': survey.get('current_cost', 0),
-                                'updatedAt': survey.get('project_last_complete_date') or survey.get('mod_on', ''),
-                                # Include full raw data for advanced queries
-                                '_raw': survey
-                            }
-                    elif isinstance(data, dict):
-                        # Single survey from detail endpoint
-                        survey_id = str(data.get('ps_survey_id') or data.get('id') or data.get('_id', 'unknown'))
-                        
-                        surveys[survey_id] = {
-                            'surveyId': survey_id,
-                            'title': data.get('survey_title') or data.get('title', 'Untitled'),
-                            'status': self._map_status(data.get('ps_survey_status')),
-                            'statusCode': data.get('ps_survey_status'),
-                            'completes': data.get('fielded', 0),
-                            'target': data.get('completes_required', 0),
-                            'quotas': data.get('quotas', []),
-                            'cpi': data.get('average_cpi', 0),
-                            'loi': data.get('expected_loi', 0),
-                            'incidence': data.get('expected_ir') or data.get('current_incidence', 0),
-                            'billingId': data.get('billing_id', ''),
-                            'countryCode': data.get('country_code', ''),
-                            'locale': data.get('locale', {}),
-                            'launchDate': data.get('survey_launch_date'),
-                            'lastCompleteDate': data.get('project_last_complete_date'),
-                            'currentCost': data.get('current_cost', 0),
-                            'updatedAt': data.get('project_last_complete_date') or data.get('mod_on', ''),
-                            '_raw': data
-                        }
-                    
+                    with timing.phase('parse'):
+                        data = loads(body)
+                        surveys = self._parse_surveys(data)
+                    logger.debug(f"✅ Got survey data", extra={'surveys': len(surveys)})
                     return surveys
                 elif response.status == 401:
                     logger.error("❌ Session expired - please log in again manually")
                     return {}
                 else:
                     logger.error(f"❌ API request failed with status {response.status}")
-                    text = await response.text()
+                    text = body.decode('utf-8', errors='replace')
                     logger.error(f"Response: {text[:500]}")
                     return {}
                     
@@ -249,7 +231,7 @@ class PureSpectrumScraper:
             logger.error(f"Failed to fetch survey data: {e}")
             return {}
     
-    async def get_survey_quotas(self, session: aiohttp.ClientSession, survey_id: str) -> List[Dict]:
+    async def get_survey_quotas(self, session: aiohttp.ClientSession, survey_id: str) -> Optional[List[Quota]]:
         """
         Get quota details for a specific survey
         
@@ -258,27 +240,26 @@ class PureSpectrumScraper:
             survey_id: Survey ID
             
         Returns:
-            List of quota details
+            List of Quota models (empty for a survey without quotas), None if the fetch failed
         """
         try:
-            api_url = f'https://spectrumsurveys.com/buyers/v2/surveys/{survey_id}/quotas?UI=1&QBS=1&page=1&limit=100'
-            
-            logger.info(f"📊 Fetching quotas for survey {survey_id}")
+            api_url = f'{API_BASE}/surveys/{survey_id}/quotas?UI=1&QBS=1&page=1&limit=100'
             
-            headers = self._get_auth_headers()
-            timeout = aiohttp.ClientTimeout(total=30)
+            logger.debug(f"📊 Fetching quotas for survey {survey_id}")
             
-            async with session.get(api_url, headers=headers, timeout=timeout) as response:
+            async with self._get(session, 'quotas', api_url, survey_id) as (response, body):
                 if response.status == 200:
-                    data = await response.json()
-                    logger.info(f"✅ Got {len(data) if isinstance(data, list) else 'N/A'} quotas")
-                    return data if isinstance(data, list) else []
+                    with timing.phase('parse'):
+                        data = loads(body)
+                        quotas = parse_quotas(data, survey_id)
+                    logger.debug(f"✅ Got {len(quotas)} quotas", extra={'survey_id': survey_id})
+                    return quotas
                 else:
-                    logger.error(f"❌ Failed to get quotas: status {response.status}")
-                    return []
+                    logger.error(f"❌ Failed to get quotas: status {response.status}", extra={'survey_id': survey_id})
+                    return None
         except Exception as e:
             logger.error(f"Failed to fetch quotas: {e}")
-            return []
+            return None
     
     async def get_survey_health(self, session: aiohttp.ClientSession, survey_id: str) -> Dict:
         """
@@ -292,17 +273,14 @@ class PureSpectrumScraper:
             Dictionary of health metrics
         """
         try:
-            api_url = f'https://spectrumsurveys.com/buyers/v2/surveys/{survey_id}/health?kpis=AQP'
-            
-            logger.info(f"🏥 Fetching health metrics for survey {survey_id}")
+            api_url = f'{API_BASE}/surveys/{survey_id}/health?kpis=AQP'
             
-            headers = self._get_auth_headers()
-            timeout = aiohttp.ClientTimeout(total=30)
+            logger.debug(f"🏥 Fetching health metrics for survey {survey_id}")
             
-            async with session.get(api_url, headers=headers, timeout=timeout) as response:
+            async with self._get(session, 'health', api_url, survey_id) as (response, body):
                 if response.status == 200:
-                    data = await response.json()
-                    logger.info(f"✅ Got health metrics")
+                    data = loads(body)
+                    logger.debug(f"✅ Got health metrics", extra={'survey_id': survey_id})
                     return data if isinstance(data, dict) else {}
                 else:
                     logger.error(f"❌ Failed to get health metrics: status {response.status}")
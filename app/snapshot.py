@@ -0,0 +1,323 @@
+"""
+Shared survey snapshot backed by a memory-mapped file
+One poller process publishes the latest survey/quota data, every web worker
+maps the same file and only re-parses it when the header version changes.
+Checking the version is a header read; the parse itself is the slow path and
+web handlers run it off the event loop.
+"""
+import logging
+import mmap
+import os
+import struct
+import time
+from functools import cached_property
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from . import metrics
+from .columnar import SurveyColumns
+from .fastjson import body_etag, dumps, loads
+from .models import Quota, Survey, encode_quota_list, encode_survey_map
+from .query import SurveyIndex
+from .summary import build_summary
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_PATH = Path(os.getenv("SNAPSHOT_PATH", "purespectrum_snapshot.mmap"))
+
+# Header layout: magic, format, sequence (odd while a write is in progress),
+# snapshot version, payload length. The payload (JSON) follows the header;
+# surveys and quotas are stored as compact model records.
+HEADER = struct.Struct("<4sIQQQ")
+MAGIC = b"PSSN"
+FORMAT = 3
+INITIAL_CAPACITY = 4 * 1024 * 1024
+
+
+class Snapshot:
+    """One published version of the survey and quota data"""
+
+    def __init__(self, version: int, payload: Dict, previous: Optional['Snapshot'] = None):
+        self.version = version
+        self.generated_at = payload.get('generated_at', 0)
+        self.surveys: Dict[str, Survey] = {
+            survey_id: Survey.from_record(record) for survey_id, record in payload.get('surveys', {}).items()
+        }
+        self.quotas: Dict[str, List[Quota]] = {
+            survey_id: [Quota.from_record(record) for record in records]
+            for survey_id, records in payload.get('quotas', {}).items()
+        }
+        # Quota refresh schedule at publish time, for debugging
+        self.schedule: List[Dict] = payload.get('schedule', [])
+        # Firing and recently resolved alerts
+        self.alerts: List[Dict] = payload.get('alerts', [])
+        self._quotas_json: Dict[str, bytes] = {}
+        self._quotas_etag: Dict[str, str] = {}
+        self._survey_json: Dict[str, bytes] = {}
+        # Built eagerly from the previous version so unchanged rows are copied
+        # instead of re-extracted, and no reference to `previous` is kept
+        self.columns = SurveyColumns.build(
+            self.surveys,
+            previous.columns if previous is not None else None,
+            previous.surveys if previous is not None else None,
+        )
+
+    @cached_property
+    def index(self) -> SurveyIndex:
+        """Filter/search/sort indexes, built on the first query against this version"""
+        return SurveyIndex(self.columns, self.surveys)
+
+    def survey_json(self, survey_id: str) -> bytes:
+        """One serialized survey, cached so filtered pages are just joins"""
+        body = self._survey_json.get(survey_id)
+        if body is None:
+            body = self._survey_json[survey_id] = self.surveys[survey_id].to_json()
+        return body
+
+    def page_json(self, survey_ids: List[str], total: int, offset: int, limit: Optional[int]) -> bytes:
+        """Body for a filtered /api/surveys page; `order` preserves the sort in JS"""
+        items = b','.join(dumps(survey_id) + b':' + self.survey_json(survey_id) for survey_id in survey_ids)
+        meta = dumps({'order': survey_ids, 'total': total, 'offset': offset, 'limit': limit})
+        return b'{"surveys":{' + items + b'},' + meta[1:]
+
+    @cached_property
+    def surveys_json(self) -> bytes:
+        """Serialized /api/surveys body, built once per snapshot version"""
+        return encode_survey_map(self.surveys)
+
+    @cached_property
+    def summary_json(self) -> bytes:
+        """Serialized /api/summary body, computed once per snapshot version"""
+        return dumps(build_summary(self.columns, self.version, self.generated_at))
+
+    @cached_property
+    def surveys_etag(self) -> str:
+        """Content ETag of surveys_json(), stable across versions and snapshot files"""
+        return body_etag(self.surveys_json)
+
+    @cached_property
+    def summary_etag(self) -> str:
+        """
+        Weak content ETag of the summary KPIs. version and generatedAt change
+        on every publish, so they are left out: a client whose numbers are
+        unchanged gets a 304
+        """
+        kpis = {key: value for key, value in loads(self.summary_json).items()
+                if key not in ('version', 'generatedAt')}
+        return 'W/' + body_etag(dumps(kpis))
+
+    def quotas_json(self, survey_id: str) -> Optional[bytes]:
+        """Serialized /api/quotas body for one survey, cached per version"""
+        body = self._quotas_json.get(survey_id)
+        if body is None and survey_id in self.quotas:
+            body = self._quotas_json[survey_id] = encode_quota_list(self.quotas[survey_id])
+        return body
+
+    def quotas_etag(self, survey_id: str) -> Optional[str]:
+        """Content ETag of quotas_json(), unchanged while the survey's quotas are"""
+        etag = self._quotas_etag.get(survey_id)
+        if etag is None and survey_id in self.quotas:
+            etag = self._quotas_etag[survey_id] = body_etag(self.quotas_json(survey_id))
+        return etag
+
+    @staticmethod
+    def encode(surveys: Dict[str, Survey], quotas: Dict[str, List[Quota]], generated_at: float,
+               schedule: Optional[List[Dict]] = None, alerts: Optional[List[Dict]] = None) -> bytes:
+        payload = {
+            'generated_at': generated_at,
+            'surveys': {survey_id: survey.to_record() for survey_id, survey in surveys.items()},
+            'quotas': {survey_id: [q.to_record() for q in rows] for survey_id, rows in quotas.items()},
+            'schedule': schedule or [],
+            'alerts': alerts or [],
+        }
+        return dumps(payload)
+
+    @property
+    def age(self) -> float:
+        """Seconds since the poller produced this snapshot"""
+        return max(0.0, time.time() - self.generated_at)
+
+
+class SnapshotWriter:
+    """Publishes snapshots into the shared file (poller process only)"""
+
+    def __init__(self, path: Path = SNAPSHOT_PATH):
+        self.path = path
+        self._file = open(path, 'a+b')
+        size = os.fstat(self._file.fileno()).st_size
+        if size < HEADER.size:
+            self._resize(INITIAL_CAPACITY)
+        self._mm = mmap.mmap(self._file.fileno(), 0)
+        magic, fmt, seq, version, _ = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or fmt != FORMAT:
+            seq, version = 0, 0
+        # Keep counting from the previous writer so readers never see a
+        # version number go backwards after a poller restart
+        self._seq = seq + (seq & 1)
+        self.version = version
+
+    def _resize(self, capacity: int):
+        self._file.truncate(capacity)
+        self._file.flush()
+
+    def publish(self, surveys: Dict[str, Survey], quotas: Dict[str, List[Quota]],
+                generated_at: Optional[float] = None, schedule: Optional[List[Dict]] = None,
+                alerts: Optional[List[Dict]] = None) -> int:
+        """Write a new snapshot and return its version"""
+        data = Snapshot.encode(surveys, quotas, time.time() if generated_at is None else generated_at,
+                               schedule, alerts)
+        needed = HEADER.size + len(data)
+        if needed > len(self._mm):
+            capacity = max(needed, len(self._mm) * 2)
+            self._mm.close()
+            self._resize(capacity)
+            self._mm = mmap.mmap(self._file.fileno(), 0)
+
+        version = self.version + 1
+        # Seqlock: readers retry while the sequence number is odd or changes
+        self._seq += 1
+        HEADER.pack_into(self._mm, 0, MAGIC, FORMAT, self._seq, self.version, 0)
+        self._mm[HEADER.size:needed] = data
+        self._seq += 1
+        HEADER.pack_into(self._mm, 0, MAGIC, FORMAT, self._seq, version, len(data))
+        self.version = version
+        metrics.SNAPSHOT_VERSION.set(version)
+        metrics.SNAPSHOT_BYTES.set(len(data))
+        metrics.SNAPSHOT_SURVEYS.set(len(surveys))
+        return version
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+
+class SnapshotReader:
+    """
+    Reads the shared snapshot, re-parsing only when the version changes.
+    current() and version() only look at the header; read() may parse, and a
+    single thread at a time may call it alongside them
+    """
+
+    def __init__(self, path: Path = SNAPSHOT_PATH):
+        self.path = path
+        self._mm: Optional[mmap.mmap] = None
+        self._snapshot: Optional[Snapshot] = None
+
+    def _map(self) -> bool:
+        # The old mapping is dropped rather than closed: another thread may
+        # still be reading its header, and it is unmapped once unreferenced
+        try:
+            with open(self.path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size < HEADER.size:
+                    return False
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return True
+        except OSError:
+            return False
+
+    def version(self) -> int:
+        """Current published version, read straight from the mapped header"""
+        if self._mm is None and not self._map():
+            return 0
+        magic, fmt, seq, version, _ = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or fmt != FORMAT:
+            return 0
+        return version
+
+    def current(self) -> Optional[Snapshot]:
+        """
+        The decoded snapshot if no newer version has been published, without
+        parsing. While a write is in progress the header still carries the
+        previous version, so readers keep serving it instead of waiting
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and self.version() == snapshot.version:
+            return snapshot
+        return None
+
+    def read(self) -> Optional[Snapshot]:
+        """
+        Return the latest snapshot, or None if nothing has been published.
+        Parses the payload when the version changed, so async code calls it
+        through asyncio.to_thread()
+        """
+        if self._mm is None and not self._map():
+            return None
+
+        for _ in range(100):
+            magic, fmt, seq, version, length = HEADER.unpack_from(self._mm, 0)
+            if magic != MAGIC or fmt != FORMAT or version == 0:
+                return None
+            if seq & 1:
+                # Mid-write: the previous version is still consistent
+                if self._snapshot is not None:
+                    return self._snapshot
+                time.sleep(0.001)
+                continue
+            if self._snapshot is not None and self._snapshot.version == version:
+                return self._snapshot
+            end = HEADER.size + length
+            if end > len(self._mm):
+                # The writer grew the file since we mapped it
+                if not self._map():
+                    return self._snapshot
+                continue
+            try:
+                # Parse straight out of the mapping; a concurrent write is
+                # detected by the sequence check below and the result discarded
+                with memoryview(self._mm) as view, view[HEADER.size:end] as data:
+                    payload = loads(data)
+            except ValueError:
+                payload = None
+            if HEADER.unpack_from(self._mm, 0)[2] != seq:
+                continue
+            if payload is None:
+                logger.error(f"Failed to parse snapshot v{version}")
+                return self._snapshot
+            self._snapshot = Snapshot(version, payload, previous=self._snapshot)
+            metrics.SNAPSHOT_VERSION.set(version)
+            metrics.SNAPSHOT_BYTES.set(length)
+            metrics.SNAPSHOT_SURVEYS.set(len(self._snapshot.surveys))
+            return self._snapshot
+
+        logger.warning("⚠️  Snapshot kept changing while reading, serving previous version")
+        return self._snapshot
+
+
+class PollerLock:
+    """
+    Non-blocking exclusive lock that elects a single poller among workers.
+    The lock is released by the OS if the owning process dies, so another
+    worker can take over on its next attempt.
+    """
+
+    def __init__(self, path: Path = SNAPSHOT_PATH):
+        self.path = path.with_name(path.name + '.lock')
+        self._file = None
+
+    @property
+    def held(self) -> bool:
+        return self._file is not None
+
+    def acquire(self) -> bool:
+        if self._file is not None:
+            return True
+        f = open(self.path, 'a+b')
+        try:
+            if os.name == 'nt':
+                import msvcrt
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        self._file = f
+        return True
+
+    def release(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
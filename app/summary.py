@@ -0,0 +1,55 @@
+"""
+Portfolio-level KPIs for /api/summary
+Computed from the snapshot's columnar view once per snapshot version.
+"""
+from typing import Dict
+
+import numpy as np
+
+from .columnar import SurveyColumns
+from .models import map_status
+
+
+def _breakdown(columns: SurveyColumns, by: str) -> Dict[str, Dict]:
+    """Count, completes, target and spend per category of `by`"""
+    codes = columns.codes[by]
+    size = len(columns.categories[by].values)
+    counts = np.bincount(codes, minlength=size)
+    sums = {field: np.bincount(codes, weights=columns.numeric[field], minlength=size)
+            for field in ('completes', 'target', 'currentCost')}
+    result = {}
+    for code, value in enumerate(columns.categories[by].values):
+        if not counts[code]:
+            continue
+        entry = {
+            'count': int(counts[code]),
+            'completes': int(sums['completes'][code]),
+            'target': int(sums['target'][code]),
+            'spend': round(float(sums['currentCost'][code]), 2),
+        }
+        if by == 'status':
+            entry['status'] = map_status(value)
+        result['' if value is None else str(value)] = entry
+    return result
+
+
+def build_summary(columns: SurveyColumns, version: int, generated_at: float) -> Dict:
+    completes = columns.total('completes')
+    target = columns.total('target')
+    return {
+        'version': version,
+        'generatedAt': generated_at,
+        'surveys': len(columns),
+        'totalSpend': round(columns.total('currentCost'), 2),
+        'totalCompletes': int(completes),
+        'totalTarget': int(target),
+        'progress': round(completes / target * 100, 2) if target else 0.0,
+        # Weighted by completes so high-volume surveys dominate, as they do spend
+        'weightedCpi': round(columns.weighted_mean('cpi', 'completes'), 4),
+        'weightedLoi': round(columns.weighted_mean('loi', 'completes'), 2),
+        'weightedIncidence': round(columns.weighted_mean('incidence', 'completes'), 2),
+        'byStatus': _breakdown(columns, 'status'),
+        'byCountry': _breakdown(columns, 'countryCode'),
+        'byBillingId': _breakdown(columns, 'billingId'),
+        'byAccount': _breakdown(columns, 'account'),
+    }
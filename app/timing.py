@@ -0,0 +1,78 @@
+"""
+Per-request phase timings
+Code on the request path wraps work in `phase("name")`; the middleware in
+main.py collects the phases into a Server-Timing header and logs a structured
+record for slow requests. Outside a request (e.g. in the poller) phases are
+no-ops.
+"""
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+
+
+class RequestTimings:
+    """Accumulated phase durations (ms) for one request"""
+
+    __slots__ = ('start', 'phases')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+
+    def add(self, name: str, duration_ms: float):
+        self.phases[name] = self.phases.get(name, 0.0) + duration_ms
+
+    @property
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self.start) * 1000
+
+    def server_timing(self, total_ms: float) -> str:
+        """Format as a Server-Timing header value"""
+        entries = [f'{name};dur={duration:.1f}' for name, duration in self.phases.items()]
+        entries.append(f'total;dur={total_ms:.1f}')
+        return ', '.join(entries)
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar('request_timings', default=None)
+
+
+def start_request() -> RequestTimings:
+    timings = RequestTimings()
+    _current.set(timings)
+    return timings
+
+
+@contextmanager
+def phase(name: str):
+    """Time a block of work and attribute it to the current request"""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, (time.perf_counter() - start) * 1000)
+
+
+def log_if_slow(method: str, path: str, status: int, timings: RequestTimings, total_ms: float):
+    """Log a structured record for requests over SLOW_REQUEST_MS"""
+    if total_ms < SLOW_REQUEST_MS:
+        return
+    logger.warning(f"🐢 Slow request {method} {path} ({total_ms:.0f}ms)", extra={
+        'event': 'slow_request',
+        'method': method,
+        'path': path,
+        'status': status,
+        'duration_ms': round(total_ms, 1),
+        'threshold_ms': SLOW_REQUEST_MS,
+        'phases': {name: round(duration, 1) for name, duration in timings.phases.items()},
+    })
@@ -1,41 +1,109 @@
 """
 Web Dashboard for PureSpectrum Survey Monitoring
-Live dashboard that fetches data on each request
+Live dashboard served from the shared poller snapshot
 """
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
+from typing import Dict, Optional, Tuple
 from datetime import datetime
+import asyncio
+import logging
 import os
-import aiohttp
-from .scraper import PureSpectrumScraper
+import time
+from . import export, metrics, timing
+from .accounts import get_accounts, resolve_survey_key, survey_key
+from .fastjson import FastJSONResponse, RawJSONResponse, body_etag, dumps
+from .query import QueryError
+from .models import encode_quota_list, encode_survey_map, generate_quota_name
+from .history import HISTORY_MAX_BULK, HistoryStore, parse_range
+from .scheduler import POLL_BUDGET_PER_MINUTE, VIEW_WINDOW_SECONDS, ViewTable
+from .snapshot import SnapshotReader
 
-# Get credentials from environment
-PURESPECTRUM_USERNAME = os.getenv("PURESPECTRUM_USERNAME", "")
-PURESPECTRUM_PASSWORD = os.getenv("PURESPECTRUM_PASSWORD", "")
+logger = logging.getLogger(__name__)
 
+# Each worker maps the snapshot published by the poller process
+snapshot_reader = SnapshotReader()
+
+# Surveys with an open quota row get refreshed more often
+view_table = ViewTable()
+# Open rows re-send their view well within the view window
+VIEW_HEARTBEAT_MS = int(VIEW_WINDOW_SECONDS * 1000 / 3)
+
+# Trend history recorded by the poller
+history_reader = HistoryStore(readonly=True)
+
+# A snapshot older than this many poll intervals is counted as stale
+STALE_AFTER_SECONDS = 2 * float(os.getenv("POLL_INTERVAL_SECONDS", "60"))
+
+# Live quota responses (used before the first snapshot) are reused for this long
+QUOTA_CACHE_TTL_SECONDS = float(os.getenv("QUOTA_CACHE_TTL_SECONDS", "60"))
+_live_quotas: Dict[str, Tuple[float, bytes, str]] = {}
+# Upstream fetches in progress by (cache, key), joined by concurrent requests
+_inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+
+
+async def load_snapshot():
+    """
+    The current snapshot. A new version is parsed once, in a worker thread,
+    with concurrent requests waiting on that same parse
+    """
+    snapshot = snapshot_reader.current()
+    if snapshot is None and snapshot_reader.version():
+        snapshot = await _coalesce('snapshot', '', lambda: asyncio.to_thread(snapshot_reader.read))
+    return snapshot
+
+
+async def read_snapshot(cache: str, survey_id: Optional[str] = None):
+    """
+    Read the current snapshot, recording a cache hit/stale/miss. With
+    `survey_id`, a snapshot without that survey's quotas counts as a miss
+    """
+    with timing.phase('snapshot'):
+        snapshot = await load_snapshot()
+    if snapshot is None or (survey_id is not None and survey_id not in snapshot.quotas):
+        metrics.CACHE_REQUESTS.labels(cache, 'miss').inc()
+        return snapshot
+    age = snapshot.age
+    metrics.SNAPSHOT_AGE.set(age)
+    metrics.CACHE_REQUESTS.labels(cache, 'stale' if age > STALE_AFTER_SECONDS else 'hit').inc()
+    return snapshot
+
+
+def warm_snapshot():
+    """
+    Load the snapshot left on disk by the last poller run and build its hot
+    response bodies, so the first request after a cold start is served
+    without waiting on PureSpectrum
+    """
+    start = time.perf_counter()
+    snapshot = snapshot_reader.read()
+    if snapshot is None:
+        logger.info("🧊 No snapshot on disk yet, waiting for the first poll")
+        return None
+    snapshot.surveys_json
+    snapshot.summary_json
+    snapshot.index
+    logger.info(f"🔥 Warm snapshot v{snapshot.version} loaded in {(time.perf_counter() - start) * 1000:.0f}ms "
+                f"({len(snapshot.surveys)} surveys, {snapshot.age:.0f}s old)")
+    return snapshot
 
-def generate_quota_name(quota):
-    """Generate meaningful quota name from criteria"""
-    criteria = quota.get('criteria', [])
-    if not criteria:
-        return quota.get('quota_title', 'General Quota')
-    
-    parts = []
-    for criterion in criteria:
-        qual_name = criterion.get('qualification_name', '')
-        conditions = criterion.get('condition_names', [])
-        
-        if qual_name == 'Gender' and conditions:
-            parts.append(conditions[0])
-        elif qual_name == 'Age':
-            range_sets = criterion.get('range_sets', [])
-            if range_sets:
-                range = range_sets[0]
-                from_age = range.get('from', '')
-                to_age = range.get('to', '')
-                if from_age and to_age:
-                    parts.append(f"{from_age}-{to_age} yr")
-    
-    return ', '.join(parts) if parts else quota.get('quota_title', 'General Quota')
+
+async def get_readiness():
+    """Readiness: 200 once a snapshot can be served, with its age and warmth"""
+    snapshot = await load_snapshot()
+    if snapshot is None:
+        return FastJSONResponse({"ready": False, "snapshot": None}, status_code=503)
+    age = snapshot.age
+    return FastJSONResponse({
+        "ready": True,
+        "snapshot": {
+            "version": snapshot.version,
+            "surveys": len(snapshot.surveys),
+            "ageSeconds": round(age, 1),
+            "stale": age > STALE_AFTER_SECONDS,
+            # Response bodies already built for this version
+            "warm": 'surveys_json' in snapshot.__dict__,
+        },
+    })
 
 
 async def dashboard_home():
@@ -245,6 +313,16 @@ async def dashboard_home():
             display: block;
         }}
         
+        .quota-updated {{
+            font-weight: 400;
+            color: #94a3b8;
+            margin-left: 8px;
+        }}
+        
+        .quota-updated.stale {{
+            color: #dc2626;
+        }}
+        
         .quota-section-title {{
             font-size: 13px;
             font-weight: 600;
@@ -503,111 +581,432 @@ async def dashboard_home():
             return parts.length > 0 ? parts.join(', ') : (quota.quota_title || 'General Quota');
         }}
         
+        // Windowed survey list: rows are keyed by survey ID and kept in `rowsById`
+        // across refreshes, only rows near the viewport are attached to the DOM,
+        // and a refresh patches the cells whose text actually changed.
+        const ROW_ESTIMATE = 90;  // px, until a row has been measured
+        const OVERSCAN = 6;       // extra rows rendered above and below the viewport
+        const listState = {{
+            ids: [],
+            rowsById: new Map(),
+            heights: new Map(),
+            expanded: null,
+            attached: [],
+            renderQueued: false,
+        }};
+        
+        function rowValues(survey) {{
+            const target = survey.target || 0;
+            const completes = survey.completes || 0;
+            const progress = target > 0 ? (completes / target * 100) : 0;
+            const cpi = survey.cpi || 0;
+            const cost = survey.currentCost || 0;
+            
+            // Get LOI and IR from raw data if needed
+            const rawData = survey._raw || {{}};
+            const loi = survey.loi || rawData.expected_loi || rawData.loi || rawData.length_of_interview || 0;
+            const incidence = survey.incidence || rawData.expected_ir || rawData.current_incidence || rawData.incidence_rate || 0;
+            
+            return {{
+                name: survey.title || 'Untitled Survey',
+                progressText: `${{completes.toLocaleString()}} / ${{target.toLocaleString()}} (${{progress.toFixed(1)}}%)`,
+                progressWidth: `${{Math.min(progress, 100)}}%`,
+                cpi: `$${{cpi.toFixed(2)}}`,
+                cost: `$${{cost.toLocaleString(undefined, {{minimumFractionDigits: 2, maximumFractionDigits: 2}})}}`,
+                loi: formatLOI(loi),
+                ir: formatIR(incidence),
+            }};
+        }}
+        
+        function createRow(surveyId) {{
+            const row = document.createElement('div');
+            row.className = 'survey-row';
+            row.dataset.surveyId = surveyId;
+            row.innerHTML = `
+                <div class="survey-name"></div>
+                <div class="survey-progress">
+                    <div class="progress-text"></div>
+                    <div class="progress-bar">
+                        <div class="progress-fill"></div>
+                    </div>
+                </div>
+                <div class="metric"><div class="metric-label">CPI</div><div data-cell="cpi"></div></div>
+                <div class="metric"><div class="metric-label">Cost</div><div data-cell="cost"></div></div>
+                <div class="metric"><div class="metric-label">LOI</div><div data-cell="loi"></div></div>
+                <div class="metric"><div class="metric-label">IR</div><div data-cell="ir"></div></div>
+                <div class="quota-details"></div>
+            `;
+            row.cells = {{
+                name: row.querySelector('.survey-name'),
+                progressText: row.querySelector('.progress-text'),
+                cpi: row.querySelector('[data-cell="cpi"]'),
+                cost: row.querySelector('[data-cell="cost"]'),
+                loi: row.querySelector('[data-cell="loi"]'),
+                ir: row.querySelector('[data-cell="ir"]'),
+            }};
+            row.progressFill = row.querySelector('.progress-fill');
+            row.quotaDetails = row.querySelector('.quota-details');
+            row.values = {{}};
+            row.addEventListener('click', (event) => toggleQuota(surveyId, event));
+            row.addEventListener('mouseenter', () => prefetchQuotas(surveyId, true));
+            prefetchObserver.observe(row);
+            return row;
+        }}
+        
+        function patchRow(row, survey) {{
+            const values = rowValues(survey);
+            for (const [key, cell] of Object.entries(row.cells)) {{
+                if (row.values[key] !== values[key]) {{
+                    cell.textContent = values[key];
+                }}
+            }}
+            if (row.values.progressWidth !== values.progressWidth) {{
+                row.progressFill.style.width = values.progressWidth;
+            }}
+            row.values = values;
+        }}
+        
+        function quotaElement(surveyId) {{
+            const row = listState.rowsById.get(surveyId);
+            return row ? row.quotaDetails : null;
+        }}
+        
+        function ensureListSkeleton(content) {{
+            if (content.querySelector('#surveys-list')) return;
+            content.innerHTML = `
+                <div class="active-surveys-count">
+                    <div class="label">Active Surveys</div>
+                    <div class="value" id="active-count"></div>
+                </div>
+                <div class="surveys-list" id="surveys-list">
+                    <div id="list-spacer-top"></div>
+                    <div id="list-spacer-bottom"></div>
+                </div>
+            `;
+            listState.attached = [];
+        }}
+        
+        function applySurveys(content, surveys, surveyIds) {{
+            const rowsById = listState.rowsById;
+            const seen = new Set(surveyIds);
+            for (const surveyId of Array.from(rowsById.keys())) {{
+                if (!seen.has(surveyId)) {{
+                    prefetchObserver.unobserve(rowsById.get(surveyId));
+                    rowsById.delete(surveyId);
+                    quotaCache.delete(surveyId);
+                    listState.heights.delete(surveyId);
+                    if (listState.expanded === surveyId) listState.expanded = null;
+                }}
+            }}
+            
+            if (surveyIds.length === 0) {{
+                listState.ids = [];
+                listState.attached = [];
+                content.innerHTML = `
+                    <div class="empty">
+                        <h2>No active surveys found</h2>
+                    </div>
+                `;
+                return;
+            }}
+            
+            ensureListSkeleton(content);
+            surveyIds.forEach(surveyId => {{
+                let row = rowsById.get(surveyId);
+                if (!row) {{
+                    row = createRow(surveyId);
+                    rowsById.set(surveyId, row);
+                }}
+                patchRow(row, surveys[surveyId]);
+            }});
+            listState.ids = surveyIds;
+            
+            const count = document.getElementById('active-count');
+            const countText = String(surveyIds.length);
+            if (count.textContent !== countText) count.textContent = countText;
+            
+            renderWindow();
+        }}
+        
+        function rowHeight(surveyId) {{
+            return listState.heights.get(surveyId) || ROW_ESTIMATE;
+        }}
+        
+        function renderWindow() {{
+            listState.renderQueued = false;
+            const list = document.getElementById('surveys-list');
+            if (!list) return;
+            const ids = listState.ids;
+            
+            // Prefix sums of row heights, so the visible range is a binary search
+            const offsets = new Array(ids.length + 1);
+            offsets[0] = 0;
+            for (let i = 0; i < ids.length; i++) {{
+                offsets[i + 1] = offsets[i] + rowHeight(ids[i]);
+            }}
+            
+            const listTop = list.getBoundingClientRect().top + window.scrollY;
+            const viewTop = window.scrollY - listTop;
+            const viewBottom = viewTop + window.innerHeight;
+            const firstAfter = (y) => {{
+                let lo = 0, hi = ids.length;
+                while (lo < hi) {{
+                    const mid = (lo + hi) >> 1;
+                    if (offsets[mid + 1] <= y) lo = mid + 1; else hi = mid;
+                }}
+                return lo;
+            }};
+            const start = Math.max(0, firstAfter(viewTop) - OVERSCAN);
+            const end = Math.min(ids.length, firstAfter(viewBottom) + 1 + OVERSCAN);
+            
+            const visible = ids.slice(start, end);
+            const topSpacer = document.getElementById('list-spacer-top');
+            const bottomSpacer = document.getElementById('list-spacer-bottom');
+            topSpacer.style.height = offsets[start] + 'px';
+            bottomSpacer.style.height = (offsets[ids.length] - offsets[end]) + 'px';
+            
+            const attached = listState.attached;
+            const unchanged = attached.length === visible.length && attached.every((id, i) => id === visible[i]);
+            if (!unchanged) {{
+                // replaceChildren moves the existing row elements, it does not rebuild them
+                list.replaceChildren(topSpacer, ...visible.map(id => listState.rowsById.get(id)), bottomSpacer);
+                listState.attached = visible;
+            }}
+            
+            // Measure what was rendered; re-render once if estimates were off
+            let remeasure = false;
+            visible.forEach(surveyId => {{
+                const height = listState.rowsById.get(surveyId).offsetHeight;
+                if (height && height !== listState.heights.get(surveyId)) {{
+                    listState.heights.set(surveyId, height);
+                    remeasure = true;
+                }}
+            }});
+            if (remeasure) scheduleRender();
+        }}
+        
+        function scheduleRender() {{
+            if (listState.renderQueued) return;
+            listState.renderQueued = true;
+            requestAnimationFrame(renderWindow);
+        }}
+        
         function toggleQuota(surveyId, event) {{
             event.stopPropagation();
-            const row = event.currentTarget || event.target.closest('.survey-row');
-            const quotaDetails = document.getElementById('quota-' + surveyId);
+            const row = listState.rowsById.get(surveyId);
+            if (!row) return;
             
-            if (row.classList.contains('expanded')) {{
+            if (listState.expanded === surveyId) {{
                 row.classList.remove('expanded');
+                listState.expanded = null;
             }} else {{
-                // Close all other expanded rows
-                document.querySelectorAll('.survey-row.expanded').forEach(r => {{
-                    r.classList.remove('expanded');
-                }});
+                // Close the other expanded row, even if it is scrolled out of the window
+                const previous = listState.rowsById.get(listState.expanded);
+                if (previous) previous.classList.remove('expanded');
                 row.classList.add('expanded');
+                listState.expanded = surveyId;
                 
-                // Load quotas if not already loaded
-                if (quotaDetails && quotaDetails.innerHTML.trim() === '') {{
-                    loadQuotas(surveyId);
+                // Served from the quota cache, revalidated when stale
+                loadQuotas(surveyId);
+                markViewed(surveyId);
+            }}
+            scheduleRender();
+        }}
+        
+        // Quota cache: surveyId -> {{quotas, etag, fetchedAt, pending}}. Entries are
+        // shown immediately when the row is opened and revalidated with the ETag
+        // (a 304 when unchanged) once they are older than QUOTA_TTL_MS.
+        const QUOTA_TTL_MS = 60000;
+        const PREFETCH_CONCURRENCY = 2;
+        const quotaCache = new Map();
+        const prefetchQueue = [];
+        let prefetchActive = 0;
+        
+        // Open rows tell the server they are being looked at, so their survey
+        // is refreshed more often; prefetches never do
+        const VIEW_HEARTBEAT_MS = {VIEW_HEARTBEAT_MS};
+        
+        function markViewed(surveyId) {{
+            fetch(`/api/quotas/${{encodeURIComponent(surveyId)}}/view`, {{method: 'POST'}}).catch(() => {{}});
+        }}
+        
+        setInterval(() => {{
+            if (listState.expanded && document.visibilityState === 'visible') {{
+                markViewed(listState.expanded);
+            }}
+        }}, VIEW_HEARTBEAT_MS);
+        
+        function isFresh(entry) {{
+            return !!(entry && entry.quotas && Date.now() - entry.fetchedAt < QUOTA_TTL_MS);
+        }}
+        
+        function fetchQuotas(surveyId) {{
+            const entry = quotaCache.get(surveyId) || {{}};
+            if (entry.pending) return entry.pending;
+            const headers = entry.etag ? {{'If-None-Match': entry.etag}} : {{}};
+            entry.pending = (async () => {{
+                try {{
+                    const response = await fetch(`/api/quotas/${{encodeURIComponent(surveyId)}}`, {{headers}});
+                    if (response.status === 304 && entry.quotas) {{
+                        entry.fetchedAt = Date.now();
+                        return entry;
+                    }}
+                    if (!response.ok) throw new Error('Failed to load quotas');
+                    
+                    const data = await response.json();
+                    if (data.error) {{
+                        throw new Error(data.error);
+                    }}
+                    entry.quotas = data.quotas || [];
+                    entry.etag = response.headers.get('ETag');
+                    entry.fetchedAt = Date.now();
+                    return entry;
+                }} finally {{
+                    entry.pending = null;
                 }}
+            }})();
+            quotaCache.set(surveyId, entry);
+            return entry.pending;
+        }}
+        
+        function prefetchQuotas(surveyId, urgent) {{
+            const entry = quotaCache.get(surveyId);
+            if (isFresh(entry) || (entry && entry.pending) || prefetchQueue.includes(surveyId)) return;
+            if (urgent) prefetchQueue.unshift(surveyId); else prefetchQueue.push(surveyId);
+            drainPrefetch();
+        }}
+        
+        function drainPrefetch() {{
+            while (prefetchActive < PREFETCH_CONCURRENCY && prefetchQueue.length) {{
+                const surveyId = prefetchQueue.shift();
+                const row = listState.rowsById.get(surveyId);
+                // Skip rows that were scrolled past before their turn came
+                if (!row || !row.isConnected || isFresh(quotaCache.get(surveyId))) continue;
+                prefetchActive++;
+                fetchQuotas(surveyId).catch(() => {{}}).finally(() => {{
+                    prefetchActive--;
+                    drainPrefetch();
+                }});
             }}
         }}
         
-        async function loadQuotas(surveyId) {{
-            const quotaDetails = document.getElementById('quota-' + surveyId);
-            if (!quotaDetails) return;
+        const prefetchObserver = new IntersectionObserver(entries => {{
+            entries.forEach(entry => {{
+                if (entry.isIntersecting) prefetchQuotas(entry.target.dataset.surveyId, false);
+            }});
+        }});
+        
+        function quotaStamp(entry) {{
+            return 'updated ' + new Date(entry.fetchedAt).toLocaleTimeString();
+        }}
+        
+        function renderQuotas(quotaDetails, entry) {{
+            const quotas = entry.quotas;
+            quotaDetails.dataset.etag = entry.etag || '';
+            if (quotas.length === 0) {{
+                quotaDetails.innerHTML = '<div class="quota-section-title" style="color: #94a3b8;">No quota data available</div>';
+                return;
+            }}
             
-            quotaDetails.innerHTML = '<div class="quota-section-title">Loading quotas...</div>';
+            let html = `<div class="quota-section-title">Quota Details <span class="quota-updated">${{quotaStamp(entry)}}</span></div>`;
             
-            try {{
-                const response = await fetch(`/api/quotas/${{surveyId}}`);
-                if (!response.ok) throw new Error('Failed to load quotas');
-                
-                const data = await response.json();
-                if (data.error) {{
-                    throw new Error(data.error);
-                }}
-                
-                const quotas = data.quotas || [];
-                if (quotas.length === 0) {{
-                    quotaDetails.innerHTML = '<div class="quota-section-title" style="color: #94a3b8;">No quota data available</div>';
-                    return;
-                }}
-                
-                let html = '<div class="quota-section-title">Quota Details</div>';
-                
-                // Group quotas
-                const grouped = {{}};
-                quotas.forEach(quota => {{
-                    const group = quota.group_key || 'General';
-                    if (!grouped[group]) grouped[group] = [];
-                    grouped[group].push(quota);
-                }});
-                
-                for (const [groupName, groupQuotas] of Object.entries(grouped)) {{
-                    html += `<div class="quota-group">`;
-                    html += `<div class="quota-group-title">${{groupName}}</div>`;
-                    html += `
-                    <div class="quota-table-wrapper">
-                        <table class="quota-table">
-                            <thead>
-                                <tr>
-                                    <th>Quota</th>
-                                    <th>Fielded</th>
-                                    <th>Goal</th>
-                                    <th>Progress</th>
-                                    <th>Target</th>
-                                    <th>Open</th>
-                                    <th>In Progress</th>
-                                </tr>
-                            </thead>
-                            <tbody>
-`;
-                    
-                    groupQuotas.forEach(quota => {{
-                        const name = generateQuotaName(quota);
-                        const fielded = quota.achieved || 0;
-                        const goal = quota.required_count || 0;
-                        const quotaProgress = goal > 0 ? (fielded / goal * 100) : 0;
-                        const currentTarget = quota.current_target || goal;
-                        const currentlyOpen = quota.currently_open || 0;
-                        const inProgress = quota.in_progress || 0;
-                        
-                        html += `
-                                <tr>
-                                    <td class="quota-name-cell" title="${{name}}">${{name}}</td>
-                                    <td class="quota-number">${{fielded.toLocaleString()}}</td>
-                                    <td class="quota-number">${{goal.toLocaleString()}}</td>
-                                    <td class="quota-number quota-progress-cell">${{quotaProgress.toFixed(1)}}%</td>
-                                    <td class="quota-number">${{currentTarget.toLocaleString()}}</td>
-                                    <td class="quota-number">${{currentlyOpen.toLocaleString()}}</td>
-                                    <td class="quota-number">${{inProgress.toLocaleString()}}</td>
-                                </tr>
+            // Group quotas
+            const grouped = {{}};
+            quotas.forEach(quota => {{
+                const group = quota.group_key || 'General';
+                if (!grouped[group]) grouped[group] = [];
+                grouped[group].push(quota);
+            }});
+            
+            for (const [groupName, groupQuotas] of Object.entries(grouped)) {{
+                html += `<div class="quota-group">`;
+                html += `<div class="quota-group-title">${{groupName}}</div>`;
+                html += `
+                <div class="quota-table-wrapper">
+                    <table class="quota-table">
+                        <thead>
+                            <tr>
+                                <th>Quota</th>
+                                <th>Fielded</th>
+                                <th>Goal</th>
+                                <th>Progress</th>
+                                <th>Target</th>
+                                <th>Open</th>
+                                <th>In Progress</th>
+                            </tr>
+                        </thead>
+                        <tbody>
 `;
-                    }});
+                
+                groupQuotas.forEach(quota => {{
+                    const name = generateQuotaName(quota);
+                    const fielded = quota.achieved || 0;
+                    const goal = quota.required_count || 0;
+                    const quotaProgress = goal > 0 ? (fielded / goal * 100) : 0;
+                    const currentTarget = quota.current_target || goal;
+                    const currentlyOpen = quota.currently_open || 0;
+                    const inProgress = quota.in_progress || 0;
                     
                     html += `
-                            </tbody>
-                        </table>
-                    </div>
+                            <tr>
+                                <td class="quota-name-cell" title="${{name}}">${{name}}</td>
+                                <td class="quota-number">${{fielded.toLocaleString()}}</td>
+                                <td class="quota-number">${{goal.toLocaleString()}}</td>
+                                <td class="quota-number quota-progress-cell">${{quotaProgress.toFixed(1)}}%</td>
+                                <td class="quota-number">${{currentTarget.toLocaleString()}}</td>
+                                <td class="quota-number">${{currentlyOpen.toLocaleString()}}</td>
+                                <td class="quota-number">${{inProgress.toLocaleString()}}</td>
+                            </tr>
 `;
-                    html += '</div>';
-                }}
+                }});
                 
-                quotaDetails.innerHTML = html;
+                html += `
+                        </tbody>
+                    </table>
+                </div>
+`;
+                html += '</div>';
+            }}
+            
+            quotaDetails.innerHTML = html;
+        }}
+        
+        async function loadQuotas(surveyId) {{
+            const quotaDetails = quotaElement(surveyId);
+            if (!quotaDetails) return;
+            
+            const cached = quotaCache.get(surveyId);
+            const shown = !!(cached && cached.quotas);
+            if (shown) {{
+                // Instant from cache; revalidate below only once it is stale
+                if (quotaDetails.dataset.etag !== (cached.etag || '') || quotaDetails.innerHTML.trim() === '') {{
+                    renderQuotas(quotaDetails, cached);
+                }}
+                if (isFresh(cached)) return;
+            }} else {{
+                quotaDetails.innerHTML = '<div class="quota-section-title">Loading quotas...</div>';
+            }}
+            
+            try {{
+                const entry = await fetchQuotas(surveyId);
+                const stamp = quotaDetails.querySelector('.quota-updated');
+                if (shown && stamp && quotaDetails.dataset.etag === (entry.etag || '')) {{
+                    stamp.textContent = quotaStamp(entry);
+                }} else {{
+                    renderQuotas(quotaDetails, entry);
+                }}
             }} catch (err) {{
-                quotaDetails.innerHTML = `<div class="quota-section-title" style="color: #dc2626;">Error loading quotas: ${{err.message}}</div>`;
+                const stamp = quotaDetails.querySelector('.quota-updated');
+                if (shown && stamp) {{
+                    // Keep the cached table but say that it is out of date
+                    stamp.textContent = `${{quotaStamp(cached)}}, refresh failed: ${{err.message}}`;
+                    stamp.classList.add('stale');
+                }} else {{
+                    quotaDetails.innerHTML = `<div class="quota-section-title" style="color: #dc2626;">Error loading quotas: ${{err.message}}</div>`;
+                }}
+            }} finally {{
+                // The expanded row changed height
+                scheduleRender();
             }}
         }}
         
@@ -616,9 +1015,9 @@ async def dashboard_home():
             const error = document.getElementById('error');
             const content = document.getElementById('dashboard-content');
             
-            loading.style.display = 'block';
+            // Only the first load shows the spinner; refreshes patch the list in place
+            loading.style.display = listState.ids.length ? 'none' : 'block';
             error.style.display = 'none';
-            content.innerHTML = '';
             
             // Update timestamp
             document.getElementById('last-updated').textContent = new Date().toLocaleString();
@@ -645,75 +1044,12 @@ async def dashboard_home():
                 }}
                 
                 const surveys = data.surveys || {{}};
-                const surveyIds = Object.keys(surveys);
-                
-                if (surveyIds.length === 0) {{
-                    content.innerHTML = `
-                        <div class="empty">
-                            <h2>No active surveys found</h2>
-                        </div>
-                    `;
-                    loading.style.display = 'none';
-                    return;
+                applySurveys(content, surveys, data.order || Object.keys(surveys));
+                if (listState.expanded) {{
+                    // Keep the open quota table from going stale on a wallboard
+                    loadQuotas(listState.expanded);
                 }}
                 
-                // Active surveys count
-                let html = `
-                    <div class="active-surveys-count">
-                        <div class="label">Active Surveys</div>
-                        <div class="value">${{surveyIds.length}}</div>
-                    </div>
-                    <div class="surveys-list">
-                `;
-                
-                // Survey rows
-                surveyIds.forEach(surveyId => {{
-                    const survey = surveys[surveyId];
-                    const target = survey.target || 0;
-                    const completes = survey.completes || 0;
-                    const progress = target > 0 ? (completes / target * 100) : 0;
-                    const title = survey.title || 'Untitled Survey';
-                    const cpi = survey.cpi || 0;
-                    const cost = survey.currentCost || 0;
-                    
-                    // Get LOI and IR from raw data if needed
-                    const rawData = survey._raw || {{}};
-                    const loi = survey.loi || rawData.expected_loi || rawData.loi || rawData.length_of_interview || 0;
-                    const incidence = survey.incidence || rawData.expected_ir || rawData.current_incidence || rawData.incidence_rate || 0;
-                    
-                    html += `
-                        <div class="survey-row" onclick="toggleQuota('${{surveyId}}', event)">
-                            <div class="survey-name">${{title}}</div>
-                            <div class="survey-progress">
-                                <div class="progress-text">${{completes.toLocaleString()}} / ${{target.toLocaleString()}} (${{progress.toFixed(1)}}%)</div>
-                                <div class="progress-bar">
-                                    <div class="progress-fill" style="width: ${{Math.min(progress, 100)}}%"></div>
-                                </div>
-                            </div>
-                            <div class="metric">
-                                <div class="metric-label">CPI</div>
-                                <div>$${{cpi.toFixed(2)}}</div>
-                            </div>
-                            <div class="metric">
-                                <div class="metric-label">Cost</div>
-                                <div>$${{cost.toLocaleString(undefined, {{minimumFractionDigits: 2, maximumFractionDigits: 2}})}}</div>
-                            </div>
-                            <div class="metric">
-                                <div class="metric-label">LOI</div>
-                                <div>${{formatLOI(loi)}}</div>
-                            </div>
-                            <div class="metric">
-                                <div class="metric-label">IR</div>
-                                <div>${{formatIR(incidence)}}</div>
-                            </div>
-                            <div class="quota-details" id="quota-${{surveyId}}"></div>
-                        </div>
-                    `;
-                }});
-                
-                html += '</div>';
-                content.innerHTML = html;
-                
             }} catch (err) {{
                 let errorMsg = 'Error: ' + err.message;
                 if (err.name === 'AbortError') {{
@@ -727,6 +1063,13 @@ async def dashboard_home():
             }}
         }}
         
+        window.addEventListener('scroll', scheduleRender, {{passive: true}});
+        window.addEventListener('resize', () => {{
+            // Row heights depend on the layout width
+            listState.heights.clear();
+            scheduleRender();
+        }});
+        
         // Load surveys on page load
         window.addEventListener('load', () => {{
             loadSurveys();
@@ -738,39 +1081,292 @@ async def dashboard_home():
     return HTMLResponse(content=html_content)
 
 
-async def get_surveys():
-    """API endpoint to get all live surveys"""
-    if not PURESPECTRUM_USERNAME or not PURESPECTRUM_PASSWORD:
-        return {"error": "PureSpectrum credentials not configured"}
+async def get_surveys(filters: Optional[Dict[str, str]] = None, q: Optional[str] = None,
+                      sort: Optional[str] = None, offset: int = 0, limit: Optional[int] = None,
+                      if_none_match: Optional[str] = None):
+    """
+    API endpoint to get all live surveys
+    
+    Args:
+        filters: status / country / billing_id / account -> comma-separated values
+        q: title search
+        sort: progress, cost, cpi or last_complete ('-' prefix for descending)
+        offset, limit: pagination
+        if_none_match: revalidates the unfiltered list against its content ETag
+    """
+    snapshot = await read_snapshot('surveys')
+    filtered = any((filters or {}).values()) or q or sort or offset or limit is not None
+    if snapshot is not None and not filtered:
+        # Serialized once per snapshot version, later reads just send the bytes
+        headers = {"ETag": snapshot.surveys_etag, "Cache-Control": "no-cache"}
+        if if_none_match == snapshot.surveys_etag:
+            return Response(status_code=304, headers=headers)
+        with timing.phase('serialize'):
+            return RawJSONResponse(snapshot.surveys_json, headers=headers)
+    if snapshot is not None:
+        try:
+            with timing.phase('query'):
+                survey_ids, total = snapshot.index.query(filters or {}, q, sort, offset, limit)
+        except QueryError as e:
+            return FastJSONResponse({"error": str(e)}, status_code=400)
+        with timing.phase('serialize'):
+            return RawJSONResponse(snapshot.page_json(survey_ids, total, offset, limit))
+    
+    # No snapshot published yet (poller still starting), fetch directly.
+    # Imported here to keep aiohttp off the startup path
+    import aiohttp
+    from .scraper import PureSpectrumScraper
+    
+    accounts = [account for account in get_accounts() if account.configured]
+    if not accounts:
+        return FastJSONResponse({"error": "PureSpectrum credentials not configured"})
+    
+    async def fetch(session, account):
+        scraper = PureSpectrumScraper(account.username, account.password, account, interactive=True)
+        if not await scraper.login(session):
+            return account, None
+        return account, await scraper.get_survey_data(session)
     
     try:
-        scraper = PureSpectrumScraper(PURESPECTRUM_USERNAME, PURESPECTRUM_PASSWORD)
-        
         async with aiohttp.ClientSession() as session:
-            if not await scraper.login(session):
-                return {"error": "Failed to authenticate with PureSpectrum"}
-            
-            survey_data = await scraper.get_survey_data(session)
-            
-            return {"surveys": survey_data}
+            results = await asyncio.gather(*(fetch(session, account) for account in accounts))
+        if all(surveys is None for _, surveys in results):
+            return FastJSONResponse({"error": "Failed to authenticate with PureSpectrum"})
+        
+        survey_data = {}
+        for account, surveys in results:
+            for survey_id, survey in (surveys or {}).items():
+                survey_data[survey_key(account.name, survey_id)] = survey
+        
+        with timing.phase('serialize'):
+            return RawJSONResponse(encode_survey_map(survey_data))
     except Exception as e:
-        return {"error": str(e)}
+        return FastJSONResponse({"error": str(e)})
+
 
+def record_view(survey_id: str):
+    """
+    A dashboard row with the survey's quotas is open. Sent when the row is
+    opened and as a heartbeat while it stays open, never by prefetches, so
+    only surveys someone is looking at get the hot refresh interval
+    """
+    view_table.record(survey_id)
+    return Response(status_code=204)
 
-async def get_quotas(survey_id: str):
+
+async def get_quotas(survey_id: str, if_none_match: Optional[str] = None):
     """API endpoint to get quotas for a specific survey"""
-    if not PURESPECTRUM_USERNAME or not PURESPECTRUM_PASSWORD:
-        return {"error": "PureSpectrum credentials not configured"}
+    snapshot = await read_snapshot('quotas', survey_id)
+    if snapshot is not None and survey_id in snapshot.quotas:
+        # Content ETag: revalidating unchanged quotas costs a 304 across snapshot versions
+        headers = {"ETag": snapshot.quotas_etag(survey_id), "Cache-Control": "no-cache"}
+        if if_none_match == headers["ETag"]:
+            return Response(status_code=304, headers=headers)
+        with timing.phase('serialize'):
+            return RawJSONResponse(snapshot.quotas_json(survey_id), headers=headers)
+    
+    cached = _live_quotas.get(survey_id)
+    if cached is not None and time.monotonic() - cached[0] < QUOTA_CACHE_TTL_SECONDS:
+        metrics.CACHE_REQUESTS.labels('live_quotas', 'hit').inc()
+        headers = {"ETag": cached[2], "Cache-Control": "no-cache"}
+        if if_none_match == cached[2]:
+            return Response(status_code=304, headers=headers)
+        return RawJSONResponse(cached[1], headers=headers)
+    metrics.CACHE_REQUESTS.labels('live_quotas', 'miss').inc()
+    
+    account, upstream_id = resolve_survey_key(survey_id)
+    if account is None:
+        return FastJSONResponse({"error": f"Unknown account in survey ID {survey_id!r}"}, status_code=404)
+    if not account.configured:
+        return FastJSONResponse({"error": "PureSpectrum credentials not configured"})
+    
+    # Viewers opening the same survey together share one login and upstream call
+    error, body, etag = await _coalesce('live_quotas', survey_id,
+                                        lambda: _fetch_live_quotas(survey_id, account, upstream_id))
+    if error is not None:
+        return FastJSONResponse({"error": error})
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if if_none_match == etag:
+        return Response(status_code=304, headers=headers)
+    return RawJSONResponse(body, headers=headers)
+
+
+async def _coalesce(cache: str, key: str, fetch):
+    """
+    Single-flight: the first caller for `key` starts `fetch()`, later callers
+    await the same task until it finishes. Shielded, so a client that
+    disconnects does not cancel the fetch for the others.
+    """
+    task = _inflight.get((cache, key))
+    if task is None:
+        task = asyncio.ensure_future(fetch())
+        _inflight[(cache, key)] = task
+        task.add_done_callback(lambda _: _inflight.pop((cache, key), None))
+    else:
+        metrics.COALESCED_REQUESTS.labels(cache).inc()
+    return await asyncio.shield(task)
+
+
+async def _fetch_live_quotas(survey_id: str, account, upstream_id: str) -> Tuple[Optional[str], bytes, str]:
+    """(error, body, etag) of one live quota fetch, cached for QUOTA_CACHE_TTL_SECONDS"""
+    # Live fallback only, imported here to keep aiohttp off the startup path
+    import aiohttp
+    from .scraper import PureSpectrumScraper
     
     try:
-        scraper = PureSpectrumScraper(PURESPECTRUM_USERNAME, PURESPECTRUM_PASSWORD)
+        scraper = PureSpectrumScraper(account.username, account.password, account, interactive=True)
         
         async with aiohttp.ClientSession() as session:
             if not await scraper.login(session):
-                return {"error": "Failed to authenticate with PureSpectrum"}
+                return "Failed to authenticate with PureSpectrum", b'', ''
             
-            quotas = await scraper.get_survey_quotas(session, survey_id)
+            quotas = await scraper.get_survey_quotas(session, upstream_id)
+            if quotas is None:
+                return "Failed to fetch quotas from PureSpectrum", b'', ''
             
-            return {"quotas": quotas}
+            with timing.phase('serialize'):
+                body = encode_quota_list(quotas)
+            etag = body_etag(body)
+            now = time.monotonic()
+            for key in [k for k, entry in _live_quotas.items() if now - entry[0] >= QUOTA_CACHE_TTL_SECONDS]:
+                del _live_quotas[key]
+            _live_quotas[survey_id] = (now, body, etag)
+            return None, body, etag
     except Exception as e:
-        return {"error": str(e)}
+        return str(e), b'', ''
+
+
+async def get_summary(if_none_match: Optional[str] = None):
+    """API endpoint for portfolio KPIs, cached per snapshot version"""
+    snapshot = await read_snapshot('summary')
+    if snapshot is None:
+        return FastJSONResponse({"error": "No survey snapshot available yet"})
+    
+    # Wallboards poll this often; unchanged versions cost a 304 and no body
+    headers = {"ETag": snapshot.summary_etag, "Cache-Control": "no-cache"}
+    if if_none_match == snapshot.summary_etag:
+        return Response(status_code=304, headers=headers)
+    with timing.phase('serialize'):
+        return RawJSONResponse(snapshot.summary_json, headers=headers)
+
+
+async def get_schedule():
+    """Debugging endpoint: quota refresh schedule as of the latest snapshot, soonest first"""
+    snapshot = await read_snapshot('schedule')
+    if snapshot is None:
+        return FastJSONResponse({"error": "No survey snapshot available yet"})
+    now = time.time()
+    rows = sorted(snapshot.schedule, key=lambda row: row['dueAt'])
+    return FastJSONResponse({
+        "generatedAt": snapshot.generated_at,
+        "budgetPerMinute": POLL_BUDGET_PER_MINUTE,
+        "reasons": {reason: sum(1 for row in rows if row['reason'] == reason)
+                    for reason in sorted({row['reason'] for row in rows})},
+        "surveys": [dict(row, dueIn=round(row['dueAt'] - now, 1)) for row in rows],
+    })
+
+
+async def get_alerts(state: Optional[str] = None, survey_id: Optional[str] = None,
+                     if_none_match: Optional[str] = None):
+    """
+    API endpoint for threshold alerts, as of the latest snapshot
+    
+    Args:
+        state: firing (default), resolved or all
+        survey_id: only alerts of this survey
+    """
+    snapshot = await read_snapshot('alerts')
+    if snapshot is None:
+        return FastJSONResponse({"error": "No survey snapshot available yet"})
+    state = state or 'firing'
+    if state not in ('firing', 'resolved', 'all'):
+        return FastJSONResponse({"error": f"Unknown state {state!r}, expected firing, resolved or all"},
+                                status_code=400)
+    
+    alerts = [alert for alert in snapshot.alerts
+              if (state == 'all' or alert['state'] == state)
+              and (survey_id is None or alert['surveyId'] == survey_id)]
+    alerts.sort(key=lambda alert: alert['firingSince'], reverse=True)
+    # Weak content ETag of the alerts alone; generatedAt changes on every publish
+    etag = 'W/' + body_etag(dumps(alerts))
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if if_none_match == etag:
+        return Response(status_code=304, headers=headers)
+    return FastJSONResponse({"generatedAt": snapshot.generated_at, "alerts": alerts}, headers=headers)
+
+
+async def get_history(survey_ids, start: Optional[float] = None, end: Optional[float] = None,
+                      resolution: Optional[float] = None, points: Optional[int] = None):
+    """
+    API endpoint for downsampled completes/cost history (min/max/last per bucket)
+    
+    Args:
+        survey_ids: one survey ID, or a list for the bulk endpoint
+        start, end: Unix timestamps (default: the last 7 days)
+        resolution: bucket width in seconds, or
+        points: number of buckets to spread the range over (default 200)
+    """
+    bulk = not isinstance(survey_ids, str)
+    ids = list(dict.fromkeys(survey_ids)) if bulk else [survey_ids]
+    if not ids:
+        return FastJSONResponse({"error": "No survey IDs given"}, status_code=400)
+    if len(ids) > HISTORY_MAX_BULK:
+        return FastJSONResponse({"error": f"At most {HISTORY_MAX_BULK} surveys per request"}, status_code=400)
+    try:
+        start, end, resolution = parse_range(start, end, resolution, points)
+    except QueryError as e:
+        return FastJSONResponse({"error": str(e)}, status_code=400)
+    
+    with timing.phase('history'):
+        series, source, resolution = await asyncio.to_thread(history_reader.series, ids, start, end, resolution)
+    meta = {"start": start, "end": end, "resolution": resolution, "source": source}
+    if bulk:
+        return FastJSONResponse({**meta, "series": series})
+    return FastJSONResponse({"surveyId": ids[0], **meta, **series[ids[0]]})
+
+
+async def get_export(table: str, fmt: str, filters: Optional[Dict[str, str]] = None, q: Optional[str] = None,
+                     sort: Optional[str] = None, start: Optional[float] = None, end: Optional[float] = None,
+                     resolution: Optional[float] = None, points: Optional[int] = None):
+    """
+    Streamed CSV / Excel download of the surveys or quotas in the latest snapshot
+    
+    Args:
+        table: surveys or quotas
+        fmt: csv or xlsx
+        filters, q, sort: as for /api/surveys, select the surveys exported
+        start, end, resolution, points: export survey history over this range
+            instead of current values (as for /api/history)
+    """
+    if fmt not in export.FORMATS:
+        return FastJSONResponse({"error": f"Unknown format {fmt!r}, expected csv or xlsx"}, status_code=400)
+    history = start is not None or end is not None
+    if history and table != 'surveys':
+        return FastJSONResponse({"error": "History exports cover surveys only"}, status_code=400)
+    snapshot = await read_snapshot('export')
+    if snapshot is None:
+        return FastJSONResponse({"error": "No survey snapshot available yet"})
+    try:
+        with timing.phase('query'):
+            survey_ids, _ = snapshot.index.query(filters or {}, q, sort)
+        if history:
+            start, end, resolution = parse_range(start, end, resolution, points)
+    except QueryError as e:
+        return FastJSONResponse({"error": str(e)}, status_code=400)
+    
+    stamp = datetime.fromtimestamp(snapshot.generated_at).strftime('%Y%m%d-%H%M')
+    name = 'survey-history' if history else table
+    encoder = export.encoder(fmt, name)
+    if history:
+        body = export.stream_batches(encoder, export.HISTORY_HEADER, export.history_rows(
+            history_reader, snapshot.surveys, survey_ids, start, end, resolution))
+    elif table == 'surveys':
+        body = export.stream(encoder, [header for header, _ in export.SURVEY_COLUMNS],
+                             export.survey_rows(snapshot.surveys, survey_ids))
+    else:
+        body = export.stream(encoder, [header for header, _ in export.QUOTA_COLUMNS],
+                             export.quota_rows(snapshot.surveys, snapshot.quotas, survey_ids))
+    # Rows are encoded as the client reads them (sync generators in the threadpool)
+    return StreamingResponse(body, media_type=export.FORMATS[fmt], headers={
+        "Content-Disposition": f'attachment; filename="{name}-{stamp}.{fmt}"',
+    })
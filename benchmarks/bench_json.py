@@ -0,0 +1,76 @@
+"""
+Encode-time benchmark for the /api/surveys body
+Compares the old FastAPI path (jsonable_encoder + stdlib json), plain stdlib
+and orjson encoding, the model splice encoder, and a cached snapshot body on a
+large synthetic snapshot.
+
+    python -m benchmarks.bench_json --surveys 2000 --repeat 20
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.encoders import jsonable_encoder
+
+from app import fastjson
+from app.fastjson import RawJSONResponse
+from app.models import Survey, encode_survey_map
+from app.snapshot import Snapshot
+
+from .mock_purespectrum import build_survey
+
+
+def timed(fn, repeat: int) -> float:
+    """Best-of-N wall time in milliseconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--surveys', type=int, default=2000)
+    parser.add_argument('--raw-padding', type=int, default=80)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    surveys = {}
+    for i in range(args.surveys):
+        survey = Survey.from_api(build_survey(rng, 100000 + i, args.raw_padding))
+        surveys[survey.survey_id] = survey
+    as_dicts = {"surveys": {survey_id: s.to_dict() for survey_id, s in surveys.items()}}
+    snapshot = Snapshot(1, fastjson.loads(Snapshot.encode(surveys, {}, time.time())))
+    body = snapshot.surveys_json
+
+    cases = [
+        ('jsonable_encoder + json (old path)',
+         lambda: json.dumps(jsonable_encoder(as_dicts), ensure_ascii=False, separators=(',', ':')).encode('utf-8')),
+        ('stdlib json.dumps', lambda: json.dumps(as_dicts, separators=(',', ':')).encode('utf-8')),
+    ]
+    if fastjson.orjson is not None:
+        cases.append(('orjson.dumps', lambda: fastjson.orjson.dumps(as_dicts)))
+    cases += [
+        ('model splice (encode_survey_map)', lambda: encode_survey_map(surveys)),
+        ('cached snapshot body', lambda: RawJSONResponse(snapshot.surveys_json)),
+    ]
+
+    print(f"{args.surveys} surveys, body {len(body) / 1024 / 1024:.1f} MiB, "
+          f"orjson {'available' if fastjson.orjson is not None else 'not installed'}\n")
+    baseline = None
+    for name, fn in cases:
+        ms = timed(fn, args.repeat)
+        baseline = baseline or ms
+        print(f"{name:38} {ms:10.3f} ms  {baseline / ms:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
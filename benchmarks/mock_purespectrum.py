@@ -0,0 +1,211 @@
+"""
+Local mock of the PureSpectrum buyer API
+Serves the spectrumsurveys.com/buyers/v2 endpoints used by PureSpectrumScraper
+(surveys list with pagination, survey detail, quotas, health) from a synthetic
+dataset, with configurable latency, error rate and dataset size.
+
+Run standalone:
+    python -m benchmarks.mock_purespectrum --surveys 300 --latency-ms 150
+then point the app at it:
+    PURESPECTRUM_API_BASE=http://localhost:8100/buyers/v2
+"""
+import argparse
+import asyncio
+import random
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from aiohttp import web
+
+MOCK_TOKEN = "mock-token"
+
+COUNTRIES = ['US', 'GB', 'CA', 'DE', 'FR', 'AU', 'IN', 'BR']
+BILLING_IDS = ['PO-1001', 'PO-1002', 'PO-2040', 'PO-3300', 'PO-4711']
+TOPICS = ['Brand Tracker', 'Ad Test', 'Concept Test', 'Usage & Attitude', 'Pricing Study', 'Shopper Insights']
+
+
+class MockConfig:
+    def __init__(self, surveys: int = 100, quotas_per_survey: int = 12, latency_ms: float = 50,
+                 jitter_ms: float = 20, error_rate: float = 0.0, raw_padding: int = 40,
+                 drift: int = 0, seed: int = 42):
+        self.surveys = surveys
+        self.quotas_per_survey = quotas_per_survey
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.raw_padding = raw_padding
+        self.drift = drift
+        self.seed = seed
+
+
+def build_survey(rng: random.Random, survey_id: int, raw_padding: int) -> Dict:
+    target = rng.choice([100, 200, 300, 500, 800, 1000, 1500])
+    fielded = rng.randint(0, target)
+    cpi = round(rng.uniform(0.8, 12.0), 2)
+    now = datetime.utcnow()
+    survey = {
+        'ps_survey_id': survey_id,
+        'survey_title': f"{rng.choice(TOPICS)} {survey_id} - Wave {rng.randint(1, 12)}",
+        'ps_survey_status': rng.choice([22, 22, 22, 33]),
+        'fielded': fielded,
+        'completes_required': target,
+        'average_cpi': cpi,
+        'expected_loi': rng.randint(5, 30),
+        'expected_ir': rng.randint(10, 90),
+        'current_incidence': rng.randint(5, 95),
+        'billing_id': rng.choice(BILLING_IDS),
+        'country_code': rng.choice(COUNTRIES),
+        'locale': {'language': 'en', 'country': 'US'},
+        'survey_launch_date': (now - timedelta(days=rng.randint(1, 30))).isoformat() + 'Z',
+        'project_last_complete_date': (now - timedelta(minutes=rng.randint(1, 600))).isoformat() + 'Z',
+        'current_cost': round(fielded * cpi, 2),
+        'mod_on': now.isoformat() + 'Z',
+    }
+    # The real API returns many more fields; pad so _raw has a realistic size
+    for i in range(raw_padding):
+        survey[f'extra_field_{i}'] = rng.choice([None, True, rng.randint(0, 10000), f'value-{rng.randint(0, 999)}'])
+    return survey
+
+
+def build_quotas(rng: random.Random, survey: Dict, count: int) -> List[Dict]:
+    quotas = []
+    target = survey['completes_required']
+    for i in range(count):
+        if i % 2 == 0:
+            criteria = [{'qualification_name': 'Gender', 'condition_names': [rng.choice(['Male', 'Female'])]}]
+            group = 'Gender'
+        else:
+            low = rng.choice([18, 25, 35, 45, 55])
+            criteria = [{'qualification_name': 'Age', 'range_sets': [{'from': low, 'to': low + 9}]}]
+            group = 'Age'
+        required = max(1, target // max(1, count // 2))
+        achieved = rng.randint(0, required)
+        quotas.append({
+            'quota_id': f"{survey['ps_survey_id']}-{i}",
+            'quota_title': f'Quota {i + 1}',
+            'group_key': group,
+            'criteria': criteria,
+            'achieved': achieved,
+            'required_count': required,
+            'current_target': required,
+            'currently_open': max(0, required - achieved),
+            'in_progress': rng.randint(0, 5),
+            'expected_ir': survey['expected_ir'],
+        })
+    return quotas
+
+
+class MockPureSpectrum:
+    def __init__(self, config: MockConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.surveys = [build_survey(self.rng, 100000 + i, config.raw_padding) for i in range(config.surveys)]
+        self.by_id = {str(s['ps_survey_id']): s for s in self.surveys}
+        self.quotas = {sid: build_quotas(self.rng, s, config.quotas_per_survey) for sid, s in self.by_id.items()}
+        self.requests = 0
+
+    async def _simulate(self, request: web.Request):
+        """Apply latency, auth and random failures shared by every endpoint"""
+        self.requests += 1
+        delay = self.config.latency_ms + self.rng.uniform(-self.config.jitter_ms, self.config.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if request.headers.get('access-token') != MOCK_TOKEN:
+            raise web.HTTPUnauthorized(text='invalid token')
+        if self.config.error_rate and self.rng.random() < self.config.error_rate:
+            raise web.HTTPServiceUnavailable(text='mock upstream error')
+
+    def _drift(self):
+        """Advance fielded counts so consecutive polls see changes"""
+        active = [s for s in self.surveys if s['ps_survey_status'] == 22 and s['fielded'] < s['completes_required']]
+        for survey in self.rng.sample(active, min(self.config.drift, len(active))):
+            survey['fielded'] += 1
+            survey['current_cost'] = round(survey['fielded'] * survey['average_cpi'], 2)
+            survey['project_last_complete_date'] = datetime.utcnow().isoformat() + 'Z'
+
+    async def list_surveys(self, request: web.Request):
+        await self._simulate(request)
+        self._drift()
+        page = max(1, int(request.query.get('page', 1)))
+        limit = max(1, int(request.query.get('limit', 100)))
+        start = (page - 1) * limit
+        return web.json_response(self.surveys[start:start + limit])
+
+    async def survey_detail(self, request: web.Request):
+        await self._simulate(request)
+        survey = self.by_id.get(request.match_info['survey_id'])
+        if survey is None:
+            raise web.HTTPNotFound()
+        return web.json_response(survey)
+
+    async def survey_quotas(self, request: web.Request):
+        await self._simulate(request)
+        return web.json_response(self.quotas.get(request.match_info['survey_id'], []))
+
+    async def survey_health(self, request: web.Request):
+        await self._simulate(request)
+        survey = self.by_id.get(request.match_info['survey_id'])
+        if survey is None:
+            raise web.HTTPNotFound()
+        return web.json_response({
+            'ps_survey_id': survey['ps_survey_id'],
+            'kpis': {'AQP': {'value': round(self.rng.uniform(0.5, 1.0), 3), 'status': 'healthy'}},
+        })
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/buyers/v2/surveys', self.list_surveys)
+        app.router.add_get('/buyers/v2/surveys/{survey_id}', self.survey_detail)
+        app.router.add_get('/buyers/v2/surveys/{survey_id}/quotas', self.survey_quotas)
+        app.router.add_get('/buyers/v2/surveys/{survey_id}/health', self.survey_health)
+        return app
+
+
+async def start_mock(config: MockConfig, port: int = 8100):
+    """Start the mock on localhost, returns (runner, mock); call runner.cleanup() to stop"""
+    mock = MockPureSpectrum(config)
+    runner = web.AppRunner(mock.make_app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', port).start()
+    return runner, mock
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('--surveys', type=int, default=100, help='number of surveys in the dataset')
+    parser.add_argument('--quotas-per-survey', type=int, default=12)
+    parser.add_argument('--latency-ms', type=float, default=50, help='mean upstream latency')
+    parser.add_argument('--jitter-ms', type=float, default=20)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests failing with 503')
+    parser.add_argument('--raw-padding', type=int, default=40, help='extra fields per raw survey')
+    parser.add_argument('--drift', type=int, default=0, help='surveys gaining a complete per list call')
+    parser.add_argument('--seed', type=int, default=42)
+
+
+def config_from_args(args: argparse.Namespace) -> MockConfig:
+    return MockConfig(
+        surveys=args.surveys,
+        quotas_per_survey=args.quotas_per_survey,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        raw_padding=args.raw_padding,
+        drift=args.drift,
+        seed=args.seed,
+    )
+
+
+async def _serve(config: MockConfig, port: int):
+    await start_mock(config, port)
+    print(f"Mock PureSpectrum API on http://127.0.0.1:{port}/buyers/v2 (token: {MOCK_TOKEN})")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8100)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve(config_from_args(args), args.port))
+    except KeyboardInterrupt:
+        pass
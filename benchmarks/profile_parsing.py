@@ -0,0 +1,74 @@
+"""
+Profile parsing and serialization on recorded production-shaped data
+Replays fixtures with no latency so the timings show only our own cost:
+decoding and mapping in get_survey_data() / get_survey_quotas(), and
+serializing the results the way the API does.
+
+    python -m benchmarks.profile_parsing fixtures/session-*.jsonl --iterations 20
+"""
+import argparse
+import asyncio
+import cProfile
+import json
+import os
+import pstats
+import sys
+import time
+from pathlib import Path
+
+from .replay import start_replay
+
+
+async def profile(args: argparse.Namespace):
+    os.environ['PURESPECTRUM_API_BASE'] = f'http://127.0.0.1:{args.port}/buyers/v2'
+    os.environ.setdefault('PURESPECTRUM_TOKEN', 'replay')
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+    import aiohttp
+    from app.models import encode_model
+    from app.scraper import PureSpectrumScraper
+
+    runner, replay = await start_replay(args.fixtures, args.port, speed=0)
+    scraper = PureSpectrumScraper('replay', 'replay')
+    profiler = cProfile.Profile()
+    totals = {'get_survey_data': 0.0, 'get_survey_quotas': 0.0, 'serialize': 0.0}
+    quota_calls = 0
+    surveys, quotas = {}, {}
+
+    try:
+        async with aiohttp.ClientSession() as session:
+            for _ in range(args.iterations):
+                profiler.enable()
+                start = time.perf_counter()
+                surveys = await scraper.get_survey_data(session)
+                totals['get_survey_data'] += time.perf_counter() - start
+
+                start = time.perf_counter()
+                for survey_id in surveys:
+                    quotas[survey_id] = await scraper.get_survey_quotas(session, survey_id) or []
+                    quota_calls += 1
+                totals['get_survey_quotas'] += time.perf_counter() - start
+
+                start = time.perf_counter()
+                payload = json.dumps({'surveys': surveys, 'quotas': quotas}, default=encode_model)
+                totals['serialize'] += time.perf_counter() - start
+                profiler.disable()
+    finally:
+        await runner.cleanup()
+
+    print(f"Surveys: {len(surveys)}  quotas: {sum(len(q) for q in quotas.values())}  "
+          f"serialized snapshot: {len(payload) / 1024:.0f} KiB  replay misses: {replay.misses}")
+    print(f"get_survey_data   {totals['get_survey_data'] / args.iterations * 1000:9.2f} ms/call")
+    print(f"get_survey_quotas {totals['get_survey_quotas'] / max(quota_calls, 1) * 1000:9.2f} ms/call")
+    print(f"serialize         {totals['serialize'] / args.iterations * 1000:9.2f} ms/snapshot\n")
+    pstats.Stats(profiler).sort_stats(args.sort).print_stats(args.top)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('fixtures', type=Path, nargs='+')
+    parser.add_argument('--iterations', type=int, default=10)
+    parser.add_argument('--port', type=int, default=8102)
+    parser.add_argument('--top', type=int, default=25, help='profile rows to print')
+    parser.add_argument('--sort', default='cumulative')
+    asyncio.run(profile(parser.parse_args()))
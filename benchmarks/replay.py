@@ -0,0 +1,97 @@
+"""
+Replay recorded PureSpectrum responses
+Serves fixtures captured with PURESPECTRUM_RECORD_DIR (see app/recording.py)
+on the same URL layout as the real API, delaying each response by its
+recorded latency. Point the app at it with PURESPECTRUM_API_BASE and the
+scraper's own aiohttp session talks to it exactly as it would in production.
+
+    python -m benchmarks.replay fixtures/session-20260101-120000-1234.jsonl --speed 1.0
+"""
+import argparse
+import asyncio
+import json
+from collections import defaultdict
+from itertools import cycle
+from pathlib import Path
+from typing import Dict, List
+from urllib.parse import parse_qsl, urlencode
+
+from aiohttp import web
+
+
+def _key(path: str, query: str) -> str:
+    return path + '?' + urlencode(sorted(parse_qsl(query, keep_blank_values=True)))
+
+
+class ReplayServer:
+    def __init__(self, fixture_paths: List[Path], speed: float = 1.0):
+        """
+        Args:
+            fixture_paths: JSON Lines files written by FixtureRecorder
+            speed: latency multiplier (0 replays with no delay)
+        """
+        self.speed = speed
+        entries: Dict[str, List[Dict]] = defaultdict(list)
+        self.by_id: Dict[str, Dict] = {}
+        for path in fixture_paths:
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    entries[_key(entry['path'], entry['query'])].append(entry)
+                    if entry['endpoint'] == 'list' and entry['status'] == 200:
+                        for survey in json.loads(entry['body']):
+                            survey_id = str(survey.get('ps_survey_id') or survey.get('id') or survey.get('_id'))
+                            self.by_id[survey_id] = survey
+        # Repeated requests for the same URL walk through the recorded responses in order
+        self._responses = {key: cycle(recorded) for key, recorded in entries.items()}
+        self.requests = 0
+        self.misses = 0
+
+    async def handle(self, request: web.Request):
+        self.requests += 1
+        recorded = self._responses.get(_key(request.path, request.query_string))
+        if recorded is None:
+            self.misses += 1
+            raise web.HTTPNotFound(text='no recorded response for this URL')
+        entry = next(recorded)
+        if self.speed:
+            await asyncio.sleep(entry['latency_ms'] * self.speed / 1000)
+        return web.Response(
+            status=entry['status'],
+            body=entry['body'].encode('utf-8'),
+            headers={'Content-Type': entry['content_type'] or 'application/json'},
+        )
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/{tail:.*}', self.handle)
+        return app
+
+
+async def start_replay(fixture_paths: List[Path], port: int = 8100, speed: float = 1.0):
+    """Start the replay server on localhost, returns (runner, replay)"""
+    replay = ReplayServer(fixture_paths, speed)
+    runner = web.AppRunner(replay.make_app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', port).start()
+    return runner, replay
+
+
+async def _serve(fixture_paths: List[Path], port: int, speed: float):
+    _, replay = await start_replay(fixture_paths, port, speed)
+    print(f"Replaying {len(replay._responses)} recorded URLs on http://127.0.0.1:{port}")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('fixtures', type=Path, nargs='+')
+    parser.add_argument('--port', type=int, default=8100)
+    parser.add_argument('--speed', type=float, default=1.0, help='latency multiplier, 0 for no delay')
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve(args.fixtures, args.port, args.speed))
+    except KeyboardInterrupt:
+        pass
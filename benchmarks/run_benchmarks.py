@@ -0,0 +1,220 @@
+"""
+Benchmark suite against the local PureSpectrum mock
+Starts the mock API and the dashboard app in-process, drives /api/surveys,
+/api/quotas/{id} and generate_dashboard.fetch_data(), and reports throughput
+and p50/p95/p99 latency. Results are written as JSON so runs can be compared.
+
+    python -m benchmarks.run_benchmarks --surveys 100 --requests 500 --concurrency 20
+    python -m benchmarks.run_benchmarks --compare benchmarks/results/<previous>.json
+    python -m benchmarks.run_benchmarks --fixtures fixtures/session-*.jsonl
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .mock_purespectrum import MOCK_TOKEN, add_mock_arguments, config_from_args, start_mock
+from .replay import start_replay
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100
+    low = int(k)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (k - low)
+
+
+def summarize(name: str, latencies: List[float], errors: int, elapsed: float) -> Dict:
+    values = sorted(latencies)
+    ms = lambda v: round(v * 1000, 2)
+    return {
+        'name': name,
+        'requests': len(values) + errors,
+        'errors': errors,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(len(values) / elapsed, 2) if elapsed else 0.0,
+        'p50_ms': ms(percentile(values, 50)),
+        'p95_ms': ms(percentile(values, 95)),
+        'p99_ms': ms(percentile(values, 99)),
+        'max_ms': ms(values[-1]) if values else 0.0,
+    }
+
+
+async def drive(name: str, call: Callable, requests: int, concurrency: int) -> Dict:
+    """Run `call` `requests` times with at most `concurrency` in flight"""
+    latencies: List[float] = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in remaining:
+            start = time.perf_counter()
+            try:
+                ok = await call(i)
+            except Exception:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(name, latencies, errors, time.perf_counter() - start)
+
+
+async def wait_for_snapshot(session, base_url: str, timeout: float = 120) -> bool:
+    """Wait until the app's poller has published its first snapshot"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        async with session.get(f'{base_url}/metrics') as response:
+            text = await response.text()
+        for line in text.splitlines():
+            if line.startswith('dashboard_snapshot_version ') and float(line.split()[1]) > 0:
+                return True
+        await asyncio.sleep(0.2)
+    return False
+
+
+async def run(args: argparse.Namespace) -> Dict:
+    # The app reads its configuration at import time, so set it up first. Every
+    # file it reads or writes lives in the temp dir, so runs never touch (or pick
+    # up) the working copy's state. The rule file is an empty list, so no alert
+    # rules (not even the built-in defaults) are evaluated, and no webhook is set.
+    workdir = Path(tempfile.mkdtemp(prefix='ps-bench-'))
+    (workdir / 'alert_rules.json').write_text('[]')
+    os.environ.update({
+        'PURESPECTRUM_API_BASE': f'http://127.0.0.1:{args.mock_port}/buyers/v2',
+        'PURESPECTRUM_TOKEN': MOCK_TOKEN,
+        'PURESPECTRUM_USERNAME': 'bench@example.com',
+        'PURESPECTRUM_PASSWORD': 'bench',
+        'PURESPECTRUM_AUTH_FILE': str(workdir / 'auth.json'),
+        'PURESPECTRUM_ACCOUNTS_FILE': str(workdir / 'accounts.json'),
+        'SNAPSHOT_PATH': str(workdir / 'snapshot.mmap'),
+        'VIEWS_PATH': str(workdir / 'snapshot.mmap.views'),
+        'QUOTA_CACHE_FILE': str(workdir / 'quota_cache.json'),
+        'HISTORY_PATH': str(workdir / 'history.sqlite3'),
+        'ALERT_RULES_FILE': str(workdir / 'alert_rules.json'),
+        'ALERT_WEBHOOK_URL': '',
+        'PURESPECTRUM_RECORD_DIR': '',
+        'RUN_POLLER': '1' if args.mode == 'snapshot' else '0',
+        'POLL_INTERVAL_SECONDS': str(args.poll_interval),
+    })
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+    import aiohttp
+    import uvicorn
+    import generate_dashboard
+    from app.main import app
+
+    if args.fixtures:
+        mock_runner, mock = await start_replay(args.fixtures, args.mock_port, args.replay_speed)
+    else:
+        mock_runner, mock = await start_mock(config_from_args(args), args.mock_port)
+    server = uvicorn.Server(uvicorn.Config(app, host='127.0.0.1', port=args.app_port, log_level='warning'))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    base_url = f'http://127.0.0.1:{args.app_port}'
+    survey_ids = list(mock.by_id.keys())[:100]
+    rng = random.Random(args.seed)
+    results = []
+
+    try:
+        connector = aiohttp.TCPConnector(limit=args.concurrency)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            if args.mode == 'snapshot' and not await wait_for_snapshot(session, base_url):
+                raise RuntimeError('poller did not publish a snapshot')
+
+            async def api_surveys(_):
+                async with session.get(f'{base_url}/api/surveys') as response:
+                    body = await response.read()
+                    return response.status == 200 and b'"error"' not in body[:20]
+
+            async def api_quotas(_):
+                survey_id = rng.choice(survey_ids)
+                async with session.get(f'{base_url}/api/quotas/{survey_id}') as response:
+                    body = await response.read()
+                    return response.status == 200 and b'"error"' not in body[:20]
+
+            results.append(await drive('api_surveys', api_surveys, args.requests, args.concurrency))
+            results.append(await drive('api_quotas', api_quotas, args.requests, args.concurrency))
+
+        async def fetch_data(_):
+            surveys, _quotas = await generate_dashboard.fetch_data()
+            return surveys is not None
+
+        results.append(await drive('generate_dashboard.fetch_data', fetch_data, args.fetch_runs, 1))
+    finally:
+        server.should_exit = True
+        await server_task
+        await mock_runner.cleanup()
+
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {k: str(v) if isinstance(v, (Path, list)) else v for k, v in vars(args).items()},
+        'upstream_requests': mock.requests,
+        'results': results,
+    }
+
+
+def print_report(report: Dict, baseline: Optional[Dict] = None):
+    previous = {r['name']: r for r in (baseline or {}).get('results', [])}
+    header = f"{'benchmark':32} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}"
+    print(header)
+    print('-' * len(header))
+    for r in report['results']:
+        print(f"{r['name']:32} {r['throughput_rps']:9.1f} {r['p50_ms']:9.2f} {r['p95_ms']:9.2f} {r['p99_ms']:9.2f} {r['errors']:7d}")
+        old = previous.get(r['name'])
+        if old:
+            delta = lambda key: (r[key] - old[key]) / old[key] * 100 if old[key] else 0.0
+            print(f"{'  vs baseline':32} {delta('throughput_rps'):+8.1f}% {delta('p50_ms'):+8.1f}% "
+                  f"{delta('p95_ms'):+8.1f}% {delta('p99_ms'):+8.1f}%")
+    print(f"\nUpstream requests served by mock: {report['upstream_requests']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', choices=['snapshot', 'live'], default='snapshot',
+                        help='serve from the poller snapshot or fetch upstream per request')
+    parser.add_argument('--requests', type=int, default=300, help='requests per API benchmark')
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--fetch-runs', type=int, default=3, help='generate_dashboard.fetch_data() runs')
+    parser.add_argument('--poll-interval', type=float, default=5)
+    parser.add_argument('--mock-port', type=int, default=8100)
+    parser.add_argument('--app-port', type=int, default=8101)
+    parser.add_argument('--output', type=Path, help='results file (default: benchmarks/results/<timestamp>.json)')
+    parser.add_argument('--compare', type=Path, help='previous results file to compare against')
+    parser.add_argument('--fixtures', type=Path, nargs='+', help='replay recorded responses instead of the mock')
+    parser.add_argument('--replay-speed', type=float, default=1.0, help='recorded latency multiplier')
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    baseline = json.loads(args.compare.read_text()) if args.compare else None
+    print_report(report, baseline)
+
+    output = args.output or RESULTS_DIR / f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{args.mode}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Results saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
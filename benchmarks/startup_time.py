@@ -0,0 +1,116 @@
+"""
+Cold start measurement
+Times `import app.main` in fresh interpreters, then starts uvicorn against a
+snapshot file left on disk (seeded from the mock dataset) and reports how long
+it takes until /healthz answers, /readyz reports ready and the first
+/api/surveys response arrives.
+
+    python -m benchmarks.startup_time --surveys 500 --runs 5
+"""
+import argparse
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+IMPORT_PROBE = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+
+
+def seed_snapshot(path: Path, count: int):
+    """Publish `count` mock surveys into a snapshot file, as a previous poller run would"""
+    sys.path.insert(0, str(ROOT))
+    from app.models import Quota, Survey
+    from app.snapshot import SnapshotWriter
+
+    from .mock_purespectrum import build_quotas, build_survey
+
+    rng = random.Random(11)
+    surveys, quotas = {}, {}
+    for i in range(count):
+        raw = build_survey(rng, 200000 + i, 40)
+        survey = Survey.from_api(raw)
+        surveys[survey.survey_id] = survey
+        quotas[survey.survey_id] = [Quota.from_api(q) for q in build_quotas(rng, raw, 4)]
+    writer = SnapshotWriter(path)
+    writer.publish(surveys, quotas)
+    writer.close()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for(url: str, deadline: float, ok=(200,)) -> float:
+    """Poll `url` until it answers with one of `ok`; returns the time it did"""
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status in ok:
+                    return time.perf_counter()
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.005)
+    raise TimeoutError(url)
+
+
+def measure_server(env: dict, timeout: float) -> dict:
+    port = free_port()
+    base = f'http://127.0.0.1:{port}'
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'app.main:app', '--port', str(port), '--log-level', 'warning'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = start + timeout
+        healthy = wait_for(f'{base}/healthz', deadline)
+        ready = wait_for(f'{base}/readyz', deadline)
+        with urllib.request.urlopen(f'{base}/api/surveys', timeout=timeout) as response:
+            response.read()
+        first = time.perf_counter()
+    finally:
+        proc.terminate()
+        proc.wait()
+    return {
+        'healthz_ms': (healthy - start) * 1000,
+        'readyz_ms': (ready - start) * 1000,
+        'first_surveys_ms': (first - start) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--surveys', type=int, default=300)
+    parser.add_argument('--timeout', type=float, default=30.0)
+    args = parser.parse_args()
+
+    imports = []
+    for _ in range(args.runs):
+        out = subprocess.run([sys.executable, '-c', IMPORT_PROBE], cwd=ROOT, capture_output=True,
+                             text=True, check=True, env={**os.environ, 'RUN_POLLER': '0'})
+        imports.append(float(out.stdout.strip().splitlines()[-1]) * 1000)
+    print(f"import app.main: median {statistics.median(imports):.0f} ms over {args.runs} runs")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot_path = Path(tmp) / 'snapshot.mmap'
+        seed_snapshot(snapshot_path, args.surveys)
+        env = {**os.environ, 'RUN_POLLER': '0', 'SNAPSHOT_PATH': str(snapshot_path)}
+        runs = [measure_server(env, args.timeout) for _ in range(args.runs)]
+        print(f"\nServer start with a {args.surveys}-survey snapshot on disk (median of {args.runs}):")
+        for key in ('healthz_ms', 'readyz_ms', 'first_surveys_ms'):
+            print(f"  {key:18} {statistics.median(run[key] for run in runs):8.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,12 +2,20 @@
 Standalone Dashboard Generator
 Creates a self-contained HTML file with all survey data
 Run this script, it will create dashboard.html that you can open in any browser
+It also writes content-hashed JSON data files under data/ for the static
+GitHub Pages dashboard (index_live.html)
 """
 import os
+import re
 import asyncio
+import hashlib
 import aiohttp
 import json
-from datetime import datetime
+from datetime import datetime, timezone
+from pathlib import Path
+from app.fastjson import dumps
+from app.models import encode_quota_list, generate_quota_name
+from app.quota_cache import QuotaCache
 from app.scraper import PureSpectrumScraper
 from dotenv import load_dotenv
 
@@ -16,30 +24,8 @@ load_dotenv()
 PURESPECTRUM_USERNAME = os.getenv("PURESPECTRUM_USERNAME", "")
 PURESPECTRUM_PASSWORD = os.getenv("PURESPECTRUM_PASSWORD", "")
 
-
-def generate_quota_name(quota):
-    """Generate meaningful quota name from criteria"""
-    criteria = quota.get('criteria', [])
-    if not criteria:
-        return quota.get('quota_title', 'General Quota')
-    
-    parts = []
-    for criterion in criteria:
-        qual_name = criterion.get('qualification_name', '')
-        conditions = criterion.get('condition_names', [])
-        
-        if qual_name == 'Gender' and conditions:
-            parts.append(conditions[0])
-        elif qual_name == 'Age':
-            range_sets = criterion.get('range_sets', [])
-            if range_sets:
-                range = range_sets[0]
-                from_age = range.get('from', '')
-                to_age = range.get('to', '')
-                if from_age and to_age:
-                    parts.append(f"{from_age}-{to_age} yr")
-    
-    return ', '.join(parts) if parts else quota.get('quota_title', 'General Quota')
+# Static JSON data for GitHub Pages, served next to index_live.html
+STATIC_DATA_DIR = os.getenv("STATIC_DATA_DIR", "data")
 
 
 async def fetch_data():
@@ -58,12 +44,22 @@ async def fetch_data():
         # Get all surveys
         surveys = await scraper.get_survey_data(session)
         
-        # Get quotas for each survey
-        quotas_data = {}
-        for survey_id in surveys.keys():
-            quotas = await scraper.get_survey_quotas(session, survey_id)
-            quotas_data[survey_id] = quotas
-        
+        # Get quotas for each survey that changed since the last run
+        cache = QuotaCache.load()
+        cache.retain(surveys)
+        fetched = 0
+        for survey_id, survey in surveys.items():
+            if cache.stale(survey_id, survey):
+                cache.put(survey_id, survey, await scraper.get_survey_quotas(session, survey_id))
+                fetched += 1
+        cache.save()
+        print(f"Fetched quotas for {fetched} of {len(surveys)} surveys (others unchanged)")
+        
+        # Surveys whose quotas could not be fetched get no quota data rather than an empty list
+        quotas_data = {survey_id: cache.get(survey_id) for survey_id in surveys if cache.get(survey_id) is not None}
+        missing = len(surveys) - len(quotas_data)
+        if missing:
+            print(f"Warning: quotas unavailable for {missing} surveys (fetch failed)")
         return surveys, quotas_data
 
 
@@ -623,6 +619,74 @@ def generate_html(surveys, quotas_data):
     return html
 
 
+def _hashed_name(stem: str, body: bytes) -> str:
+    """File name carrying a hash of its content, so it can be cached forever"""
+    stem = re.sub(r'[^\w-]', '_', stem)
+    return f"{stem}.{hashlib.blake2b(body, digest_size=6).hexdigest()}.json"
+
+
+def _write_atomic(path: Path, body: bytes):
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(body)
+    os.replace(tmp, path)
+
+
+def write_static_data(surveys, quotas_data, output_dir=STATIC_DATA_DIR):
+    """
+    Write compact JSON data files for static hosting
+    
+    - surveys.<hash>.json: survey fields without `_raw`, plus display order
+    - quotas/<survey_id>.<hash>.json: same shape as /api/quotas
+    - manifest.json: version and current file names. It is the only file
+      that needs revalidating; the hashed files never change
+    
+    Returns:
+        The manifest
+    """
+    root = Path(output_dir)
+    (root / "quotas").mkdir(parents=True, exist_ok=True)
+    manifest_path = root / "manifest.json"
+    try:
+        previous = json.loads(manifest_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        previous = {}
+    
+    files = {}
+    surveys_body = dumps({
+        "surveys": {survey_id: survey.fields() for survey_id, survey in surveys.items()},
+        "order": list(surveys),
+    })
+    surveys_name = _hashed_name("surveys", surveys_body)
+    files[surveys_name] = surveys_body
+    quota_names = {}
+    for survey_id, quotas in quotas_data.items():
+        body = encode_quota_list(quotas)
+        quota_names[survey_id] = "quotas/" + _hashed_name(survey_id, body)
+        files[quota_names[survey_id]] = body
+    
+    for name, body in files.items():
+        path = root / name
+        if not path.exists():
+            _write_atomic(path, body)
+    
+    changed = previous.get("surveys") != surveys_name or previous.get("quotas") != quota_names
+    manifest = {
+        "version": previous.get("version", 0) + (1 if changed else 0),
+        "generatedAt": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "surveys": surveys_name,
+        "quotas": quota_names,
+    }
+    _write_atomic(manifest_path, dumps(manifest))
+    
+    # Keep the previous generation so pages that loaded the old manifest can finish
+    keep = set(files) | {previous.get("surveys")} | set(previous.get("quotas", {}).values())
+    for path in [*root.glob("surveys.*.json"), *(root / "quotas").glob("*.json")]:
+        if path.relative_to(root).as_posix() not in keep:
+            path.unlink()
+    
+    return manifest
+
+
 async def main():
     """Main function to generate dashboard"""
     print("Fetching survey data from PureSpectrum...")
@@ -638,8 +702,11 @@ async def main():
     html = generate_html(surveys, quotas_data)
     
     output_file = "dashboard.html"
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write(html)
+    # Atomic, so start_dashboard_server.py never serves a half-written file
+    _write_atomic(Path(output_file), html.encode("utf-8"))
+    
+    manifest = write_static_data(surveys, quotas_data)
+    print(f"Static data written to {STATIC_DATA_DIR}/ (version {manifest['version']})")
     
     print(f"Dashboard generated successfully!")
     print(f"Open {output_file} in your browser to view it.")
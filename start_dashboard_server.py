@@ -1,21 +1,216 @@
 """
 Simple HTTP Server for Dashboard
 Run this to serve dashboard.html on your local network
+
+Only dashboard.html and the data files written by generate_dashboard.py
+(manifest and content-hashed JSON, plus their .gz/.br variants) are served;
+every other path, including credentials, tokens, .env and the snapshot and
+history files next to them, is a 404.
+
+Each request is handled on its own thread. File contents are cached in
+memory and reloaded when the file's mtime or size changes. Responses carry
+ETag/Last-Modified, so repeat visits get a 304. Compressible files are sent
+gzip- or brotli-encoded, using .gz/.br files next to the original when
+present and compressing in memory otherwise.
+
+    python start_dashboard_server.py --regenerate-minutes 15
 """
+import argparse
+import asyncio
+import email.utils
+import gzip
+import hashlib
 import http.server
-import socketserver
-import webbrowser
+import io
 import os
+import re
 import socket
+import threading
+import time
+import urllib.parse
+import webbrowser
+
+try:
+    import brotli
+except ImportError:  # optional, gzip is always available
+    brotli = None
 
 PORT = 8000
 
+# Files larger than this are streamed from disk instead of cached
+MAX_CACHED_FILE_BYTES = 32 * 1024 * 1024
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'image/svg+xml')
+MIN_COMPRESS_BYTES = 1024
+
+# Content-hashed data files from generate_dashboard.py never change
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.json$')
+
+# The only URL paths served (see generate_dashboard.write_static_data)
+STATIC_DATA_DIR = os.getenv("STATIC_DATA_DIR", "data").strip('/')
+ALLOWED_PATH_RE = re.compile(
+    r'/(?:dashboard\.html'
+    rf'|{re.escape(STATIC_DATA_DIR)}/(?:manifest|surveys\.[0-9a-f]{{12}}|quotas/[\w-]+\.[0-9a-f]{{12}})\.json)'
+    r'(?:\.gz|\.br)?'
+)
+
+
+class CachedFile:
+    """One file's bytes and encoded variants, valid for a given mtime and size"""
+
+    __slots__ = ('stamp', 'mtime', 'content_type', 'variants')
+
+    def __init__(self, stamp, mtime, content_type, variants):
+        self.stamp = stamp
+        self.mtime = mtime
+        self.content_type = content_type
+        # encoding ('identity', 'gzip', 'br') -> (body, etag)
+        self.variants = variants
+
+
+def _etag(body: bytes, encoding: str) -> str:
+    digest = hashlib.blake2b(body, digest_size=8).hexdigest()
+    return f'"{digest}"' if encoding == 'identity' else f'"{digest}-{encoding}"'
+
+
+def _sibling(path: str, suffix: str, source_mtime: float):
+    """Precompressed file next to `path`, if it is at least as new as the source"""
+    try:
+        if os.stat(path + suffix).st_mtime >= source_mtime:
+            with open(path + suffix, 'rb') as f:
+                return f.read()
+    except OSError:
+        pass
+    return None
+
+
+class FileCache:
+    def __init__(self):
+        self._files = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: str, st: os.stat_result, content_type: str) -> CachedFile:
+        stamp = (st.st_mtime_ns, st.st_size)
+        entry = self._files.get(path)
+        if entry is not None and entry.stamp == stamp:
+            return entry
+
+        with open(path, 'rb') as f:
+            body = f.read()
+        variants = {'identity': (body, _etag(body, 'identity'))}
+        if content_type.startswith(COMPRESSIBLE_TYPES) and len(body) >= MIN_COMPRESS_BYTES:
+            gz = _sibling(path, '.gz', st.st_mtime) or gzip.compress(body, compresslevel=9, mtime=0)
+            variants['gzip'] = (gz, _etag(body, 'gzip'))
+            br = _sibling(path, '.br', st.st_mtime)
+            if br is None and brotli is not None:
+                br = brotli.compress(body)
+            if br is not None:
+                variants['br'] = (br, _etag(body, 'br'))
+
+        entry = CachedFile(stamp, st.st_mtime, content_type, variants)
+        with self._lock:
+            self._files[path] = entry
+        return entry
+
+
+file_cache = FileCache()
+
+
 class MyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
     def end_headers(self):
         self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Cache-Control', 'no-cache')
         super().end_headers()
 
+    def send_head(self):
+        url_path = urllib.parse.unquote(urllib.parse.urlsplit(self.path).path)
+        if url_path == '/':
+            self.send_response(302)
+            self.send_header('Location', '/dashboard.html')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return None
+        if not ALLOWED_PATH_RE.fullmatch(url_path):
+            self.send_error(404, "File not found")
+            return None
+
+        path = self.translate_path(self.path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            st = None
+        if st is None or os.path.isdir(path) or st.st_size > MAX_CACHED_FILE_BYTES or path.endswith('/'):
+            # 404s and very large files
+            return super().send_head()
+
+        try:
+            entry = file_cache.get(path, st, self.guess_type(path))
+        except OSError:
+            self.send_error(404, "File not found")
+            return None
+
+        encoding = self._pick_encoding(entry)
+        body, etag = entry.variants[encoding]
+        if self._not_modified(etag, entry.mtime):
+            self.send_response(304)
+            self._send_validators(etag, entry, path)
+            self.end_headers()
+            return None
+
+        self.send_response(200)
+        self.send_header('Content-Type', entry.content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if encoding != 'identity':
+            self.send_header('Content-Encoding', encoding)
+        self._send_validators(etag, entry, path)
+        self.end_headers()
+        return io.BytesIO(body)
+
+    def _pick_encoding(self, entry: CachedFile) -> str:
+        accepted = {part.split(';')[0].strip().lower()
+                    for part in self.headers.get('Accept-Encoding', '').split(',')}
+        for encoding in ('br', 'gzip'):
+            if encoding in entry.variants and encoding in accepted:
+                return encoding
+        return 'identity'
+
+    def _not_modified(self, etag: str, mtime: float) -> bool:
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+            return '*' in tags or etag in tags
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since:
+            try:
+                since = email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(mtime) <= since
+        return False
+
+    def _send_validators(self, etag: str, entry: CachedFile, path: str):
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', self.date_time_string(int(entry.mtime)))
+        if len(entry.variants) > 1:
+            self.send_header('Vary', 'Accept-Encoding')
+        if HASHED_NAME_RE.search(path):
+            self.send_header('Cache-Control', 'public, max-age=31536000, immutable')
+        else:
+            # Revalidate every time; unchanged files cost a 304
+            self.send_header('Cache-Control', 'no-cache')
+
+
+def regenerate_forever(interval_minutes: float):
+    """Re-run generate_dashboard.py every `interval_minutes` in a background thread"""
+    import generate_dashboard
+
+    while True:
+        time.sleep(interval_minutes * 60)
+        try:
+            print("🔄 Regenerating dashboard.html...")
+            asyncio.run(generate_dashboard.main())
+        except Exception as e:
+            print(f"❌ Dashboard regeneration failed: {e}")
+
+
 def get_local_ip():
     """Get local IP address"""
     s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -29,42 +224,56 @@ def get_local_ip():
     return ip
 
 def main():
+    parser = argparse.ArgumentParser(description="Serve dashboard.html on the local network")
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--regenerate-minutes', type=float,
+                        default=float(os.getenv("DASHBOARD_REGENERATE_MINUTES", "0")),
+                        help="re-run generate_dashboard.py on this schedule (0 = off)")
+    parser.add_argument('--no-browser', action='store_true')
+    args = parser.parse_args()
+    port = args.port
+
     # Change to script directory
     os.chdir(os.path.dirname(os.path.abspath(__file__)))
-    
+
     # Check if dashboard.html exists
     if not os.path.exists('dashboard.html'):
         print("❌ dashboard.html not found!")
         print("Run: python generate_dashboard.py first")
         return
-    
+
     handler = MyHTTPRequestHandler
-    
+
     try:
-        with socketserver.TCPServer(("", PORT), handler) as httpd:
+        with http.server.ThreadingHTTPServer(("", port), handler) as httpd:
             local_ip = get_local_ip()
-            
+
             print("=" * 60)
             print("📊 Dashboard Server Started!")
             print("=" * 60)
             print(f"\nLocal access:")
-            print(f"  http://localhost:{PORT}/dashboard.html")
+            print(f"  http://localhost:{port}/dashboard.html")
             print(f"\nNetwork access (share with team on same network):")
-            print(f"  http://{local_ip}:{PORT}/dashboard.html")
+            print(f"  http://{local_ip}:{port}/dashboard.html")
+            if args.regenerate_minutes > 0:
+                print(f"\nRegenerating dashboard.html every {args.regenerate_minutes:g} minutes")
+                threading.Thread(target=regenerate_forever, args=(args.regenerate_minutes,),
+                                 daemon=True).start()
             print("\n" + "=" * 60)
             print("Press Ctrl+C to stop the server")
             print("=" * 60 + "\n")
-            
+
             # Open browser
-            webbrowser.open(f'http://localhost:{PORT}/dashboard.html')
-            
+            if not args.no_browser:
+                webbrowser.open(f'http://localhost:{port}/dashboard.html')
+
             # Start server
             httpd.serve_forever()
-            
+
     except OSError as e:
         if "Address already in use" in str(e):
-            print(f"❌ Port {PORT} is already in use.")
-            print(f"   Close the other application or change PORT in this script.")
+            print(f"❌ Port {port} is already in use.")
+            print(f"   Close the other application or pass --port.")
         else:
             print(f"❌ Error: {e}")
     except KeyboardInterrupt:
@@ -72,4 +281,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
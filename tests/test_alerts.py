@@ -0,0 +1,99 @@
+import pytest
+
+from app.alerts import ALERT_TIME_RULES_SECONDS, AlertEngine, Rule, RuleError
+from app.models import Quota, Survey
+
+
+def survey(survey_id='s1', **fields):
+    return Survey.from_api({'id': survey_id, **fields})
+
+
+def quota(quota_id, achieved, required):
+    return Quota.from_api({'quota_id': quota_id, 'achieved': achieved, 'required_count': required})
+
+
+def transitions(events):
+    return [(alert.rule, alert.survey_id, alert.quota_id, alert.state) for alert in events]
+
+
+def test_survey_rule_fires_once_and_resolves():
+    engine = AlertEngine([Rule('over_budget', 'budget > 0 and current_cost > budget',
+                               message='Cost {current_cost} over {budget}')])
+
+    events = engine.evaluate({'s1': survey(current_cost=120, budget=100)}, {}, now=1)
+    assert transitions(events) == [('over_budget', 's1', None, 'firing')]
+    assert events[0].message == 'Cost 120 over 100'
+
+    # Still over budget, and again after an unrelated change: reported only once
+    assert engine.evaluate({'s1': survey(current_cost=120, budget=100)}, {}, now=2) == []
+    assert engine.evaluate({'s1': survey(current_cost=130, budget=100)}, {}, now=3) == []
+
+    events = engine.evaluate({'s1': survey(current_cost=90, budget=100)}, {}, now=4)
+    assert transitions(events) == [('over_budget', 's1', None, 'resolved')]
+    assert engine.to_list()[0]['resolvedAt'] == 4
+
+
+def test_missing_field_never_matches():
+    engine = AlertEngine([Rule('over_budget', 'current_cost > budget')])
+    assert engine.evaluate({'s1': survey(current_cost=120)}, {}, now=1) == []
+
+
+def test_quota_rule_and_removed_quota():
+    engine = AlertEngine([Rule('overfill', 'achieved > required_count', scope='quota')])
+    surveys = {'s1': survey()}
+
+    events = engine.evaluate(surveys, {'s1': [quota('a', 12, 10), quota('b', 5, 10)]}, now=1)
+    assert transitions(events) == [('overfill', 's1', 'a', 'firing')]
+
+    events = engine.evaluate(surveys, {'s1': [quota('b', 5, 10)]}, now=2)
+    assert transitions(events) == [('overfill', 's1', 'a', 'resolved')]
+
+
+def test_quota_rule_on_survey_fields_follows_survey_changes():
+    engine = AlertEngine([Rule('late_overfill', 'survey_completes >= 50 and achieved > required_count',
+                               scope='quota')])
+    rows = {'s1': [quota('a', 12, 10)]}
+
+    assert engine.evaluate({'s1': survey(fielded=10)}, rows, now=1) == []
+    events = engine.evaluate({'s1': survey(fielded=60)}, rows, now=2)
+    assert transitions(events) == [('late_overfill', 's1', 'a', 'firing')]
+    events = engine.evaluate({'s1': survey(fielded=20)}, rows, now=3)
+    assert transitions(events) == [('late_overfill', 's1', 'a', 'resolved')]
+
+
+def test_time_rules_are_rechecked_without_changes():
+    engine = AlertEngine([Rule('stalled', 'hours_since_last_complete >= 2')])
+    surveys = {'s1': survey(project_last_complete_date='1970-01-01T00:00:00Z')}
+
+    assert engine.evaluate(surveys, {}, now=3600) == []
+    # Same data, but the clock moved past the threshold
+    events = engine.evaluate(surveys, {}, now=3600 + max(ALERT_TIME_RULES_SECONDS, 3600))
+    assert transitions(events) == [('stalled', 's1', None, 'firing')]
+
+
+def test_removed_survey_resolves_its_alerts():
+    engine = AlertEngine([Rule('over_budget', 'current_cost > budget')])
+    engine.evaluate({'s1': survey(current_cost=2, budget=1)}, {}, now=1)
+
+    events = engine.evaluate({}, {}, now=2)
+    assert transitions(events) == [('over_budget', 's1', None, 'resolved')]
+
+
+def test_restored_alerts_are_not_announced_again():
+    first = AlertEngine([Rule('over_budget', 'current_cost > budget')])
+    first.evaluate({'s1': survey(current_cost=2, budget=1)}, {}, now=1)
+
+    second = AlertEngine([Rule('over_budget', 'current_cost > budget')])
+    second.restore(first.to_list())
+    assert second.evaluate({'s1': survey(current_cost=2, budget=1)}, {}, now=2) == []
+
+
+@pytest.mark.parametrize('when', ['__import__("os")', 'completes.real', 'x[0]', 'lambda: 1', 'completes >'])
+def test_rule_rejects_unsafe_or_invalid_expressions(when):
+    with pytest.raises(RuleError):
+        Rule('bad', when)
+
+
+def test_rule_rejects_unknown_scope():
+    with pytest.raises(RuleError):
+        Rule('bad', 'completes > 0', scope='account')
@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+
+from app import metrics
+from app.web_dashboard import _coalesce, _inflight
+
+
+def coalesced():
+    return metrics.COALESCED_REQUESTS.labels('test').value
+
+
+def test_concurrent_callers_share_one_fetch():
+    calls = 0
+    release = asyncio.Event()
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return calls
+
+    async def main():
+        callers = [asyncio.create_task(_coalesce('test', 'k', fetch)) for _ in range(5)]
+        await asyncio.sleep(0)
+        assert ('test', 'k') in _inflight
+        release.set()
+        return await asyncio.gather(*callers)
+
+    before = coalesced()
+    assert asyncio.run(main()) == [1] * 5
+    assert calls == 1
+    assert coalesced() - before == 4
+    assert ('test', 'k') not in _inflight
+
+
+def test_keys_are_fetched_independently_and_again_once_done():
+    fetched = []
+
+    async def fetch(key):
+        fetched.append(key)
+        await asyncio.sleep(0)
+        return key
+
+    async def main():
+        first = await asyncio.gather(_coalesce('test', 'a', lambda: fetch('a')),
+                                     _coalesce('test', 'b', lambda: fetch('b')))
+        # Finished fetches are not cached here, the next miss fetches again
+        second = await _coalesce('test', 'a', lambda: fetch('a'))
+        return first, second
+
+    assert asyncio.run(main()) == (['a', 'b'], 'a')
+    assert fetched == ['a', 'b', 'a']
+    assert not _inflight
+
+
+def test_errors_reach_every_waiter_and_clear_the_key():
+    async def fetch():
+        await asyncio.sleep(0)
+        raise RuntimeError('upstream down')
+
+    async def main():
+        return await asyncio.gather(*(_coalesce('test', 'err', fetch) for _ in range(3)),
+                                    return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert ('test', 'err') not in _inflight
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_fetch():
+    release = asyncio.Event()
+
+    async def fetch():
+        await release.wait()
+        return 'quotas'
+
+    async def main():
+        leaving = asyncio.create_task(_coalesce('test', 'k', fetch))
+        staying = asyncio.create_task(_coalesce('test', 'k', fetch))
+        await asyncio.sleep(0)
+        # The client that started the fetch disconnects
+        leaving.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leaving
+        release.set()
+        return await staying
+
+    assert asyncio.run(main()) == 'quotas'
+    assert not _inflight
@@ -0,0 +1,77 @@
+import csv
+import io
+import zipfile
+from xml.etree import ElementTree
+
+from app.export import EXPORT_BATCH_ROWS, CsvEncoder, XlsxEncoder, stream
+
+NS = {'s': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+
+
+def sheet_values(data: bytes):
+    with zipfile.ZipFile(io.BytesIO(data)) as workbook:
+        assert workbook.testzip() is None
+        names = set(workbook.namelist())
+        sheet = ElementTree.fromstring(workbook.read('xl/worksheets/sheet1.xml'))
+        book = ElementTree.fromstring(workbook.read('xl/workbook.xml'))
+        for name in names - {'xl/worksheets/sheet1.xml', 'xl/workbook.xml'}:
+            ElementTree.fromstring(workbook.read(name))
+    rows = []
+    for row in sheet.iterfind('s:sheetData/s:row', NS):
+        values = []
+        for cell in row.iterfind('s:c', NS):
+            kind = cell.get('t')
+            if kind == 'inlineStr':
+                values.append(cell.find('s:is/s:t', NS).text or '')
+            elif kind == 'b':
+                values.append(cell.find('s:v', NS).text == '1')
+            elif cell.find('s:v', NS) is not None:
+                values.append(float(cell.find('s:v', NS).text))
+            else:
+                values.append(None)
+        rows.append(values)
+    return names, book, rows
+
+
+def test_xlsx_is_a_valid_workbook():
+    data = b''.join(stream(XlsxEncoder('Surveys & <Quotas>'), ['ID', 'Title', 'Completes', 'Open', 'Cost'], [
+        ['s1', 'Brands <&> "Co"', 10, True, 1.5],
+        ['s2', 'Bad\x00\x1fchars', None, False, float('nan')],
+    ]))
+    names, book, rows = sheet_values(data)
+
+    assert {'[Content_Types].xml', '_rels/.rels', 'xl/_rels/workbook.xml.rels', 'xl/workbook.xml',
+            'xl/worksheets/sheet1.xml'} <= names
+    assert book.find('s:sheets/s:sheet', NS).get('name') == 'Surveys & <Quotas>'
+    assert rows == [
+        ['ID', 'Title', 'Completes', 'Open', 'Cost'],
+        ['s1', 'Brands <&> "Co"', 10, True, 1.5],
+        ['s2', 'Badchars', None, False, None],
+    ]
+
+
+def test_xlsx_streams_many_batches():
+    count = EXPORT_BATCH_ROWS * 3 + 7
+    chunks = list(stream(XlsxEncoder('Rows'), ['n'], ([i] for i in range(count))))
+    _, _, rows = sheet_values(b''.join(chunks))
+
+    assert len(rows) == count + 1
+    assert rows[-1] == [count - 1]
+
+
+def test_csv_has_bom_and_quotes_values():
+    data = b''.join(stream(CsvEncoder(), ['ID', 'Title'], [['s1', 'a, "b"'], ['s2', None]]))
+
+    assert data.startswith(b'\xef\xbb\xbf')
+    rows = list(csv.reader(io.StringIO(data.decode('utf-8-sig'))))
+    assert rows == [['ID', 'Title'], ['s1', 'a, "b"'], ['s2', '']]
+
+
+def test_csv_text_cannot_start_a_formula():
+    titles = ['=HYPERLINK("http://x","y")', '+1', '-2+3', '@SUM(A1)', '\tTab', '\rCR', 'Plain - title']
+    data = b''.join(stream(CsvEncoder(), ['Title', 'Cost'], [[title, -5] for title in titles]))
+    rows = list(csv.reader(io.StringIO(data.decode('utf-8-sig'), newline='')))
+
+    assert [row[0] for row in rows[1:]] == ["'" + title for title in titles[:-1]] + ['Plain - title']
+    # Numbers are not text and stay as they are
+    assert {row[1] for row in rows[1:]} == {'-5'}
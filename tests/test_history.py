@@ -0,0 +1,69 @@
+import time
+
+import numpy as np
+
+from app.history import HistoryStore, _downsample
+from app.models import Survey
+
+
+def row(ts, completes, cost):
+    """One samples-table row: (ts, min, max, last) per field"""
+    return [ts, completes, completes, completes, cost, cost, cost]
+
+
+def survey(completes, cost):
+    return Survey.from_api({'id': 's1', 'fielded': completes, 'current_cost': cost})
+
+
+def test_downsample_carries_last_value_through_empty_buckets():
+    values = np.array([row(0, 1, 10), row(30, 3, 30), row(125, 7, 70)], dtype=np.float64)
+    series = _downsample(values, None, 0, 60, 4)
+
+    assert series['t'] == [0, 60, 120, 180]
+    assert series['completes']['last'] == [3, 3, 7, 7]
+    assert series['completes']['min'] == [1, 3, 3, 7]
+    assert series['completes']['max'] == [3, 3, 7, 7]
+    assert series['cost']['last'] == [30, 30, 70, 70]
+
+
+def test_downsample_starts_from_seed_row():
+    seed = np.array(row(-50, 5, 50), dtype=np.float64)
+    values = np.array([row(130, 2, 20)], dtype=np.float64)
+    series = _downsample(values, seed, 0, 60, 3)
+
+    assert series['completes']['last'] == [5, 5, 2]
+    # The carried value bounds the bucket it changes in
+    assert series['completes']['min'] == [5, 5, 2]
+    assert series['completes']['max'] == [5, 5, 5]
+
+
+def test_downsample_without_seed_leaves_leading_gaps_empty():
+    values = np.array([row(70, 4, 40)], dtype=np.float64)
+    series = _downsample(values, None, 0, 60, 3)
+
+    assert series['completes']['last'] == [None, 4, 4]
+    assert series['completes']['min'] == [None, 4, 4]
+
+
+def test_record_stores_only_changed_surveys(tmp_path):
+    store = HistoryStore(tmp_path / 'history.sqlite3')
+    assert store.record({'s1': survey(1, 10)}, ts=1000) == 1
+    assert store.record({'s1': survey(1, 10)}, ts=1010) == 0
+    assert store.record({'s1': survey(2, 20)}, ts=1020) == 1
+    store.close()
+
+
+def test_series_carries_values_from_before_the_range(tmp_path):
+    store = HistoryStore(tmp_path / 'history.sqlite3')
+    now = time.time() // 60 * 60
+    store.record({'s1': survey(5, 50)}, ts=now - 600)
+    store.record({'s1': survey(8, 80)}, ts=now - 90)
+
+    series, table, resolution = store.series(['s1', 'missing'], now - 300, now, 60)
+    store.close()
+
+    assert table == 'rollup_1m'
+    assert resolution == 60
+    assert series['s1']['completes']['last'] == [5, 5, 5, 8, 8]
+    assert series['s1']['cost']['last'] == [50, 50, 50, 80, 80]
+    assert series['missing']['t'] == []
@@ -0,0 +1,51 @@
+import threading
+
+from app.metrics import REGISTRY, Counter, Histogram
+
+
+def unregister(*metrics):
+    for metric in metrics:
+        REGISTRY.remove(metric)
+
+
+def test_updates_from_threads_are_not_lost():
+    counter = Counter('test_thread_total', 'test', ['worker'])
+    histogram = Histogram('test_thread_seconds', 'test', buckets=(0.5, 1.0))
+    per_thread, threads = 20000, 8
+
+    def work():
+        child = counter.labels('a')
+        for i in range(per_thread):
+            child.inc()
+            histogram.observe(0.25 if i % 2 else 0.75)
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    total = per_thread * threads
+    assert counter.labels('a').value == total
+    counts, _, count = histogram._children[()].read()
+    assert counts == [total // 2, total // 2, 0]
+    assert count == total
+    unregister(counter, histogram)
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram('test_render_seconds', 'Render test', ['endpoint'], buckets=(0.1, 1.0))
+    histogram.labels('list').observe(0.05)
+    histogram.labels('list').observe(0.5)
+    histogram.labels('list').observe(5)
+
+    assert histogram.render().splitlines() == [
+        '# HELP test_render_seconds Render test',
+        '# TYPE test_render_seconds histogram',
+        'test_render_seconds_bucket{endpoint="list",le="0.1"} 1',
+        'test_render_seconds_bucket{endpoint="list",le="1.0"} 2',
+        'test_render_seconds_bucket{endpoint="list",le="+Inf"} 3',
+        'test_render_seconds_sum{endpoint="list"} 5.55',
+        'test_render_seconds_count{endpoint="list"} 3',
+    ]
+    unregister(histogram)
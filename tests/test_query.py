@@ -0,0 +1,89 @@
+import pytest
+
+from app.columnar import SurveyColumns
+from app.models import Survey
+from app.query import QueryError, SurveyIndex
+
+
+def survey(survey_id, title, status=22, country='US', billing_id='b1', completes=0, target=100,
+           cost=0, cpi=0, last_complete=None, account=None):
+    return Survey.from_api({'id': survey_id, 'survey_title': title, 'ps_survey_status': status,
+                            'country_code': country, 'billing_id': billing_id, 'fielded': completes,
+                            'completes_required': target, 'current_cost': cost, 'average_cpi': cpi,
+                            'project_last_complete_date': last_complete}, account)
+
+
+@pytest.fixture
+def index():
+    surveys = {s.survey_id: s for s in (
+        survey('1', 'Coffee habits', completes=50, cost=30, cpi=1.5, last_complete='2026-01-03'),
+        survey('2', 'Tea drinkers UK', status=33, country='GB', completes=10, cost=80, cpi=4.0,
+               last_complete='2026-01-01'),
+        survey('3', 'Coffee and tea', country='GB', billing_id='b2', completes=90, cost=10, cpi=2.0),
+        survey('4', 'Streaming services', status=33, billing_id='b2', completes=0, target=0, cost=50,
+               cpi=3.0, last_complete='2026-01-02'),
+    )}
+    return SurveyIndex(SurveyColumns.build(surveys), surveys)
+
+
+def test_no_filters_returns_every_survey_in_snapshot_order(index):
+    assert index.query({}) == (['1', '2', '3', '4'], 4)
+
+
+@pytest.mark.parametrize('filters, expected', [
+    ({'status': '33'}, ['2', '4']),
+    ({'status': 'active'}, ['1', '3']),
+    ({'status': 'Active,Paused'}, ['1', '2', '3', '4']),
+    ({'country': 'GB'}, ['2', '3']),
+    ({'country': 'GB', 'billing_id': 'b2'}, ['3']),
+    ({'country': 'GB', 'status': 'Paused', 'billing_id': 'b2'}, []),
+    ({'country': 'FR'}, []),
+    ({'country': ''}, ['1', '2', '3', '4']),
+])
+def test_filters_intersect(index, filters, expected):
+    ids, total = index.query(filters)
+    assert ids == expected
+    assert total == len(expected)
+
+
+@pytest.mark.parametrize('q, expected', [
+    ('coffee', ['1', '3']),
+    ('TEA', ['2', '3']),
+    ('coff te', ['3']),
+    ('stream', ['4']),
+    ('juice', []),
+    ('!!', ['1', '2', '3', '4']),
+])
+def test_search_matches_title_token_prefixes(index, q, expected):
+    assert index.query({}, q=q)[0] == expected
+
+
+def test_search_combines_with_filters(index):
+    assert index.query({'country': 'GB'}, q='coffee') == (['3'], 1)
+
+
+@pytest.mark.parametrize('sort, expected', [
+    ('progress', ['4', '2', '1', '3']),
+    ('-progress', ['3', '1', '2', '4']),
+    ('cost', ['3', '1', '4', '2']),
+    ('-cpi', ['2', '4', '3', '1']),
+    # Surveys without a last complete sort first
+    ('last_complete', ['3', '2', '4', '1']),
+])
+def test_sort(index, sort, expected):
+    assert index.query({}, sort=sort)[0] == expected
+
+
+def test_sort_applies_to_matches_only(index):
+    assert index.query({'status': 'Paused'}, sort='-cost') == (['2', '4'], 2)
+
+
+def test_pagination_reports_total_matches(index):
+    assert index.query({}, sort='cost', offset=1, limit=2) == (['1', '4'], 4)
+    assert index.query({}, sort='cost', offset=3) == (['2'], 4)
+    assert index.query({}, offset=10, limit=5) == ([], 4)
+
+
+def test_unknown_sort_is_rejected(index):
+    with pytest.raises(QueryError):
+        index.query({}, sort='title')
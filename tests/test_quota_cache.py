@@ -0,0 +1,87 @@
+from app.models import Quota, Survey
+from app.quota_cache import QUOTA_SWEEP_SECONDS, QuotaCache
+
+
+def survey(completes=10, status=22, target=100):
+    return Survey.from_api({'id': 's1', 'fielded': completes, 'ps_survey_status': status,
+                            'completes_required': target})
+
+
+def quotas(*achieved):
+    return [Quota.from_api({'quota_id': i, 'achieved': a}) for i, a in enumerate(achieved)]
+
+
+def test_uncached_survey_is_changed():
+    assert QuotaCache().changed('s1', survey())
+
+
+def test_put_remembers_survey_state():
+    cache = QuotaCache()
+    rows = quotas(1, 2)
+    cache.put('s1', survey(), rows, now=0)
+
+    assert cache.get('s1') is rows
+    assert not cache.changed('s1', survey())
+    assert cache.changed('s1', survey(completes=11))
+    assert cache.changed('s1', survey(status=33))
+    assert cache.changed('s1', survey(target=200))
+
+
+def test_stale_after_sweep_interval():
+    cache = QuotaCache()
+    cache.put('s1', survey(), quotas(1), now=0)
+
+    assert not cache.stale('s1', survey(), now=QUOTA_SWEEP_SECONDS - 1)
+    assert cache.stale('s1', survey(), now=QUOTA_SWEEP_SECONDS)
+
+
+def test_empty_list_is_cached():
+    cache = QuotaCache()
+    cache.put('s1', survey(), [], now=0)
+
+    assert cache.get('s1') == []
+    assert not cache.changed('s1', survey())
+
+
+def test_failed_fetch_keeps_quotas_and_retries():
+    cache = QuotaCache()
+    rows = quotas(1)
+    cache.put('s1', survey(), rows, now=0)
+    cache.put('s1', survey(), None, now=1)
+
+    assert cache.get('s1') is rows
+    assert cache.changed('s1', survey())
+
+
+def test_failed_first_fetch_is_retried_and_not_published():
+    cache = QuotaCache()
+    cache.put('s1', survey(), None, now=0)
+    cache.put('s2', survey(), [], now=0)
+
+    assert cache.get('s1') is None
+    assert cache.changed('s1', survey())
+    # Only the survey known to have no quotas is published as an empty list
+    assert cache.quotas() == {'s2': []}
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = tmp_path / 'quota_cache.json'
+    cache = QuotaCache()
+    cache.put('s1', survey(), quotas(3, 4), now=5)
+    cache.put('s2', survey(), None, now=5)
+    cache.save(path)
+
+    loaded = QuotaCache.load(path)
+    assert [q.achieved for q in loaded.get('s1')] == [3, 4]
+    assert not loaded.changed('s1', survey())
+    assert loaded.changed('s2', survey())
+
+
+def test_retain_drops_unlisted_surveys():
+    cache = QuotaCache()
+    cache.put('s1', survey(), quotas(1), now=0)
+    cache.put('s2', survey(), quotas(1), now=0)
+    cache.retain(['s2'])
+
+    assert cache.get('s1') is None
+    assert len(cache) == 1
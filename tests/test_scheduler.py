@@ -0,0 +1,172 @@
+import asyncio
+import time
+
+import pytest
+
+from app import poller as poller_module
+from app.accounts import Account, RateLimiter
+from app.models import Survey
+from app.poller import SurveyPoller
+from app.quota_cache import QUOTA_SWEEP_SECONDS, QuotaCache
+from app.scheduler import (POLL_BATCH_SECONDS, POLL_HOT_SECONDS, POLL_IDLE_SECONDS, PAUSED_STATUS,
+                           PollSchedule, ViewTable, poll_interval, view_hash)
+
+BASE = 60.0
+# Schedule times are time.monotonic() values
+T0 = 1000.0
+
+
+def survey(survey_id='s1', completes=10, target=100, status=22):
+    return Survey.from_api({'id': survey_id, 'fielded': completes, 'completes_required': target,
+                            'ps_survey_status': status})
+
+
+def keys(surveys):
+    return {survey_id: survey_id for survey_id in surveys}
+
+
+@pytest.mark.parametrize('args, expected', [
+    ((survey(), None, True), (POLL_HOT_SECONDS, 'viewed')),
+    ((survey(status=PAUSED_STATUS), 50.0, False), (POLL_IDLE_SECONDS, 'paused')),
+    ((survey(completes=100), 50.0, False), (POLL_IDLE_SECONDS, 'complete')),
+    ((survey(), None, False), (BASE, 'new')),
+    ((survey(), 0.0, False), (min(POLL_IDLE_SECONDS, BASE * 4), 'idle')),
+])
+def test_poll_interval_reasons(args, expected):
+    assert poll_interval(*args, base=BASE) == expected
+
+
+def test_faster_surveys_are_polled_more_often():
+    slow, _ = poll_interval(survey(completes=0, target=10000), 5.0, False, base=BASE)
+    fast, reason = poll_interval(survey(completes=0, target=10000), 120.0, False, base=BASE)
+    assert reason == 'filling'
+    assert POLL_HOT_SECONDS <= fast < slow <= BASE
+
+    # One complete left at 60/h: refreshed before it is expected, not at the filling rate
+    near, reason = poll_interval(survey(completes=99, target=100), 60.0, False, base=BASE)
+    assert reason == 'near_target'
+    assert near == max(POLL_HOT_SECONDS, 15.0)
+
+
+def test_new_surveys_are_due_at_once_and_popped_most_overdue_first():
+    surveys = {survey_id: survey(survey_id) for survey_id in ('a', 'b', 'c')}
+    schedule = PollSchedule(BASE)
+    schedule.observe(surveys, keys(surveys), set(), now=T0)
+    assert sorted(entry.survey_id for entry in schedule.pop_due(now=T0)) == ['a', 'b', 'c']
+
+    for survey_id, fetched_at in (('a', 10), ('b', 0), ('c', 5)):
+        schedule.done(schedule.entries[survey_id], surveys[survey_id], now=T0 + fetched_at)
+    assert schedule.next_due() == T0 + BASE
+    assert [entry.survey_id for entry in schedule.pop_due(now=T0 + 100)] == ['b', 'c', 'a']
+    assert schedule.pop_due(now=T0 + 100) == []
+
+
+def test_pop_due_is_capped_and_batches_nearly_due_entries():
+    surveys = {str(i): survey(str(i)) for i in range(5)}
+    schedule = PollSchedule(BASE)
+    schedule.observe(surveys, keys(surveys), set(), now=T0)
+    for i, survey_id in enumerate(surveys):
+        schedule.done(schedule.entries[survey_id], surveys[survey_id], now=T0 + i * POLL_BATCH_SECONDS)
+
+    # '1' is due within the batch window of '0'; the cap holds it for the next pass
+    assert [entry.survey_id for entry in schedule.pop_due(now=T0 + BASE, limit=1)] == ['0']
+    assert [entry.survey_id for entry in schedule.pop_due(now=T0 + BASE)] == ['1']
+    assert schedule.next_due() == T0 + BASE + 2 * POLL_BATCH_SECONDS
+
+
+def test_opening_a_survey_replans_it_once():
+    surveys = {'s1': survey()}
+    schedule = PollSchedule(BASE)
+    schedule.observe(surveys, keys(surveys), set(), now=T0)
+    entry = schedule.pop_due(now=T0)[0]
+    schedule.done(entry, surveys['s1'], now=T0)
+    assert entry.due == T0 + BASE
+
+    schedule.update_views(surveys, {view_hash('s1')}, now=T0 + 1)
+    assert (entry.reason, entry.due) == ('viewed', T0 + POLL_HOT_SECONDS)
+    # The entry's old heap item (due at T0 + BASE) is skipped
+    assert schedule.pop_due(now=T0 + BASE + 1) == [entry]
+    assert schedule.pop_due(now=T0 + BASE + 1) == []
+
+
+def test_unchanged_surveys_back_off_to_the_sweep():
+    cache = QuotaCache()
+    surveys = {'s1': survey()}
+    schedule = PollSchedule(BASE, cache)
+    schedule.observe(surveys, keys(surveys), set(), now=T0)
+    entry = schedule.pop_due(now=T0)[0]
+    cache.put('s1', surveys['s1'], [], now=T0)
+    schedule.done(entry, surveys['s1'], now=T0)
+    assert (entry.reason, entry.due) == ('sweep', T0 + QUOTA_SWEEP_SECONDS)
+
+    # Completes moved: refreshed within one list interval
+    surveys = {'s1': survey(completes=11)}
+    schedule.observe(surveys, keys(surveys), set(), now=T0 + 30)
+    assert entry.due <= T0 + BASE
+
+
+def test_surveys_without_new_completes_back_off():
+    surveys = {'s1': survey()}
+    schedule = PollSchedule(BASE)
+    schedule.observe(surveys, keys(surveys), set(), now=T0)
+    entry = schedule.pop_due(now=T0)[0]
+    schedule.done(entry, surveys['s1'], now=T0)
+    assert entry.interval == BASE
+
+    schedule.observe(surveys, keys(surveys), set(), now=T0 + BASE)
+    assert entry.velocity == 0
+    assert (entry.reason, entry.interval) == ('idle', min(POLL_IDLE_SECONDS, BASE * 4))
+
+
+def test_rate_limiter_caps_requests_per_second():
+    limiter = RateLimiter(50)
+
+    async def acquire(count):
+        for _ in range(count):
+            await limiter.acquire()
+
+    start = time.perf_counter()
+    asyncio.run(acquire(60))
+    # A burst of 50, then 10 more at 50 per second
+    assert time.perf_counter() - start >= 0.15
+
+
+class FakeScraper:
+    def __init__(self):
+        self.fetched = []
+
+    async def get_survey_quotas(self, session, survey_id):
+        self.fetched.append(survey_id)
+        return []
+
+
+class CountingBudget:
+    def __init__(self):
+        self.acquired = 0
+
+    async def acquire(self):
+        self.acquired += 1
+
+
+def test_refresh_due_budgets_only_repeat_fetches(tmp_path, monkeypatch):
+    spent = CountingBudget()
+    monkeypatch.setattr(poller_module, 'budget', spent)
+    poller = SurveyPoller(Account('test'), merger=None, interval=BASE, views=ViewTable(tmp_path / 'views'))
+    poller.scraper = FakeScraper()
+    poller.surveys = {survey_id: survey(survey_id) for survey_id in ('a', 'b')}
+    poller._keys = keys(poller.surveys)
+    poller.schedule.observe(poller.surveys, poller._keys, set(), time.monotonic())
+
+    # First fetches fill the snapshot without waiting on the budget
+    assert asyncio.run(poller._refresh_due(None)) == 2
+    assert sorted(poller.scraper.fetched) == ['a', 'b']
+    assert spent.acquired == 0
+    assert poller.cache.quotas() == {'a': [], 'b': []}
+
+    # A survey that moved is refetched, this time within the budget
+    poller.surveys['a'] = survey('a', completes=11)
+    poller.schedule.entries['a'].fetched_at -= BASE
+    poller.schedule.observe(poller.surveys, poller._keys, set(), time.monotonic())
+    assert asyncio.run(poller._refresh_due(None)) == 1
+    assert poller.scraper.fetched[-1] == 'a'
+    assert spent.acquired == 1
@@ -0,0 +1,96 @@
+from app import snapshot
+from app.models import Quota, Survey
+from app.snapshot import FORMAT, HEADER, MAGIC, SnapshotReader, SnapshotWriter
+
+
+def surveys(count):
+    return {str(i): Survey.from_api({'id': i, 'fielded': i, 'survey_title': f'Survey {i}'}) for i in range(count)}
+
+
+def test_publish_read_round_trip(tmp_path):
+    path = tmp_path / 'snapshot.mmap'
+    writer = SnapshotWriter(path)
+    quotas = {'1': [Quota.from_api({'quota_id': 'a', 'achieved': 3, 'required_count': 5})]}
+    version = writer.publish(surveys(3), quotas, generated_at=100.0, alerts=[{'rule': 'r'}])
+
+    read = SnapshotReader(path).read()
+    assert read.version == version == 1
+    assert read.generated_at == 100.0
+    assert list(read.surveys) == ['0', '1', '2']
+    assert read.surveys['2'].to_json() == surveys(3)['2'].to_json()
+    assert read.quotas_json('1') == b'{"quotas":[' + quotas['1'][0].raw_json + b']}'
+    assert read.alerts == [{'rule': 'r'}]
+    writer.close()
+
+
+def test_unchanged_version_is_not_parsed_again(tmp_path):
+    path = tmp_path / 'snapshot.mmap'
+    writer = SnapshotWriter(path)
+    writer.publish(surveys(2), {})
+    reader = SnapshotReader(path)
+
+    first = reader.read()
+    assert reader.read() is first
+    assert reader.current() is first
+
+    writer.publish(surveys(3), {})
+    assert reader.current() is None
+    second = reader.read()
+    assert second.version == 2 and len(second.surveys) == 3
+    assert reader.current() is second
+    writer.close()
+
+
+def test_reader_before_first_publish(tmp_path):
+    reader = SnapshotReader(tmp_path / 'snapshot.mmap')
+    assert reader.read() is None
+    assert reader.current() is None
+    assert reader.version() == 0
+
+
+def test_torn_read_is_retried(tmp_path, monkeypatch):
+    path = tmp_path / 'snapshot.mmap'
+    writer = SnapshotWriter(path)
+    writer.publish(surveys(1), {})
+    reader = SnapshotReader(path)
+    loads = snapshot.loads
+
+    def racing_loads(data):
+        payload = loads(data)
+        if writer.version == 1:
+            # The poller publishes while this reader is parsing
+            writer.publish(surveys(4), {})
+        return payload
+
+    monkeypatch.setattr(snapshot, 'loads', racing_loads)
+    read = reader.read()
+    assert read.version == 2
+    assert len(read.surveys) == 4
+    writer.close()
+
+
+def test_write_in_progress_serves_previous_version(tmp_path):
+    path = tmp_path / 'snapshot.mmap'
+    writer = SnapshotWriter(path)
+    writer.publish(surveys(2), {})
+    reader = SnapshotReader(path)
+    previous = reader.read()
+
+    # Header as the writer leaves it while copying the next payload
+    HEADER.pack_into(writer._mm, 0, MAGIC, FORMAT, writer._seq + 1, writer.version, 0)
+    assert reader.current() is previous
+    assert reader.read() is previous
+    writer.close()
+
+
+def test_writer_grows_file_for_large_payloads(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, 'INITIAL_CAPACITY', HEADER.size + 64)
+    path = tmp_path / 'snapshot.mmap'
+    writer = SnapshotWriter(path)
+    reader = SnapshotReader(path)
+    writer.publish(surveys(1), {})
+    assert reader.read().version == 1
+
+    writer.publish(surveys(200), {})
+    assert len(reader.read().surveys) == 200
+    writer.close()